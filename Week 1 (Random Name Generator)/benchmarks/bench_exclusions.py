@@ -0,0 +1,94 @@
+"""
+Taken username check cost.
+
+Builds a sorted index and a Bloom filter of --taken usernames in a
+temporary directory, then measures the microseconds per `username in
+source` check for a plain set, MemoryExclusions, SortedFileExclusions
+and BloomFilter, half of the checked usernames being taken, and the
+rate of write_usernames() with each source. Exits with status 1 if a
+file-backed check takes longer than --target microseconds.
+
+Usage:
+    python benchmarks/bench_exclusions.py
+    python benchmarks/bench_exclusions.py --taken 10000000 --target 50
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from username_generator.exclusions import (  # noqa: E402
+    BloomFilter, MemoryExclusions, SortedFileExclusions, build_sorted_index)
+from username_generator.generator import generate_usernames, write_usernames  # noqa: E402
+
+OPTIONS = {'use_numbers': True, 'num_digits': 4}
+
+
+def check_cost(source, usernames):
+    """Return the microseconds per membership check of usernames in source."""
+    start = time.perf_counter()
+    for username in usernames:
+        username in source  # noqa: B015
+    return (time.perf_counter() - start) / len(usernames) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure taken username checks.")
+    parser.add_argument('--taken', type=int, default=1_000_000, help="usernames in the indexes")
+    parser.add_argument('--checks', type=int, default=100_000, help="checks per source")
+    parser.add_argument('--target', type=float, default=50,
+                        help="microseconds a file-backed check may take (default 50)")
+    args = parser.parse_args()
+
+    random.seed(0)
+    taken = generate_usernames(args.taken, **OPTIONS)
+    probes = random.sample(taken, args.checks // 2) + generate_usernames(args.checks // 2, **OPTIONS)
+    random.shuffle(probes)
+
+    with tempfile.TemporaryDirectory() as directory:
+        taken_file = os.path.join(directory, 'taken.txt')
+        with open(taken_file, 'w') as file:
+            file.writelines(username + '\n' for username in taken)
+        start = time.perf_counter()
+        build_sorted_index([taken_file], os.path.join(directory, 'taken.idx'))
+        print(f"sorted index built in {time.perf_counter() - start:.1f}s")
+        start = time.perf_counter()
+        with BloomFilter.create(os.path.join(directory, 'taken.bloom'), len(taken)) as bloom:
+            for username in taken:
+                bloom.add(username)
+        print(f"Bloom filter built in {time.perf_counter() - start:.1f}s\n")
+
+        sources = {
+            'set': set(taken),
+            'memory': MemoryExclusions(taken),
+            'sorted file': SortedFileExclusions(os.path.join(directory, 'taken.idx')),
+            'bloom': BloomFilter(os.path.join(directory, 'taken.bloom')),
+        }
+        print(f"{'source':<14} {'check (µs)':>12} {'write (names/s)':>16}")
+        slowest = 0.0
+        with open(os.devnull, 'w') as null:
+            for name, source in sources.items():
+                cost = check_cost(source, probes)
+                start = time.perf_counter()
+                write_usernames(null, args.checks, exclude=source, **OPTIONS)
+                rate = args.checks / (time.perf_counter() - start)
+                if name in ('sorted file', 'bloom'):
+                    slowest = max(slowest, cost)
+                print(f"{name:<14} {cost:>12.2f} {rate:>16,.0f}")
+        for source in sources.values():
+            if hasattr(source, 'close'):
+                source.close()
+
+    if slowest > args.target:
+        print(f"\nA file-backed check took {slowest:.1f}µs, over the target of {args.target:.0f}µs")
+        sys.exit(1)
+    print(f"\nFile-backed checks took at most {slowest:.1f}µs (target {args.target:.0f}µs)")
+
+
+if __name__ == "__main__":
+    main()
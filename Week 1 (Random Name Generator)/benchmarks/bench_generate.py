@@ -0,0 +1,88 @@
+"""
+Username generation throughput.
+
+Compares calling generate_username() in a loop with the batch API
+(generate_usernames() and write_usernames() to a discarding file) and
+with generate_unique_usernames(), for plain names and for names with
+four digits and a special character. When NumPy is installed, the
+numpy_backend versions of generate_usernames() and write_usernames()
+are measured as well. Exits with status 1 if the batch API writes fewer
+than --target names per second.
+
+Usage:
+    python benchmarks/bench_generate.py
+    python benchmarks/bench_generate.py --count 5000000 --target 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from username_generator.generator import (  # noqa: E402
+    combination_count, generate_unique_usernames, generate_username, generate_usernames,
+    write_usernames)
+
+try:
+    from username_generator import numpy_backend  # noqa: E402
+except ImportError:
+    numpy_backend = None
+
+OPTIONS = {
+    'plain': {},
+    'digits+special': {'use_numbers': True, 'num_digits': 4, 'use_special': True},
+}
+
+
+def rate(func, count, repeat=3):
+    """Return the best names per second of func() over a few runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure username generation throughput.")
+    parser.add_argument('--count', type=int, default=1_000_000, help="names per run")
+    parser.add_argument('--target', type=float, default=1_000_000,
+                        help="names/s write_usernames() must reach (default 1M)")
+    args = parser.parse_args()
+
+    count = args.count
+    loop_count = max(count // 10, 1)
+    columns = ['loop', 'batch', 'write', 'unique']
+    if numpy_backend is not None:
+        columns += ['np batch', 'np write']
+    else:
+        print("NumPy is not installed; skipping the numpy backend\n")
+    print(f"{'options':<16}" + ''.join(f" {column:>12}" for column in columns) + "   (names/s)")
+    slowest_write = float('inf')
+    with open(os.devnull, 'w') as null:
+        for name, options in OPTIONS.items():
+            loop = rate(lambda: [generate_username(**options) for _ in range(loop_count)], loop_count)
+            batch = rate(lambda: generate_usernames(count, **options), count)
+            write = rate(lambda: write_usernames(null, count, **options), count)
+            unique_count = min(count, combination_count(**options))
+            unique = rate(lambda: generate_unique_usernames(unique_count, **options), unique_count)
+            rates = [loop, batch, write, unique]
+            if numpy_backend is not None:
+                rates.append(rate(lambda: numpy_backend.generate_usernames(count, **options), count))
+                rates.append(rate(lambda: numpy_backend.write_usernames(null, count, **options), count))
+            slowest_write = min(slowest_write, write)
+            print(f"{name:<16}" + ''.join(f" {value:>12,.0f}" for value in rates))
+
+    if slowest_write < args.target:
+        print(f"\nwrite_usernames() reached {slowest_write:,.0f} names/s, "
+              f"below the target of {args.target:,.0f}")
+        sys.exit(1)
+    print(f"\nwrite_usernames() reached at least {slowest_write:,.0f} names/s "
+          f"(target {args.target:,.0f})")
+
+
+if __name__ == "__main__":
+    main()
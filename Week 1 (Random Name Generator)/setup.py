@@ -1,16 +1,16 @@
-from setuptools import setup, find_packages
+from setuptools import setup
 
 setup(
     name="random-username-generator",
     version="1.0.0",
-    packages=find_packages(where="src"),
-    package_dir={"": "src"},
-    include_package_data=True,
+    packages=["username_generator"],
+    package_data={"username_generator": ["data/*.txt"]},
     python_requires=">=3.6",
+    extras_require={"numpy": ["numpy>=1.17"]},
     author="sanjeeviraju",
     author_email="your.email@example.com",
     description="A Python GUI application for generating random creative usernames",
-    long_description=open("README.md").read(),
+    long_description=open("README.md", encoding="utf-8").read(),
     long_description_content_type="text/markdown",
     url="https://github.com/sanjeeviraju/random-username-generator",
     classifiers=[
@@ -21,7 +21,11 @@
     ],
     entry_points={
         'console_scripts': [
-            'random-username-generator=src.main:main',
+            'random-username-generator=username_generator.cli:main',
+            'random-username-index=username_generator.exclusions:main',
+        ],
+        'gui_scripts': [
+            'random-username-generator-gui=username_generator.main:main',
         ],
     },
 )
@@ -0,0 +1,8 @@
+"""
+Username Generator Package Entry Point
+Launches the GUI when run as `python -m username_generator`.
+"""
+
+from .main import main
+
+main()
@@ -0,0 +1,87 @@
+"""
+Username Generator Command Line
+Generates usernames in bulk without the GUI, writing one per line to a
+file or standard output.
+
+Usage:
+    random-username-generator -n 10
+    random-username-generator -n 5000000 --digits 4 --special -o usernames.txt
+    random-username-generator -n 1000 --unique --seed 42
+    random-username-generator -n 50000000 --backend numpy -o usernames.txt
+    random-username-generator -n 1000 --exclude taken.idx
+"""
+
+import argparse
+import os
+import random
+import sys
+from .exclusions import open_exclusions
+from .generator import write_usernames
+
+def main(argv=None):
+    """
+    Run the command line interface.
+
+    Returns:
+        int: Exit status, 2 if the options cannot produce enough unique or
+            untaken usernames
+    """
+    parser = argparse.ArgumentParser(
+        prog='random-username-generator',
+        description="Generate random usernames from adjectives and nouns.")
+    parser.add_argument('-n', '--count', type=int, default=10,
+                        help="number of usernames (default: 10)")
+    parser.add_argument('-d', '--digits', type=int, choices=range(1, 5), metavar='{1-4}',
+                        help="append a number with this many digits")
+    parser.add_argument('-s', '--special', action='store_true',
+                        help="append a special character")
+    parser.add_argument('-u', '--unique', action='store_true',
+                        help="make every username distinct")
+    parser.add_argument('-o', '--output', type=argparse.FileType('w'), default=sys.stdout,
+                        help="file to write to (default: standard output)")
+    parser.add_argument('-x', '--exclude', metavar='INDEX',
+                        help="skip usernames in this index of taken usernames "
+                             "(built with random-username-index)")
+    parser.add_argument('--exclude-in-memory', action='store_true',
+                        help="load a sorted --exclude index into memory for faster lookups")
+    parser.add_argument('--seed', type=int, help="random seed, for repeatable output")
+    parser.add_argument('--backend', choices=['python', 'numpy'], default='python',
+                        help="generate with the standard library or NumPy (default: python)")
+    args = parser.parse_args(argv)
+    if args.count < 0:
+        parser.error("--count must not be negative")
+    if args.backend == 'numpy' and args.unique:
+        parser.error("--unique is only available with the python backend")
+    if args.backend == 'numpy' and args.exclude:
+        parser.error("--exclude is only available with the python backend")
+
+    options = {'use_numbers': args.digits is not None,
+               'num_digits': args.digits or 2,
+               'use_special': args.special}
+    if args.seed is not None:
+        random.seed(args.seed)
+    try:
+        if args.backend == 'numpy':
+            try:
+                from . import numpy_backend
+            except ImportError:
+                parser.error("the numpy backend requires NumPy (pip install numpy)")
+            numpy_backend.write_usernames(args.output, args.count, rng=args.seed, **options)
+        else:
+            exclude = open_exclusions(args.exclude, args.exclude_in_memory) if args.exclude else None
+            write_usernames(args.output, args.count, unique=args.unique, exclude=exclude, **options)
+        args.output.flush()
+    except BrokenPipeError:
+        # The reader stopped early, as with `| head`; point stdout at
+        # devnull so the final flush at exit does not fail again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    except (OSError, ValueError) as e:
+        print(f"random-username-generator: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if args.output is not sys.stdout:
+            args.output.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
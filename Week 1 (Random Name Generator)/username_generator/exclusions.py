@@ -0,0 +1,382 @@
+"""
+Taken Username Exclusion
+Sources of existing usernames that generated usernames must not collide
+with, and a command line tool to build and update their index files.
+
+Every source answers `username in source` case-insensitively:
+
+- MemoryExclusions: a set in memory, for up to a few million usernames
+- SortedFileExclusions: a sorted text file, one username per line,
+  memory-mapped and binary searched, so it is exact and takes no memory
+  beyond the page cache
+- BloomFilter: a bit array file, memory-mapped; a fraction of free
+  usernames (the false positive rate chosen when it is built) are
+  reported as taken, which only means they are not generated
+
+Any other container of usernames can be passed as `exclude` too, in
+which case usernames are compared exactly as generated.
+
+Usage:
+    random-username-index build taken.txt -o taken.idx
+    random-username-index build taken.txt --bloom --capacity 50000000 -o taken.bloom
+    random-username-index add taken.idx new_signups.txt
+    random-username-index check taken.idx SwiftTiger BoldEagle42
+"""
+
+import argparse
+import heapq
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from hashlib import blake2b
+
+# Usernames sorted in memory at a time when building a sorted index
+RUN_SIZE = 1_000_000
+
+BLOOM_MAGIC = b'RUGBLOOM'
+# Magic, number of bits, number of hashes, capacity, usernames added
+BLOOM_HEADER = struct.Struct('<8sQIQQ')
+
+def username_key(username):
+    """
+    Return the form usernames are compared in: stripped and case-folded.
+
+    Returns:
+        bytes: UTF-8 encoded key
+    """
+    return username.strip().casefold().encode('utf-8')
+
+def read_usernames(filename):
+    """
+    Read usernames from a file, one per line, or from standard input for '-'.
+
+    Yields:
+        str: Usernames, skipping blank lines
+    """
+    file = sys.stdin if filename == '-' else open(filename, encoding='utf-8')
+    try:
+        for line in file:
+            if line.strip():
+                yield line
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+class MemoryExclusions:
+    """
+    Taken usernames held in a set.
+
+    Attributes:
+        keys (set): Keys of the taken usernames (see username_key())
+    """
+
+    def __init__(self, usernames=()):
+        self.keys = {username_key(username) for username in usernames}
+
+    @classmethod
+    def from_file(cls, filename):
+        """Load the usernames of a text file or sorted index."""
+        return cls(read_usernames(filename))
+
+    def add(self, username):
+        self.keys.add(username_key(username))
+
+    def __contains__(self, username):
+        return username_key(username) in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+class SortedFileExclusions:
+    """
+    Taken usernames in a memory-mapped text file of sorted, distinct keys.
+
+    A lookup is a binary search over the bytes of the file: each step
+    finds the line around the middle of the remaining range, so about
+    log2(n) lines are compared and only those pages are read.
+    """
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __contains__(self, username):
+        key = username_key(username)
+        data = self._map
+        low, high = 0, len(data)
+        # low is always the start of a line, high the end of one plus its newline
+        while low < high:
+            middle = (low + high) // 2
+            start = data.rfind(b'\n', low, middle) + 1 or low
+            end = data.find(b'\n', start, high)
+            if end < 0:
+                end = high
+            line = data[start:end]
+            if line == key:
+                return True
+            if line < key:
+                low = end + 1
+            else:
+                high = start
+        return False
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class BloomFilter:
+    """
+    Taken usernames in a memory-mapped Bloom filter file.
+
+    Each key sets num_hashes bits, at positions derived from one 128-bit
+    BLAKE2b digest by double hashing. A lookup reads at most num_hashes
+    bytes of the file.
+
+    Attributes:
+        num_bits (int): Size of the bit array
+        num_hashes (int): Bits set per username
+        capacity (int): Usernames the filter was sized for
+        count (int): Usernames added so far
+    """
+
+    def __init__(self, filename, writable=False):
+        self._file = open(filename, 'r+b' if writable else 'rb')
+        header = self._file.read(BLOOM_HEADER.size)
+        if len(header) < BLOOM_HEADER.size or not header.startswith(BLOOM_MAGIC):
+            self._file.close()
+            raise ValueError(f"{filename} is not a Bloom filter index")
+        _, self.num_bits, self.num_hashes, self.capacity, self.count = BLOOM_HEADER.unpack(header)
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+        self._map = mmap.mmap(self._file.fileno(), 0, access=access)
+        self._writable = writable
+
+    @classmethod
+    def create(cls, filename, capacity, error_rate=1e-4):
+        """
+        Create an empty filter sized for capacity usernames at the given false positive rate.
+
+        Returns:
+            BloomFilter: The new filter, open for adding
+        """
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be positive and error_rate between 0 and 1")
+        num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        with open(filename, 'wb') as file:
+            file.write(BLOOM_HEADER.pack(BLOOM_MAGIC, num_bits, num_hashes, capacity, 0))
+            file.truncate(BLOOM_HEADER.size + (num_bits + 7) // 8)
+        return cls(filename, writable=True)
+
+    def _positions(self, username):
+        digest = blake2b(username_key(username), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        num_bits = self.num_bits
+        return [(first + i * step) % num_bits for i in range(self.num_hashes)]
+
+    def add(self, username):
+        data = self._map
+        for position in self._positions(username):
+            data[BLOOM_HEADER.size + (position >> 3)] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, username):
+        data = self._map
+        for position in self._positions(username):
+            if not data[BLOOM_HEADER.size + (position >> 3)] >> (position & 7) & 1:
+                return False
+        return True
+
+    @property
+    def error_rate(self):
+        """Expected false positive rate with count usernames added."""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+    def close(self):
+        if self._writable:
+            self._map[:BLOOM_HEADER.size] = BLOOM_HEADER.pack(
+                BLOOM_MAGIC, self.num_bits, self.num_hashes, self.capacity, self.count)
+            self._map.flush()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def is_bloom_filter(filename):
+    """Return whether a file is a Bloom filter index, by its magic bytes."""
+    with open(filename, 'rb') as file:
+        return file.read(len(BLOOM_MAGIC)) == BLOOM_MAGIC
+
+def open_exclusions(filename, in_memory=False):
+    """
+    Open an index file as an exclusion source, choosing the type by its contents.
+
+    Args:
+        filename (str): Bloom filter or sorted text index
+        in_memory (bool): Load a text index into a set instead of
+            memory-mapping it. Defaults to False.
+
+    Returns:
+        Exclusion source supporting `username in source`
+    """
+    if is_bloom_filter(filename):
+        return BloomFilter(filename)
+    if in_memory:
+        return MemoryExclusions.from_file(filename)
+    return SortedFileExclusions(filename)
+
+def _sorted_runs(usernames, directory, run_size=RUN_SIZE):
+    """
+    Sort keys run_size at a time into files in directory.
+
+    Returns:
+        list: Paths of the run files
+    """
+    paths = []
+    run = set()
+
+    def flush():
+        path = os.path.join(directory, f'run{len(paths)}')
+        with open(path, 'wb') as file:
+            file.writelines(key + b'\n' for key in sorted(run))
+        paths.append(path)
+        run.clear()
+
+    for username in usernames:
+        run.add(username_key(username))
+        if len(run) >= run_size:
+            flush()
+    if run:
+        flush()
+    return paths
+
+def build_sorted_index(sources, destination, run_size=RUN_SIZE):
+    """
+    Write the distinct keys of sources and destination, if it exists, sorted into destination.
+
+    Keys are sorted in runs of run_size and merged, so memory use does
+    not grow with the number of usernames. The destination is replaced
+    atomically.
+
+    Args:
+        sources (list): Username files, or '-' for standard input
+        destination (str): Index file to create or update
+
+    Returns:
+        int: Usernames in the index
+    """
+    directory = os.path.dirname(os.path.abspath(destination))
+    with tempfile.TemporaryDirectory(dir=directory) as temporary:
+        runs = _sorted_runs((username for source in sources for username in read_usernames(source)),
+                            temporary, run_size)
+        if os.path.exists(destination):
+            runs.append(destination)
+        files = [open(path, 'rb') for path in runs]
+        output = os.path.join(temporary, 'index')
+        count = 0
+        try:
+            with open(output, 'wb') as file:
+                previous = None
+                # Runs are sorted by bare key, and keys may hold bytes below b'\n'
+                for line in heapq.merge(*files, key=lambda line: line.rstrip(b'\n')):
+                    key = line.rstrip(b'\n')
+                    if key != previous:
+                        file.write(key + b'\n')
+                        count += 1
+                        previous = key
+        finally:
+            for run in files:
+                run.close()
+        os.replace(output, destination)
+    return count
+
+def main(argv=None):
+    """
+    Run the index tool.
+
+    Returns:
+        int: Exit status, 1 if check found a taken username
+    """
+    parser = argparse.ArgumentParser(
+        prog='random-username-index',
+        description="Build and update indexes of taken usernames.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="build an index from username files")
+    build.add_argument('sources', nargs='+', help="files of usernames, one per line ('-' for stdin)")
+    build.add_argument('-o', '--output', required=True, help="index file to write")
+    build.add_argument('--bloom', action='store_true',
+                       help="build a Bloom filter instead of a sorted index")
+    build.add_argument('--capacity', type=int,
+                       help="usernames the Bloom filter is sized for (default: those given)")
+    build.add_argument('--error-rate', type=float, default=1e-4,
+                       help="Bloom filter false positive rate at capacity (default: 0.0001)")
+
+    add = commands.add_parser('add', help="add usernames to an existing index")
+    add.add_argument('index', help="index file")
+    add.add_argument('sources', nargs='+', help="files of usernames, one per line ('-' for stdin)")
+
+    check = commands.add_parser('check', help="report whether usernames are taken")
+    check.add_argument('index', help="index file")
+    check.add_argument('usernames', nargs='+')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'build' and args.bloom:
+            if args.capacity is None and '-' in args.sources:
+                parser.error("--capacity is required when reading standard input")
+            capacity = args.capacity or sum(
+                1 for source in args.sources for _ in read_usernames(source))
+            if os.path.exists(args.output):
+                os.remove(args.output)
+            with BloomFilter.create(args.output, max(capacity, 1), args.error_rate) as bloom:
+                for source in args.sources:
+                    for username in read_usernames(source):
+                        bloom.add(username)
+                print(f"{args.output}: {bloom.count} usernames, {bloom.num_bits // 8:,} bytes, "
+                      f"false positive rate {bloom.error_rate:.2g}")
+        elif args.command == 'build':
+            if os.path.exists(args.output):
+                os.remove(args.output)
+            count = build_sorted_index(args.sources, args.output)
+            print(f"{args.output}: {count} usernames")
+        elif args.command == 'add' and is_bloom_filter(args.index):
+            with BloomFilter(args.index, writable=True) as bloom:
+                for source in args.sources:
+                    for username in read_usernames(source):
+                        bloom.add(username)
+                print(f"{args.index}: {bloom.count} usernames, "
+                      f"false positive rate {bloom.error_rate:.2g}")
+                if bloom.count > bloom.capacity:
+                    print(f"{args.index}: over its capacity of {bloom.capacity}; "
+                          f"rebuild it with a larger --capacity", file=sys.stderr)
+        elif args.command == 'add':
+            count = build_sorted_index(args.sources, args.index)
+            print(f"{args.index}: {count} usernames")
+        else:
+            exclusions = open_exclusions(args.index)
+            taken = [username for username in args.usernames if username in exclusions]
+            for username in args.usernames:
+                print(f"{username}\t{'taken' if username in taken else 'free'}")
+            return 1 if taken else 0
+    except (OSError, ValueError) as e:
+        print(f"random-username-index: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
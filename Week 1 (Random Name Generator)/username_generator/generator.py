@@ -0,0 +1,265 @@
+"""
+Username Generator Core Logic
+Handles the generation of usernames by combining words from predefined lists
+with optional numbers and special characters.
+"""
+
+import random
+from .constants import (SPECIAL_CHARS, DEFAULT_ADJECTIVES, DEFAULT_NOUNS,
+                       ADJECTIVES_FILE, NOUNS_FILE)
+
+def load_words(filename):
+    """
+    Load words from a text file, filtering out empty lines and comments.
+    
+    Args:
+        filename (str): Path to the word list file
+        
+    Returns:
+        list: List of words if file exists, None otherwise
+    """
+    try:
+        with open(filename, 'r') as file:
+            return [line.strip().lower() for line in file if line.strip() and not line.startswith('//')]
+    except FileNotFoundError:
+        return None
+
+# Initialize word lists from files or fallback to defaults
+ADJECTIVES = load_words(ADJECTIVES_FILE) or DEFAULT_ADJECTIVES
+NOUNS = load_words(NOUNS_FILE) or DEFAULT_NOUNS
+
+# Usernames generated at a time by the batch functions
+BATCH_SIZE = 100_000
+
+# Consecutive draws of excluded usernames only before giving up
+MAX_EXCLUDED_DRAWS = 10
+
+def generate_username(adjectives=None, nouns=None, use_numbers=False, num_digits=2, use_special=False):
+    """
+    Generate a unique username by combining an adjective and noun with optional elements.
+    
+    Args:
+        adjectives (list, optional): Custom list of adjectives. Defaults to None.
+        nouns (list, optional): Custom list of nouns. Defaults to None.
+        use_numbers (bool): Include random numbers in username. Defaults to False.
+        num_digits (int): Number of digits to append (1-4). Defaults to 2.
+        use_special (bool): Include special character at end. Defaults to False.
+    
+    Returns:
+        str: Generated username string
+    """
+    adj_list = adjectives if adjectives is not None else ADJECTIVES
+    noun_list = nouns if nouns is not None else NOUNS
+    
+    adjective = random.choice(adj_list).capitalize()
+    noun = random.choice(noun_list).capitalize()
+    username = adjective + noun
+    
+    if use_numbers:
+        max_num = 10 ** num_digits - 1
+        numbers = str(random.randint(0, max_num)).zfill(num_digits)
+        username += numbers
+    
+    if use_special:
+        username += random.choice(SPECIAL_CHARS)
+    
+    return username
+
+def _combination_space(adjectives, nouns, use_numbers, num_digits, use_special):
+    """
+    Return the digits of the username space as lists of values.
+
+    Words are capitalized and de-duplicated, so every combination of
+    positions spells a different username.
+
+    Returns:
+        tuple: (adjectives, nouns, numbers, specials)
+    """
+    adj_list = adjectives if adjectives is not None else ADJECTIVES
+    noun_list = nouns if nouns is not None else NOUNS
+    adj_table = list(dict.fromkeys(word.capitalize() for word in adj_list))
+    noun_table = list(dict.fromkeys(word.capitalize() for word in noun_list))
+    numbers = range(10 ** num_digits) if use_numbers else range(1)
+    specials = SPECIAL_CHARS if use_special else ['']
+    return adj_table, noun_table, numbers, specials
+
+def combination_count(adjectives=None, nouns=None, use_numbers=False, num_digits=2, use_special=False):
+    """
+    Count the distinct usernames the given options can produce.
+    
+    Args:
+        Same as generate_username()
+    
+    Returns:
+        int: Number of adjective, noun, number and special character combinations
+    """
+    adj_table, noun_table, numbers, specials = _combination_space(
+        adjectives, nouns, use_numbers, num_digits, use_special)
+    return len(adj_table) * len(noun_table) * len(numbers) * len(specials)
+
+def generate_unique_usernames(count, adjectives=None, nouns=None, use_numbers=False,
+                              num_digits=2, use_special=False, exclude=None):
+    """
+    Generate distinct usernames, each equally likely.
+    
+    Every username is a position in the space of adjective, noun, number
+    and special character combinations, read as a mixed-radix number.
+    Distinct positions are drawn with random.sample() over the range of
+    the space and decoded digit by digit, so the cost is proportional to
+    count however close it is to the size of the space, and no username
+    is generated twice. Excluded usernames are replaced by further
+    positions drawn one at a time, never one already drawn.
+    
+    Args:
+        count (int): Number of usernames
+        exclude (optional): Taken usernames, any container supporting
+            `in`, such as a set or a source from the exclusions module.
+            Defaults to None.
+        Others: Same as generate_username()
+    
+    Returns:
+        list: Distinct usernames in random order
+    
+    Raises:
+        ValueError: If count is negative or exceeds combination_count(),
+            or fewer than count usernames are not excluded
+    """
+    adj_table, noun_table, numbers, specials = _combination_space(
+        adjectives, nouns, use_numbers, num_digits, use_special)
+    total = len(adj_table) * len(noun_table) * len(numbers) * len(specials)
+    if not 0 <= count <= total:
+        raise ValueError(f"Cannot generate {count} unique usernames; "
+                         f"these options allow at most {total}")
+    
+    def decode(index):
+        index, special = divmod(index, len(specials))
+        index, number = divmod(index, len(numbers))
+        adjective, noun = divmod(index, len(noun_table))
+        username = adj_table[adjective] + noun_table[noun]
+        if use_numbers:
+            username += str(number).zfill(num_digits)
+        return username + specials[special]
+    
+    indices = random.sample(range(total), count)
+    usernames = list(map(decode, indices))
+    if exclude is None:
+        return usernames
+    
+    usernames = [username for username in usernames if username not in exclude]
+    drawn = set(indices) if len(usernames) < count else None
+    while len(usernames) < count:
+        if len(drawn) == total:
+            raise ValueError(f"Cannot generate {count} unique usernames; only "
+                             f"{len(usernames)} usernames these options allow are not taken")
+        index = random.randrange(total)
+        if index not in drawn:
+            drawn.add(index)
+            username = decode(index)
+            if username not in exclude:
+                usernames.append(username)
+    return usernames
+
+def _pair_sampler(first, second, draws):
+    """
+    Return a function drawing k random items of first each joined to a random item of second.
+    
+    When at least as many strings will be drawn as there are pairs, every
+    joined pair is tabulated once, so each draw is a single choice and
+    no strings are joined per username.
+    """
+    if draws >= len(first) * len(second):
+        table = [a + b for a in first for b in second]
+        return lambda k: random.choices(table, k=k)
+    return lambda k: list(map(str.__add__, random.choices(first, k=k), random.choices(second, k=k)))
+
+def iter_username_batches(count, adjectives=None, nouns=None, use_numbers=False, num_digits=2,
+                          use_special=False, batch_size=BATCH_SIZE, exclude=None):
+    """
+    Generate usernames in lists of up to batch_size.
+    
+    Usernames follow the same distribution as generate_username() with
+    the same options; repeats are possible. Words are capitalized and
+    numbers formatted once up front rather than per username, and every
+    batch is drawn with random.choices(). Excluded usernames are dropped
+    and the batch topped up with further draws.
+    
+    Args:
+        count (int): Number of usernames
+        batch_size (int): Most usernames per list
+        exclude (optional): Taken usernames, any container supporting
+            `in`. Defaults to None.
+        Others: Same as generate_username()
+    
+    Yields:
+        list: Usernames
+    
+    Raises:
+        ValueError: If MAX_EXCLUDED_DRAWS draws in a row, of over a million
+            usernames in all, are all excluded
+    """
+    adj_list = adjectives if adjectives is not None else ADJECTIVES
+    noun_list = nouns if nouns is not None else NOUNS
+    adj_table = [word.capitalize() for word in adj_list]
+    noun_table = [word.capitalize() for word in noun_list]
+    number_table = [str(number).zfill(num_digits) for number in range(10 ** num_digits)] if use_numbers else ['']
+    special_table = SPECIAL_CHARS if use_special else ['']
+    
+    draws = min(count, batch_size)
+    prefixes = _pair_sampler(adj_table, noun_table, draws)
+    suffixes = _pair_sampler(number_table, special_table, draws)
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        batch = list(map(str.__add__, prefixes(size), suffixes(size)))
+        if exclude is not None:
+            batch = [username for username in batch if username not in exclude]
+            excluded_draws = 0
+            while len(batch) < size:
+                # Draw extra, as the rejection rate is unknown, twice as many
+                # after each draw that was all excluded, and keep what is needed
+                draw = max(2 * (size - len(batch)), 1024 << excluded_draws)
+                accepted = [username for username in map(str.__add__, prefixes(draw), suffixes(draw))
+                            if username not in exclude]
+                excluded_draws = 0 if accepted else excluded_draws + 1
+                if excluded_draws == MAX_EXCLUDED_DRAWS:
+                    raise ValueError("Almost every username these options allow is excluded")
+                batch.extend(accepted[:size - len(batch)])
+        yield batch
+
+def generate_usernames(count, adjectives=None, nouns=None, use_numbers=False, num_digits=2,
+                       use_special=False, exclude=None):
+    """
+    Generate many usernames at once; see iter_username_batches().
+    
+    Returns:
+        list: count usernames, possibly with repeats
+    """
+    usernames = []
+    for batch in iter_username_batches(count, adjectives, nouns, use_numbers, num_digits, use_special,
+                                       exclude=exclude):
+        usernames.extend(batch)
+    return usernames
+
+def write_usernames(file, count, unique=False, **options):
+    """
+    Write usernames to a text file, one per line, a batch at a time.
+    
+    Args:
+        file: Writable text file
+        count (int): Number of usernames
+        unique (bool): Make every username distinct (see
+            generate_unique_usernames()). Defaults to False.
+        **options: Options of generate_username(), and exclude (see
+            iter_username_batches())
+    
+    Raises:
+        ValueError: If unique is set and count exceeds combination_count(),
+            or too many usernames are excluded
+    """
+    if unique:
+        usernames = generate_unique_usernames(count, **options)
+        batches = (usernames[i:i + BATCH_SIZE] for i in range(0, count, BATCH_SIZE))
+    else:
+        batches = iter_username_batches(count, **options)
+    for batch in batches:
+        file.write('\n'.join(batch))
+        file.write('\n')
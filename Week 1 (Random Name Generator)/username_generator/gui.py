@@ -5,8 +5,8 @@
 import os
 import tkinter as tk
 from tkinter import ttk, messagebox
-from generator import generate_username  # Changed to relative import
-from constants import DEFAULT_ADJECTIVES, DEFAULT_NOUNS  # Changed to relative import
+from .generator import combination_count, generate_unique_usernames
+from .constants import DEFAULT_ADJECTIVES, DEFAULT_NOUNS
 
 class UsernameGeneratorGUI:
     """
@@ -191,19 +191,20 @@ def generate_usernames(self):
                 messagebox.showerror("Error", "Please enter a positive number")
                 return
             num_digits = int(self.num_digits.get()) if self.use_numbers.get() else 0
+            options = {
+                'use_numbers': self.use_numbers.get(),
+                'num_digits': num_digits,
+                'use_special': self.use_special.get()
+            }
             
-            generated = set()
-            attempts = 0
-            max_attempts = num * 100
-
-            while len(generated) < num and attempts < max_attempts:
-                attempts += 1
-                username = generate_username(
-                    use_numbers=self.use_numbers.get(),
-                    num_digits=num_digits,
-                    use_special=self.use_special.get()
-                )
-                generated.add(username)
+            available = combination_count(**options)
+            if num > available:
+                messagebox.showerror(
+                    "Error",
+                    f"These options allow only {available} unique usernames; "
+                    "enable numbers or special characters for more")
+                return
+            generated = generate_unique_usernames(num, **options)
 
             self.result_text.delete(1.0, tk.END)
             for i, uname in enumerate(generated, 1):
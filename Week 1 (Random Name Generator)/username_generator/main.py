@@ -4,7 +4,7 @@
 """
 
 import tkinter as tk
-from gui import UsernameGeneratorGUI  # Changed to relative import
+from .gui import UsernameGeneratorGUI
 
 def main():
     """Initialize and start the username generator application."""
@@ -0,0 +1,151 @@
+"""
+NumPy Username Generation Backend
+Generates very large batches of usernames with NumPy, an optional
+dependency. Word, number and special character choices are drawn as
+integer arrays from a numpy.random.Generator, and the usernames are
+assembled directly into a preallocated byte buffer, one character column
+at a time, so no Python string is created per username.
+
+Usernames follow exactly the distribution of generate_username(): every
+list position, number and special character is equally likely.
+"""
+
+import numpy as np
+from .constants import SPECIAL_CHARS
+from .generator import ADJECTIVES, NOUNS
+
+# Usernames assembled per buffer; small enough for the buffer and index
+# arrays to stay in the CPU cache
+BATCH_SIZE = 1 << 14
+
+NEWLINE = ord('\n')
+
+def _byte_table(strings):
+    """
+    Encode strings as a zero-padded matrix of UTF-8 bytes.
+
+    Returns:
+        tuple: (uint8 matrix with one row per string, array of byte lengths)
+    """
+    encoded = [string.encode('utf-8') for string in strings]
+    lengths = np.array([len(data) for data in encoded], dtype=np.int64)
+    matrix = np.zeros((len(encoded), max(map(len, encoded), default=0)), dtype=np.uint8)
+    for row, data in zip(matrix, encoded):
+        row[:len(data)] = np.frombuffer(data, dtype=np.uint8)
+    return matrix, lengths
+
+def _scatter(buffer, starts, matrix, rows, lengths):
+    """Copy matrix rows (each lengths long) into buffer at the given offsets."""
+    shortest = int(lengths.min()) if len(lengths) else 0
+    for column in range(matrix.shape[1]):
+        if column < shortest:
+            buffer[starts + column] = matrix[rows, column]
+        else:
+            mask = lengths > column
+            buffer[starts[mask] + column] = matrix[rows[mask], column]
+
+class UsernameTables:
+    """
+    Encoded word, number and special character tables for one set of options.
+
+    Attributes:
+        num_digits (int): Digits per number, 0 without numbers
+    """
+
+    def __init__(self, adjectives=None, nouns=None, use_numbers=False, num_digits=2,
+                 use_special=False):
+        adj_list = adjectives if adjectives is not None else ADJECTIVES
+        noun_list = nouns if nouns is not None else NOUNS
+        self._adjectives = _byte_table([word.capitalize() for word in adj_list])
+        self._nouns = _byte_table([word.capitalize() for word in noun_list])
+        self._specials = _byte_table(SPECIAL_CHARS) if use_special else None
+        self.num_digits = num_digits if use_numbers else 0
+
+    def usernames(self, count, rng):
+        """
+        Draw count usernames.
+
+        Args:
+            count (int): Number of usernames
+            rng (numpy.random.Generator): Source of randomness
+
+        Returns:
+            bytes: UTF-8 usernames, each followed by a newline
+        """
+        adjective_matrix, adjective_lengths = self._adjectives
+        noun_matrix, noun_lengths = self._nouns
+        adjectives = rng.integers(0, len(adjective_matrix), count)
+        nouns = rng.integers(0, len(noun_matrix), count)
+        adjective_lengths = adjective_lengths[adjectives]
+        noun_lengths = noun_lengths[nouns]
+        lengths = adjective_lengths + noun_lengths + (self.num_digits + 1)
+        if self._specials is not None:
+            specials = rng.integers(0, len(self._specials[0]), count)
+            special_lengths = self._specials[1][specials]
+            lengths += special_lengths
+
+        ends = np.cumsum(lengths)
+        position = ends - lengths
+        buffer = np.empty(int(ends[-1]) if count else 0, dtype=np.uint8)
+        _scatter(buffer, position, adjective_matrix, adjectives, adjective_lengths)
+        position += adjective_lengths
+        _scatter(buffer, position, noun_matrix, nouns, noun_lengths)
+        position += noun_lengths
+        if self.num_digits:
+            numbers = rng.integers(0, 10 ** self.num_digits, count)
+            for place in range(self.num_digits - 1, -1, -1):
+                numbers, digit = np.divmod(numbers, 10)
+                buffer[position + place] = ord('0') + digit
+            position += self.num_digits
+        if self._specials is not None:
+            _scatter(buffer, position, self._specials[0], specials, special_lengths)
+            position += special_lengths
+        buffer[position] = NEWLINE
+        return buffer.tobytes()
+
+def iter_username_blocks(count, adjectives=None, nouns=None, use_numbers=False, num_digits=2,
+                         use_special=False, rng=None, batch_size=BATCH_SIZE):
+    """
+    Generate usernames as blocks of newline-terminated UTF-8 bytes.
+
+    Args:
+        count (int): Number of usernames
+        rng (numpy.random.Generator or int, optional): Generator or seed;
+            a fresh unseeded generator by default
+        batch_size (int): Most usernames per block
+        Others: Same as generate_username()
+
+    Yields:
+        bytes: Up to batch_size usernames
+    """
+    rng = np.random.default_rng(rng)
+    tables = UsernameTables(adjectives, nouns, use_numbers, num_digits, use_special)
+    for start in range(0, count, batch_size):
+        yield tables.usernames(min(batch_size, count - start), rng)
+
+def generate_usernames(count, adjectives=None, nouns=None, use_numbers=False, num_digits=2,
+                       use_special=False, rng=None):
+    """
+    Generate many usernames; see iter_username_blocks().
+
+    Returns:
+        list: count usernames, possibly with repeats
+    """
+    usernames = []
+    for block in iter_username_blocks(count, adjectives, nouns, use_numbers, num_digits,
+                                      use_special, rng):
+        usernames.extend(block.decode('utf-8').split('\n')[:-1])
+    return usernames
+
+def write_usernames(file, count, rng=None, **options):
+    """
+    Write usernames to a text file, one per line.
+
+    Args:
+        file: Writable text file
+        count (int): Number of usernames
+        rng (numpy.random.Generator or int, optional): Generator or seed
+        **options: Options of generate_username()
+    """
+    for block in iter_username_blocks(count, rng=rng, **options):
+        file.write(block.decode('utf-8'))
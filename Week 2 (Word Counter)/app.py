@@ -5,49 +5,402 @@ A Flask-based web application that provides real-time word counting functionalit
 with support for light/dark themes and error handling.
 """
 
-from flask import Flask, render_template, request, jsonify
+import json
+import os
+import socket
+import time
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge, UnsupportedMediaType
+# count_words is re-exported for code that imports it from app
+from wordcounter.wordcount import (TOKENIZATION_MODES, count_stream, count_words,  # noqa: F401
+                                   text_stats)
+from documents import DocumentStore, EditError, SQLiteDocuments
+from wordcounter.frequencies import FrequencyStore
+from cache import ResultCache, content_key
+from parallel import CountCancelled, count_batch, count_text
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Registry
+from profiling import SampledProfiler
+from compression import (READER_KEY, DecodedSizeError, DecompressRequest, MIN_COMPRESS_BYTES,
+                         best_encoding, encode)
+from assets import AssetStore
+from ratelimit import MemoryBuckets, SQLiteBuckets, retry_after
 
 app = Flask(__name__)
+# Request bodies may be sent gzip, deflate or Brotli compressed
+app.wsgi_app = DecompressRequest(app.wsgi_app)
 
-def count_words(text):
+# Named documents are saved to DOCUMENTS_DB, an SQLite file (by default
+# documents.sqlite3 in the instance folder), and survive restarts;
+# DOCUMENTS_DB='' keeps them in memory only. Documents in memory are
+# limited to DOCUMENT_MEMORY_BYTES, evicting the least recently used.
+DOCUMENTS_DB = os.environ.get('DOCUMENTS_DB', os.path.join(app.instance_path, 'documents.sqlite3'))
+DOCUMENT_MEMORY_BYTES = int(os.environ.get('DOCUMENT_MEMORY_BYTES', 64 << 20))
+if DOCUMENTS_DB:
+    os.makedirs(os.path.dirname(os.path.abspath(DOCUMENTS_DB)), exist_ok=True)
+documents = DocumentStore(DOCUMENT_MEMORY_BYTES,
+                          SQLiteDocuments(DOCUMENTS_DB) if DOCUMENTS_DB else None)
+
+# Static files under content-hashed names, cached by browsers for a year
+ASSET_MAX_AGE = 365 * 24 * 60 * 60
+assets = AssetStore(app.static_folder)
+app.jinja_env.globals['asset_url'] = assets.url
+
+# Word and n-gram frequency index queried on /frequencies, kept in
+# FREQUENCY_INDEX (by default the frequencies folder in the instance
+# folder) with n-grams of up to FREQUENCY_MAX_N words
+FREQUENCY_INDEX = os.environ.get('FREQUENCY_INDEX', os.path.join(app.instance_path, 'frequencies'))
+FREQUENCY_MAX_N = int(os.environ.get('FREQUENCY_MAX_N', '2'))
+frequencies = FrequencyStore(FREQUENCY_INDEX, FREQUENCY_MAX_N)
+
+# Upper bound for the number of terms a /frequencies query may request
+MAX_FREQUENCY_TERMS = 10000
+
+# Memory budget for cached /count and /stats responses
+RESULT_CACHE_BYTES = 8 * 1024 * 1024
+results = ResultCache(RESULT_CACHE_BYTES)
+
+# Upper bound for the number of top words a client may request
+MAX_TOP_WORDS = 100
+
+# Status for requests abandoned by the client ("Client Closed Request")
+CLIENT_CLOSED_REQUEST = 499
+
+# Request metrics, served on /metrics
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = tuple(4 ** n for n in range(4, 14))  # 256 bytes to 64MB
+metrics = Registry()
+requests_total = metrics.counter(
+    'wordcount_http_requests_total', 'Requests handled.', ('route', 'method', 'status'))
+request_duration = metrics.histogram(
+    'wordcount_http_request_duration_seconds',
+    'Time to handle a request, including streaming the response.', LATENCY_BUCKETS, ('route',))
+request_size = metrics.histogram(
+    'wordcount_http_request_size_bytes',
+    'Request body size, for requests with a Content-Length.', SIZE_BUCKETS, ('route',))
+metrics.gauge('wordcount_result_cache_hits_total', 'Result cache lookups that found an entry.',
+              lambda: results.hits, 'counter')
+metrics.gauge('wordcount_result_cache_misses_total', 'Result cache lookups that did not.',
+              lambda: results.misses, 'counter')
+metrics.gauge('wordcount_result_cache_evictions_total', 'Result cache entries evicted.',
+              lambda: results.evictions, 'counter')
+metrics.gauge('wordcount_result_cache_hit_ratio', 'Share of result cache lookups that hit.',
+              lambda: results.stats()['hit_ratio'])
+metrics.gauge('wordcount_result_cache_bytes', 'Memory charged to the result cache.',
+              lambda: results.stats()['bytes'])
+metrics.gauge('wordcount_documents', 'Documents held in memory.',
+              lambda: documents.stats()['documents'])
+metrics.gauge('wordcount_documents_bytes', 'Approximate memory held by documents.',
+              lambda: documents.stats()['bytes'])
+
+# Admission control. Request bodies are capped at MAX_CONTENT_LENGTH;
+# bodies parsed in memory at MAX_BUFFERED_BYTES, above which text has to
+# be streamed (text/plain to /count, or /count/stream). Declared sizes
+# are checked before the body is read.
+MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 256 << 20))
+MAX_BUFFERED_BYTES = int(os.environ.get('MAX_BUFFERED_BYTES', 16 << 20))
+app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+
+# Endpoints that read their body as a stream
+STREAMING_ENDPOINTS = {'count_stream_route', 'count_batch_route', 'index_documents'}
+
+# Per-client token buckets: RATE_LIMIT requests per second in bursts of up
+# to RATE_LIMIT_BURST, kept in this process or, if RATE_LIMIT_STORE names
+# an SQLite file, shared by all workers on the host. RATE_LIMIT=0 turns
+# limiting off. Each started RATE_LIMIT_BYTES_PER_TOKEN of body costs one
+# more token.
+RATE_LIMIT = float(os.environ.get('RATE_LIMIT', '20'))
+RATE_LIMIT_BURST = float(os.environ.get('RATE_LIMIT_BURST', '40'))
+RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE')
+RATE_LIMIT_BYTES_PER_TOKEN = 1 << 20
+# Cheap endpoints that are never limited
+RATE_LIMIT_EXEMPT = {'home', 'asset', 'static', 'metrics_route', 'cache_stats'}
+if RATE_LIMIT <= 0:
+    buckets = None
+elif RATE_LIMIT_STORE:
+    buckets = SQLiteBuckets(RATE_LIMIT_STORE, RATE_LIMIT, RATE_LIMIT_BURST)
+else:
+    buckets = MemoryBuckets(RATE_LIMIT, RATE_LIMIT_BURST)
+
+# Profiling is off unless PROFILE_DIR is set; PROFILE_SAMPLE_RATE is the
+# fraction of requests profiled (see profiling.py)
+PROFILE_DIR = os.environ.get('PROFILE_DIR')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0.01'))
+
+def top_words_param(value):
+    """Parse the requested number of top words, clamped to 0..MAX_TOP_WORDS."""
+    return min(max(int(value), 0), MAX_TOP_WORDS)
+
+def mode_param(value):
+    """Validate a requested tokenization mode, defaulting to 'whitespace'."""
+    mode = value or 'whitespace'
+    if mode not in TOKENIZATION_MODES:
+        raise ValueError(f"Unknown tokenization mode: {mode!r}")
+    return mode
+
+def client_disconnected():
+    """
+    Return True if the client of the current request has hung up.
+    
+    Peeks at the connection without consuming anything: a closed socket
+    reads as empty. Only servers that expose a plain socket in the WSGI
+    environ (gunicorn and the development server, without TLS) can be
+    checked; otherwise this is always False and the work simply runs to
+    completion.
+    """
+    sock = request.environ.get('gunicorn.socket') or request.environ.get('werkzeug.socket')
+    flags = getattr(socket, 'MSG_DONTWAIT', None)
+    if sock is None or flags is None:
+        return False
+    try:
+        return sock.recv(1, socket.MSG_PEEK | flags) == b''
+    except BlockingIOError:
+        return False
+    except ValueError:
+        # ssl.SSLSocket.recv() accepts no flags; the state is unknown
+        return False
+    except OSError:
+        return True
+
+def cached_json(etag, build):
     """
-    Count words in the given text with enhanced error handling and processing.
+    Serve a JSON result from the result cache.
+    
+    Answers 304 without a body when the client already holds the result
+    (If-None-Match), returns the cached payload when there is one, and
+    otherwise calls build() for the payload dict and caches it.
     
     Args:
-        text (str): Input text to process
-        
-    Returns:
-        int: Number of words in the text
-        
-    Note:
-        - Handles empty input and whitespace
-        - Filters out pure punctuation
-        - Considers hyphenated words as single words
-    """
-    # Handle empty or whitespace-only input
-    if not text or text.isspace():
-        return 0
-        
-    # Remove extra whitespace and split into words
-    words = text.strip().split()
+        etag (str): Content key from content_key(), also used as the ETag
+        build (callable): Computes the payload on a cache miss
+    """
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        body = results.get(etag)
+        if body is None:
+            body = jsonify(build()).get_data()
+            results.put(etag, body, len(body))
+        response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and time it once its response has been sent."""
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    started = g.get('request_started', time.perf_counter())
+    method, status = request.method, str(response.status_code)
+    if request.content_length is not None:
+        request_size.observe(request.content_length, route)
+    
+    def record():
+        requests_total.inc(route, method, status)
+        request_duration.observe(time.perf_counter() - started, route)
+    
+    response.call_on_close(record)
+    return response
+
+if PROFILE_DIR:
+    profiler = SampledProfiler(PROFILE_DIR, PROFILE_SAMPLE_RATE)
+    
+    @app.before_request
+    def start_profile():
+        g.profile = profiler.start()
+    
+    @app.teardown_request
+    def stop_profile(exc):
+        # Runs after a streamed response has finished, since the stream
+        # keeps the request context alive
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profiler.stop(profile, request.endpoint or 'unmatched')
+
+def text_payload():
+    """
+    Read the text and tokenization mode of a counting request.
+    
+    The body is either JSON with 'text' and optional 'mode' fields, or
+    the raw text as text/plain (charset parameter honoured, UTF-8 by
+    default) with the mode in a 'mode' query parameter, which spares
+    large texts the JSON escaping.
+    
+    Raises:
+        ValueError: If the text or mode is invalid
+        UnsupportedMediaType: If the body is neither JSON nor text/plain
+    """
+    if request.mimetype == 'text/plain':
+        return plain_text_body(), mode_param(request.args.get('mode'))
+    if not request.is_json:
+        raise UnsupportedMediaType("Expected a JSON or text/plain body")
+    payload = json_payload()
+    text = payload.get('text', '')
+    if not isinstance(text, str):
+        raise ValueError("'text' must be a string")
+    return text, mode_param(payload.get('mode'))
+
+def plain_text_body():
+    """Read a text/plain body, up to MAX_BUFFERED_BYTES, in its declared charset (UTF-8 by default)."""
+    encoding = request.mimetype_params.get('charset', 'utf-8')
+    return buffered_body().decode(encoding)
+
+def json_payload(expected=dict):
+    """
+    Read and parse a JSON body, up to MAX_BUFFERED_BYTES.
     
-    # Filter out empty strings and pure punctuation
-    words = [word for word in words if any(c.isalnum() for c in word)]
+    Args:
+        expected (type): Type the top-level value must have
     
-    return len(words)
+    Raises:
+        UnsupportedMediaType: If the body is not JSON
+        ValueError: If it is not valid JSON or not of the expected type
+    """
+    if not request.is_json:
+        raise UnsupportedMediaType("Expected a JSON body")
+    payload = json.loads(buffered_body())
+    if not isinstance(payload, expected):
+        raise ValueError(f"Expected a JSON {'object' if expected is dict else 'array'}")
+    return payload
+
+def compressed_response(body, mimetype):
+    """Build a response, compressed if the client accepts an encoding."""
+    response = app.response_class(body, mimetype=mimetype)
+    response.vary.add('Accept-Encoding')
+    encoding = best_encoding(request.accept_encodings)
+    data = response.get_data()
+    if encoding and len(data) >= MIN_COMPRESS_BYTES:
+        response.set_data(encode(data, encoding))
+        response.content_encoding = encoding
+    return response
+
+def error_status(e):
+    """
+    Status for an error caught in a route: 413 for oversized bodies, 415
+    for unsupported content types, else 400.
+    """
+    if isinstance(e, DecodedSizeError):
+        return 413
+    if isinstance(e, HTTPException):
+        return e.code
+    return 400
+
+def error_message(e):
+    """Message for an error caught in a route, without the status line of HTTP errors."""
+    return e.description if isinstance(e, HTTPException) else str(e)
+
+def streams_body():
+    """Return True if the current request's body is read as a stream."""
+    return request.endpoint in STREAMING_ENDPOINTS or (
+        request.endpoint == 'count' and request.mimetype == 'text/plain')
+
+@app.before_request
+def admit_request():
+    """
+    Turn away requests over the rate limit (429) or the size limits (413).
+    
+    Runs before the body is read, so rejected bodies cost nothing to
+    parse. Sizes can only be checked up front when the request declares
+    a Content-Length; other bodies are cut off as they are read.
+    """
+    length = request.content_length
+    if buckets is not None and request.endpoint not in RATE_LIMIT_EXEMPT:
+        cost = 1 + (length or 0) // RATE_LIMIT_BYTES_PER_TOKEN
+        wait = buckets.take(request.remote_addr or '', cost)
+        if wait:
+            response = jsonify({'error': 'Too many requests', 'status': 'error'})
+            response.status_code = 429
+            response.headers['Retry-After'] = retry_after(wait)
+            return response
+    
+    streamed = streams_body()
+    limit = MAX_CONTENT_LENGTH if streamed else MAX_BUFFERED_BYTES
+    reader = request.environ.get(READER_KEY)
+    if streamed and reader is not None:
+        # Compressed streamed bodies may decode to as much as an uncompressed upload
+        reader.max_bytes = app.config['MAX_CONTENT_LENGTH']
+    if length is not None and length > limit:
+        message = f"Request body exceeds {limit} bytes"
+        if limit < MAX_CONTENT_LENGTH:
+            message += "; send large text as text/plain to /count or to /count/stream"
+        return jsonify({'error': message, 'status': 'error'}), 413
+
+@app.errorhandler(RequestEntityTooLarge)
+def too_large(e):
+    return jsonify({'error': 'Request body too large', 'status': 'error'}), 413
+
+def buffered_body():
+    """
+    Read the whole request body, up to MAX_BUFFERED_BYTES.
+    
+    Raises:
+        RequestEntityTooLarge: If the body is longer
+    """
+    data = request.stream.read(MAX_BUFFERED_BYTES + 1)
+    if len(data) > MAX_BUFFERED_BYTES:
+        raise RequestEntityTooLarge(f"Request body exceeds {MAX_BUFFERED_BYTES} bytes")
+    return data
+
+def ndjson_documents(stream):
+    """Parse an NDJSON body lazily; lines that are not valid JSON yield None."""
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
 
 @app.route('/')
 def home():
     """Render the main page of the application."""
-    return render_template('index.html')
+    return compressed_response(render_template('index.html'), 'text/html')
+
+@app.route('/assets/<name>')
+def asset(name):
+    """
+    Serve a static file by its content-hashed name (see assets.py).
+    
+    The name changes with the content, so responses are immutable and
+    cached for a year, compressed with the best encoding the client
+    accepts.
+    """
+    static = assets.get(name)
+    if static is None:
+        return jsonify({'error': 'Unknown asset', 'status': 'error'}), 404
+    if request.if_none_match.contains_weak(static.etag):
+        response = app.response_class(status=304)
+    else:
+        encoding = best_encoding(request.accept_encodings, static.bodies)
+        response = app.response_class(static.bodies[encoding], mimetype=static.mimetype)
+        response.content_encoding = encoding
+    response.set_etag(static.etag, weak=True)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = ASSET_MAX_AGE
+    response.cache_control.immutable = True
+    return response
 
 @app.route('/count', methods=['POST'])
 def count():
     """
     Handle word counting requests from the frontend.
     
+    Results are cached by content hash and carry it as their ETag; send
+    it back in If-None-Match to get a 304 when the text is unchanged.
+    Counting a large text stops early if the client disconnects.
+    
     Expects:
-        JSON payload with 'text' field
+        JSON payload with 'text' field and optional 'mode' (tokenization
+        mode: 'whitespace', 'uax29' or 'cjk'; default 'whitespace'), or
+        the text as a text/plain body with an optional 'mode' query
+        parameter. Either may be compressed (Content-Encoding gzip,
+        deflate or br). JSON bodies are limited to MAX_BUFFERED_BYTES;
+        larger text/plain bodies are counted as they arrive, like
+        /count/stream.
     
     Returns:
         JSON response with:
@@ -56,17 +409,439 @@ def count():
         - error: error message (if applicable)
     """
     try:
-        text = request.json.get('text', '')
-        word_count = count_words(text)
+        if request.mimetype == 'text/plain' and (
+                request.content_length is None or request.content_length > MAX_BUFFERED_BYTES):
+            # Too large (or of unknown size) to buffer: count it as it arrives
+            return count_stream_route()
+        text, mode = text_payload()
+        return cached_json(content_key('count', text, mode), lambda: {
+            'count': count_text(text, mode, client_disconnected),
+            'status': 'success'
+        })
+    except CountCancelled:
+        return '', CLIENT_CLOSED_REQUEST
+    except Exception as e:
         return jsonify({
-            'count': word_count,
+            'error': error_message(e),
+            'status': 'error'
+        }), error_status(e)
+
+@app.route('/count/stream', methods=['POST'])
+def count_stream_route():
+    """
+    Count words in a large document without buffering the request body.
+    
+    Expects:
+        Either a text/plain body (charset parameter honoured, UTF-8 by
+        default), or a multipart/form-data upload with one or more files.
+        Uploaded files are spooled to disk by the form parser and read
+        back in chunks. An optional 'mode' query parameter selects the
+        tokenization mode.
+    
+    Returns:
+        JSON response with:
+        - count: number of words (summed over all uploaded files)
+        - files: per-file counts (multipart uploads only)
+        - status: 'success' or 'error'
+        - error: error message (if applicable)
+    """
+    try:
+        mode = mode_param(request.args.get('mode'))
+        if request.mimetype == 'multipart/form-data':
+            files = [
+                {'name': upload.filename, 'count': count_stream(upload.stream, mode=mode)}
+                for upload in request.files.values()
+            ]
+            if not files:
+                raise ValueError("No file uploaded")
+            return jsonify({
+                'count': sum(f['count'] for f in files),
+                'files': files,
+                'status': 'success'
+            })
+        
+        encoding = request.mimetype_params.get('charset', 'utf-8')
+        return jsonify({
+            'count': count_stream(request.stream, encoding, mode),
             'status': 'success'
         })
     except Exception as e:
         return jsonify({
-            'error': str(e),
+            'error': error_message(e),
             'status': 'error'
-        }), 400
+        }), error_status(e)
+
+@app.route('/count/batch', methods=['POST'])
+def count_batch_route():
+    """
+    Count words in many documents with one request.
+    
+    Large batches are spread over a process pool. Results are streamed
+    back as NDJSON, one line per document in input order, as soon as
+    each group of documents has been counted. The rest of the batch is
+    dropped if the client disconnects.
+    
+    Expects:
+        Either a JSON array (application/json) or an NDJSON stream
+        (application/x-ndjson, read incrementally) of documents. Each
+        document is a string or an object with 'text' and optional 'id'.
+        An optional 'mode' query parameter selects the tokenization mode.
+    
+    Returns:
+        NDJSON lines with:
+        - index: position of the document in the batch
+        - id: the document's id (if given)
+        - count: number of words
+        - error: error message, instead of count, for invalid documents
+    """
+    try:
+        mode = mode_param(request.args.get('mode'))
+    except ValueError as e:
+        return jsonify({'error': error_message(e), 'status': 'error'}), 400
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        batch = ndjson_documents(request.stream)
+    else:
+        try:
+            if not request.is_json:
+                raise UnsupportedMediaType("Expected a JSON array or an NDJSON body")
+            batch = json_payload(list)
+        except Exception as e:
+            return jsonify({'error': error_message(e), 'status': 'error'}), error_status(e)
+    
+    def generate():
+        try:
+            for result in count_batch(batch, mode, client_disconnected):
+                yield json.dumps(result) + '\n'
+        except CountCancelled:
+            return
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/stats', methods=['POST'])
+def stats():
+    """
+    Compute rich text statistics in a single pass.
+    
+    Cached and revalidated like /count.
+    
+    Expects:
+        JSON payload with 'text' field and optional 'top' (number of most
+        frequent words, default 10), or the text as a text/plain body with
+        an optional 'top' query parameter. Bodies are limited to
+        MAX_BUFFERED_BYTES.
+    
+    Returns:
+        JSON response with:
+        - stats: words, characters, characters_no_spaces, sentences,
+          paragraphs, unique_words, top_words and reading_time_seconds
+        - status: 'success' or 'error'
+        - error: error message (if applicable)
+    """
+    try:
+        if request.mimetype == 'text/plain':
+            text = plain_text_body()
+            top_n = top_words_param(request.args.get('top', 10))
+        else:
+            payload = json_payload()
+            text = payload.get('text', '')
+            if not isinstance(text, str):
+                raise ValueError("'text' must be a string")
+            top_n = top_words_param(payload.get('top', 10))
+        return cached_json(content_key('stats', text, top_n), lambda: {
+            'stats': text_stats(text, top_n),
+            'status': 'success'
+        })
+    except Exception as e:
+        return jsonify({
+            'error': error_message(e),
+            'status': 'error'
+        }), error_status(e)
+
+@app.route('/documents', methods=['POST'])
+def create_document():
+    """
+    Start an incremental counting session for a document.
+    
+    Expects:
+        JSON payload with 'text' field and optional 'mode' (tokenization
+        mode, kept for the life of the document), or the text as a
+        text/plain body with an optional 'mode' query parameter; either
+        may be compressed, as for /count
+    
+    Returns:
+        JSON response with:
+        - id: document id to use for later edits
+        - version: document version (0)
+        - count: number of words
+        - status: 'success' or 'error'
+    """
+    try:
+        text, mode = text_payload()
+        with documents.lock:
+            document = documents.create(text, mode)
+            return jsonify({
+                'id': document.id,
+                'version': document.version,
+                'count': document.count,
+                'status': 'success'
+            }), 201
+    except Exception as e:
+        return jsonify({
+            'error': error_message(e),
+            'status': 'error'
+        }), error_status(e)
+
+@app.route('/documents/<name>', methods=['PUT'])
+def save_document(name):
+    """
+    Save a document under a name, creating or replacing it.
+    
+    Named documents are kept on the server (see DOCUMENTS_DB) and can be
+    reopened later with GET /documents/<name>. Replacing a document with
+    an edited copy only counts the paragraphs that changed.
+    
+    Expects:
+        The text and optional mode, as for POST /documents
+    
+    Returns:
+        JSON response with id (the name), version, count and status:
+        201 for a new document, 200 for a replaced one
+    """
+    try:
+        text, mode = text_payload()
+        with documents.lock:
+            existed = documents.get(name) is not None
+            document = documents.create(text, mode, name=name)
+            return jsonify({
+                'id': document.id,
+                'version': document.version,
+                'count': document.count,
+                'status': 'success'
+            }), 200 if existed else 201
+    except Exception as e:
+        return jsonify({
+            'error': error_message(e),
+            'status': 'error'
+        }), error_status(e)
+
+@app.route('/documents/<doc_id>', methods=['GET'])
+def open_document(doc_id):
+    """
+    Return a document's text and count, to reopen it.
+    
+    Returns:
+        JSON response with id, mode, version, count, text and status;
+        404 for unknown documents
+    """
+    with documents.lock:
+        document = documents.get(doc_id)
+        if document is None:
+            return jsonify({'error': 'Unknown document', 'status': 'error'}), 404
+        body = json.dumps({
+            'id': document.id,
+            'mode': document.mode,
+            'version': document.version,
+            'count': document.count,
+            'text': document.text,
+            'status': 'success'
+        })
+    return compressed_response(body, 'application/json')
+
+@app.route('/documents', methods=['GET'])
+def list_documents():
+    """List saved documents with their name, mode, version, count and update time."""
+    with documents.lock:
+        saved = documents.list()
+    return jsonify({'documents': saved, 'status': 'success'})
+
+@app.route('/documents/<doc_id>', methods=['PATCH'])
+def edit_document(doc_id):
+    """
+    Apply edits to a document and return its new word count.
+    
+    Expects:
+        JSON payload with:
+        - version: the document version the edits were made against
+        - edits: list of {start, end, text}, offsets in UTF-16 code units
+    
+    Returns:
+        JSON response with id, version, count and status. Unknown
+        documents get a 404 and stale versions a 409 (with the current
+        version); in both cases the client should create the document again.
+        Named documents are saved after every batch. Bodies that are not
+        JSON get a 415, and bodies over MAX_BUFFERED_BYTES a 413.
+    """
+    try:
+        payload = json_payload()
+        with documents.lock:
+            document = documents.get(doc_id)
+            if document is None:
+                return jsonify({'error': 'Unknown document', 'status': 'error'}), 404
+            if payload.get('version') != document.version:
+                return jsonify({
+                    'error': 'Version mismatch',
+                    'version': document.version,
+                    'status': 'error'
+                }), 409
+            document.apply_edits(payload.get('edits', []))
+            documents.update(document)
+            return jsonify({
+                'id': document.id,
+                'version': document.version,
+                'count': document.count,
+                'status': 'success'
+            })
+    except (EditError, HTTPException, ValueError, AttributeError, TypeError) as e:
+        return jsonify({
+            'error': error_message(e),
+            'status': 'error'
+        }), error_status(e)
+
+@app.route('/documents/<doc_id>/stats', methods=['GET'])
+def document_stats(doc_id):
+    """
+    Compute rich text statistics for a stored document.
+    
+    Lets the page refresh its statistics panel without uploading the
+    text again. Accepts an optional 'top' query parameter. The ETag
+    covers the document id and version as well as its text, so browsers
+    revalidate the response on their own and get a 304 while the
+    document is unchanged.
+    
+    Returns:
+        JSON response with id, version, stats and status; 404 for
+        unknown documents.
+    """
+    try:
+        top_n = top_words_param(request.args.get('top', 10))
+    except ValueError as e:
+        return jsonify({'error': error_message(e), 'status': 'error'}), 400
+    with documents.lock:
+        document = documents.get(doc_id)
+        if document is None:
+            return jsonify({'error': 'Unknown document', 'status': 'error'}), 404
+        version, text = document.version, document.text
+    etag = content_key('document-stats', text, doc_id, version, top_n)
+    return cached_json(etag, lambda: {
+        'id': doc_id,
+        'version': version,
+        'stats': text_stats(text, top_n),
+        'status': 'success'
+    })
+
+@app.route('/frequencies', methods=['GET'])
+def frequencies_route():
+    """
+    Return the most frequent words or n-grams across the indexed documents.
+    
+    Answered from the index built by POST /frequencies (or the
+    wordcount-index command); the documents are not read again.
+    
+    Expects:
+        Optional query parameters 'n' (n-gram size, default 1) and 'k'
+        (number of terms, default 20, at most MAX_FREQUENCY_TERMS)
+    
+    Returns:
+        JSON response with:
+        - n, mode: n-gram size and tokenization mode of the index
+        - documents: number of documents indexed
+        - terms: number of distinct n-grams
+        - total: number of n-grams
+        - top: list of {term, count}, most frequent first
+        - status: 'success' or 'error' (404 when nothing is indexed)
+    """
+    try:
+        n = int(request.args.get('n', 1))
+        k = min(max(int(request.args.get('k', 20)), 0), MAX_FREQUENCY_TERMS)
+        index = frequencies.current()
+        if index is None:
+            return jsonify({'error': 'No documents have been indexed', 'status': 'error'}), 404
+        try:
+            top = index.top(n, k)
+        except FileNotFoundError:
+            # Replaced twice and deleted while being read; ask the new one
+            index = frequencies.current()
+            top = index.top(n, k)
+    except ValueError as e:
+        return jsonify({'error': error_message(e), 'status': 'error'}), 400
+    return jsonify({
+        'n': n,
+        'mode': index.mode,
+        'documents': index.documents,
+        'terms': index.tables[n]['terms'],
+        'total': index.tables[n]['total'],
+        'top': [{'term': term, 'count': count} for term, count in top],
+        'status': 'success'
+    })
+
+@app.route('/frequencies', methods=['POST'])
+def index_documents():
+    """
+    Add documents to the frequency index.
+    
+    The documents are read as a stream and merged into the index once
+    the body is complete; until then queries see the previous index.
+    
+    Expects:
+        A batch of documents as for /count/batch: a JSON array or an
+        NDJSON stream of strings or objects with 'text'. An optional
+        'mode' query parameter gives the tokenization mode, which must
+        match the existing index.
+    
+    Returns:
+        JSON response with documents and words added, skipped (entries
+        without text) and status
+    """
+    try:
+        mode = mode_param(request.args.get('mode'))
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            batch = ndjson_documents(request.stream)
+        else:
+            batch = json.loads(buffered_body())
+            if not isinstance(batch, list):
+                raise ValueError('Expected a JSON array or an NDJSON body')
+        skipped = 0
+        with frequencies.update(mode) as builder:
+            for document in batch:
+                if isinstance(document, dict):
+                    document = document.get('text')
+                if isinstance(document, str):
+                    builder.add_text(document)
+                else:
+                    skipped += 1
+        return jsonify({
+            'documents': builder.documents,
+            'words': builder.words,
+            'skipped': skipped,
+            'status': 'success'
+        })
+    except Exception as e:
+        return jsonify({
+            'error': error_message(e),
+            'status': 'error'
+        }), error_status(e)
+
+@app.route('/cache', methods=['GET'])
+def cache_stats():
+    """Report result cache size and hit/miss counters."""
+    return jsonify({
+        'cache': results.stats(),
+        'status': 'success'
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    """Expose request and cache metrics in the Prometheus text format."""
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/documents/<doc_id>', methods=['DELETE'])
+def delete_document(doc_id):
+    """End an incremental counting session."""
+    with documents.lock:
+        deleted = documents.delete(doc_id)
+    return jsonify({'status': 'success' if deleted else 'error'}), 200 if deleted else 404
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    # Development server only; set FLASK_DEBUG=1 for the debugger and
+    # see gunicorn.conf.py, serve.py and asgi.py for production serving
+    app.run()
@@ -0,0 +1,76 @@
+"""
+ASGI Entry Point
+---------------
+Serves the Flask application under an ASGI server such as uvicorn.
+
+Request bodies are read completely on the event loop before the request
+is handed to one of the adapter's worker threads, so slow clients
+trickling in text do not occupy a thread. The streaming endpoints are
+the exception: they read their body incrementally to keep memory flat,
+and get it passed through as it arrives. So do bodies larger than the
+app's MAX_BUFFERED_BYTES, which it streams or rejects.
+
+Usage:
+    uvicorn asgi:application --workers 4
+"""
+
+from a2wsgi import WSGIMiddleware
+from app import MAX_BUFFERED_BYTES, STREAMING_ENDPOINTS, app
+
+# Paths of the endpoints that consume the request body as a stream
+STREAMING_PATHS = {rule.rule for rule in app.url_map.iter_rules()
+                   if rule.endpoint in STREAMING_ENDPOINTS}
+
+class BufferedBody:
+    """ASGI middleware that delivers the request body in one message."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (scope['type'] != 'http' or scope['path'] in STREAMING_PATHS
+                or self._declared_length(scope) > MAX_BUFFERED_BYTES):
+            await self.app(scope, receive, send)
+            return
+
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            chunks.append(message.get('body', b''))
+            size += len(chunks[-1])
+            if not message.get('more_body'):
+                break
+            if size > MAX_BUFFERED_BYTES:
+                # Too large to hold: hand over what arrived, then the rest
+                # as it comes
+                break
+        request = {'type': 'http.request', 'body': b''.join(chunks),
+                   'more_body': message.get('more_body', False)}
+        delivered = False
+
+        async def replay():
+            nonlocal delivered
+            if delivered:
+                # Later calls read the rest of the body, or wait for the
+                # client to disconnect
+                return await receive()
+            delivered = True
+            return request
+
+        await self.app(scope, replay, send)
+
+    @staticmethod
+    def _declared_length(scope):
+        """Return the request's Content-Length, or 0 if it has none."""
+        for name, value in scope['headers']:
+            if name == b'content-length':
+                try:
+                    return int(value)
+                except ValueError:
+                    return 0
+        return 0
+
+application = BufferedBody(WSGIMiddleware(app, workers=16))
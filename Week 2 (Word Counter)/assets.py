@@ -0,0 +1,112 @@
+"""
+Static Assets
+------------
+Serves the files in static/ under content-hashed names such as
+``style.3f9a0c1b2d.css``. A name changes whenever the file does, so
+responses can be cached by browsers for a year without revalidation.
+Each file is compressed once, with every encoding on offer, when it is
+first requested or after it changes on disk. A process that has not
+rendered the page yet resolves hashed names from the name itself, so
+any worker can serve any asset.
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from compression import ENCODINGS, MIN_COMPRESS_BYTES, encode
+
+# Hex digits of the content hash in asset names
+HASH_LENGTH = 10
+
+# A hashed name: the file's stem, the content hash, then its extension
+HASHED_NAME_PATTERN = re.compile(
+    rf'(?P<stem>[^/\\]+)\.(?P<hash>[0-9a-f]{{{HASH_LENGTH}}})(?P<ext>\.[^./\\]*)?')
+
+class Asset:
+    """
+    One static file with its compressed variants.
+
+    Attributes:
+        name (str): File name relative to the static folder
+        hashed_name (str): Name with the content hash before the extension
+        mimetype (str): Content type to serve it with
+        etag (str): Content hash
+        bodies (dict): Content-Encoding -> bytes, with None for the raw file
+        mtime (float): Modification time the asset was built from
+    """
+
+    def __init__(self, path, name):
+        self.name = name
+        self.mtime = os.stat(path).st_mtime
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        stem, ext = os.path.splitext(name)
+        self.hashed_name = f'{stem}.{digest[:HASH_LENGTH]}{ext}'
+        self.etag = digest
+        self.mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        self.bodies = {None: data}
+        if len(data) >= MIN_COMPRESS_BYTES:
+            for encoding in ENCODINGS:
+                compressed = encode(data, encoding)
+                if len(compressed) < len(data):
+                    self.bodies[encoding] = compressed
+
+class AssetStore:
+    """
+    Content-hashed static files, rebuilt when they change on disk.
+
+    Attributes:
+        directory (str): Static folder
+        url_prefix (str): URL path the hashed names are served under
+    """
+
+    def __init__(self, directory, url_prefix='/assets/'):
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self._assets = {}   # name -> Asset
+        self._hashed = {}   # hashed name -> Asset
+        self._lock = threading.Lock()
+
+    def _asset(self, name):
+        """Return the current Asset for a file, rebuilding it if it changed."""
+        path = os.path.join(self.directory, name)
+        asset = self._assets.get(name)
+        if asset is not None and os.stat(path).st_mtime == asset.mtime:
+            return asset
+        with self._lock:
+            asset = Asset(path, name)
+            self._assets[name] = asset
+            self._hashed[asset.hashed_name] = asset
+        return asset
+
+    def url(self, name):
+        """
+        Return the content-hashed URL of a static file.
+
+        Raises:
+            OSError: If the file does not exist
+        """
+        return self.url_prefix + self._asset(name).hashed_name
+
+    def get(self, hashed_name):
+        """
+        Return the Asset served under a hashed name, or None.
+
+        Names this process has not built yet are mapped back to the file
+        name, and the file is hashed to check that it still has that
+        content.
+        """
+        asset = self._hashed.get(hashed_name)
+        if asset is not None:
+            return asset
+        match = HASHED_NAME_PATTERN.fullmatch(hashed_name)
+        if match is None or match['stem'].startswith('.'):
+            return None
+        name = match['stem'] + (match['ext'] or '')
+        if not os.path.isfile(os.path.join(self.directory, name)):
+            return None
+        asset = self._asset(name)
+        return asset if asset.hashed_name == hashed_name else None
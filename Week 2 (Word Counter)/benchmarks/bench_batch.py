@@ -0,0 +1,53 @@
+"""
+Benchmark for the batch counting endpoint.
+
+Counts the same set of documents once with one /count request per
+document and once with a single /count/batch request, through Flask's
+test client, and checks that both give the same counts.
+
+Usage:
+    python benchmarks/bench_batch.py                        # 5000 documents of ~2KB
+    python benchmarks/bench_batch.py --documents 500 --size 100000
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from app import app  # noqa: E402
+from bench_count_words import make_text  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /count/batch.")
+    parser.add_argument('--documents', type=int, default=5000)
+    parser.add_argument('--size', type=int, default=2000, help="characters per document")
+    args = parser.parse_args()
+
+    # Distinct documents, so the result cache does not answer /count
+    documents = [make_text(args.size, seed=i) for i in range(args.documents)]
+    client = app.test_client()
+
+    start = time.perf_counter()
+    single = [client.post('/count', json={'text': text}).json['count'] for text in documents]
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    response = client.post('/count/batch', json=documents)
+    batch = [json.loads(line)['count'] for line in response.data.splitlines()]
+    batch_time = time.perf_counter() - start
+
+    if batch != single:
+        sys.exit("Mismatch between /count and /count/batch")
+    print(f"{args.documents} documents of {args.size} characters")
+    print(f"  /count       {single_time:8.2f}s  {args.documents / single_time:10.0f} docs/s")
+    print(f"  /count/batch {batch_time:8.2f}s  {args.documents / batch_time:10.0f} docs/s"
+          f"  ({single_time / batch_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Byte savings of compressed requests and static assets.
+
+Reports, for English-like text, Japanese text and a source file, the
+size of a count request sent as JSON (as the browser's JSON.stringify
+and Python's json.dumps write it), as a text/plain body, and as
+gzip/Brotli compressed text/plain, with the server's decoding speed.
+Then reports the size of each static asset and of the main page in
+every encoding the server offers.
+
+The text corpora repeat a 64KB block, so sizes above the default
+overstate what compression saves on real documents.
+
+Usage:
+    python benchmarks/bench_compression.py             # 64KB per corpus
+    python benchmarks/bench_compression.py --size 1024
+"""
+import argparse
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_count_words import make_text  # noqa: E402
+from bench_tokenizers import JAPANESE, make_cjk_text  # noqa: E402
+from compression import ENCODINGS, DecodingReader, encode  # noqa: E402
+from app import app, assets  # noqa: E402
+
+
+def decode_speed(data, encoding, size):
+    """Return MB/s of decoded text for a compressed body."""
+    start = time.perf_counter()
+    reader = DecodingReader(io.BytesIO(data), encoding)
+    while reader.read(1 << 16):
+        pass
+    return size / 1e6 / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure compression byte savings.")
+    parser.add_argument('--size', type=int, default=64, help="corpus size in KB of characters")
+    args = parser.parse_args()
+
+    size = args.size * 1000
+    source = (ROOT / 'app.py').read_text(encoding='utf-8')
+    corpora = {
+        'english': make_text(size),
+        'japanese': make_cjk_text(JAPANESE, size),
+        'source': (source * (size // len(source) + 1))[:size],
+    }
+    encodings = [e for e in ('gzip', 'br') if e in ENCODINGS]
+
+    print("Count request bodies (bytes; saving against the page's JSON)")
+    header = f"{'corpus':<10} {'json':>9} {'json-ascii':>11} {'text':>9}"
+    for encoding in encodings:
+        header += f" {encoding:>9} {'saving':>7} {'MB/s':>6}"
+    print(header)
+    for name, text in corpora.items():
+        page_json = json.dumps({'text': text}, ensure_ascii=False).encode()
+        ascii_json = json.dumps({'text': text}).encode()
+        plain = text.encode()
+        row = f"{name:<10} {len(page_json):>9} {len(ascii_json):>11} {len(plain):>9}"
+        for encoding in encodings:
+            compressed = encode(plain, encoding)
+            saving = 1 - len(compressed) / len(page_json)
+            speed = decode_speed(compressed, encoding, len(plain))
+            row += f" {len(compressed):>9} {saving:>6.0%} {speed:>6.0f}"
+        print(row)
+
+    print("\nStatic responses (bytes; saving of the best encoding)")
+    print(f"{'file':<18} {'raw':>8}" + ''.join(f" {e:>8}" for e in encodings) + f" {'saving':>7}")
+    client = app.test_client()
+    page = client.get('/', headers={'Accept-Encoding': 'identity'}).get_data()
+    rows = [('index.html', {None: page, **{e: encode(page, e) for e in encodings}})]
+    for name in sorted(p.name for p in Path(app.static_folder).iterdir() if p.is_file()):
+        assets.url(name)
+        rows.append((name, assets._asset(name).bodies))
+    total_raw = total_best = 0
+    for name, bodies in rows:
+        raw = len(bodies[None])
+        best = min(len(body) for body in bodies.values())
+        total_raw += raw
+        total_best += best
+        sizes = ''.join(f" {len(bodies[e]) if e in bodies else '-':>8}" for e in encodings)
+        print(f"{name:<18} {raw:>8}{sizes} {1 - best / raw:>6.0%}")
+    print(f"{'total':<18} {total_raw:>8}{' ' * 9 * len(encodings)} {1 - total_best / total_raw:>6.0%}")
+    print("\nAssets are served under content-hashed names with "
+          "'Cache-Control: public, max-age=31536000, immutable', so repeat "
+          "visits download none of them.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Micro-benchmark for count_words.
+
+Compares the single-pass regex engine in wordcount.py with the original
+split-and-filter implementation on synthetic inputs, and checks that both
+return the same count.
+
+Usage:
+    python benchmarks/bench_count_words.py                  # 1MB, 10MB, 100MB
+    python benchmarks/bench_count_words.py --sizes 1 5
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from wordcounter.wordcount import count_words  # noqa: E402
+
+# Mix of plain words, hyphenated words, contractions, numbers, non-ASCII
+# words and pure punctuation tokens
+VOCABULARY = [
+    'the', 'quick', 'brown', 'fox', 'jumps', 'over', 'lazy', 'dog',
+    'well-known', "don't", 'co-op', '2024', 'naïve', 'café', '日本語',
+    '--', '...', '—', '!', '(see', 'note)', 'e.g.', '_', 'snake_case',
+]
+SEPARATORS = [' '] * 12 + ['\n', '\n\n', '\t', '  ']
+
+
+def legacy_count_words(text):
+    """The original implementation, kept as the reference."""
+    if not text or text.isspace():
+        return 0
+    words = text.strip().split()
+    words = [word for word in words if any(c.isalnum() for c in word)]
+    return len(words)
+
+
+def make_text(size, seed=0):
+    """Build roughly ``size`` characters of synthetic text."""
+    rng = random.Random(seed)
+    # Build a 64KB block and repeat it so large inputs are cheap to create
+    parts = []
+    length = 0
+    while length < min(size, 1 << 16):
+        part = rng.choice(VOCABULARY) + rng.choice(SEPARATORS)
+        parts.append(part)
+        length += len(part)
+    block = ''.join(parts)
+    return (block * (size // len(block) + 1))[:size]
+
+
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark count_words.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100],
+                        help="input sizes in MB")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'legacy':>12} {'engine':>12} {'speedup':>9}  {'MB/s':>8}")
+    for megabytes in args.sizes:
+        text = make_text(megabytes * 1000000)
+        legacy_time, expected = best_of(args.repeat, legacy_count_words, text)
+        engine_time, result = best_of(args.repeat, count_words, text)
+        if result != expected:
+            sys.exit(f"Mismatch at {megabytes}MB: engine {result}, legacy {expected}")
+        print(f"{megabytes:>6}MB {legacy_time * 1000:>10.1f}ms {engine_time * 1000:>10.1f}ms "
+              f"{legacy_time / engine_time:>8.1f}x  {megabytes / engine_time:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Scaling benchmark for parallel counting of a single large document.
+
+Counts one synthetic document with count_words and with
+count_words_parallel on pools of 1 to N processes, checks that all
+counts agree, and reports throughput and speedup.
+
+Usage:
+    python benchmarks/bench_parallel.py                     # 500MB, 1..cpu_count cores
+    python benchmarks/bench_parallel.py --size 100 --cores 1 2 4
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_count_words import best_of, make_text  # noqa: E402
+from parallel import count_words_parallel, make_pool  # noqa: E402
+from wordcounter.wordcount import count_words  # noqa: E402
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Benchmark count_words_parallel.")
+    parser.add_argument('--size', type=int, default=500, help="input size in MB")
+    parser.add_argument('--cores', type=int, nargs='+', default=list(range(1, cpus + 1)))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    text = make_text(args.size * 1000000)
+    serial_time, expected = best_of(args.repeat, count_words, text)
+    print(f"{args.size}MB, {cpus} CPUs available")
+    print(f"{'cores':>7} {'time':>10} {'MB/s':>8} {'speedup':>8}")
+    print(f"{'serial':>7} {serial_time:>9.2f}s {args.size / serial_time:>8.1f} {1:>7.2f}x")
+    for cores in args.cores:
+        with make_pool(cores) as executor:
+            # Start the workers before timing
+            list(executor.map(abs, range(cores)))
+            elapsed, result = best_of(args.repeat, count_words_parallel, text, cores, executor)
+        if result != expected:
+            sys.exit(f"Mismatch with {cores} cores: parallel {result}, serial {expected}")
+        print(f"{cores:>7} {elapsed:>9.2f}s {args.size / elapsed:>8.1f} {serial_time / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
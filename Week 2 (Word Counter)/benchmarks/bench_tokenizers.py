@@ -0,0 +1,84 @@
+"""
+Benchmark for the tokenization modes.
+
+Counts English-like, Japanese and Chinese synthetic text in every mode
+and reports throughput and the cost relative to the whitespace fast path
+on the English-like text. Exits with status 1 if a richer mode is more
+than --max-factor times slower per character than that fast path.
+
+Usage:
+    python benchmarks/bench_tokenizers.py                   # 10MB per corpus
+    python benchmarks/bench_tokenizers.py --size 50 --max-factor 3
+"""
+import argparse
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_count_words import best_of, make_text  # noqa: E402
+from wordcounter.wordcount import TOKENIZATION_MODES, count_words, tokenizer_patterns  # noqa: E402
+
+# Japanese and Chinese are written without spaces between words
+JAPANESE = ['日本語', 'を', '話す', 'カタカナ', 'です', '東京', 'に', '行きます',
+            'コンピューター', 'の', '使い方', 'は', '簡単', '、', '。']
+CHINESE = ['我们', '的', '中文', '是', '一个', '国家', '学习', '电脑', '很',
+           '简单', '，', '。']
+
+
+def make_cjk_text(vocabulary, size, seed=0):
+    """Build roughly ``size`` characters of text without spaces."""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < min(size, 1 << 16):
+        part = rng.choice(vocabulary)
+        parts.append(part)
+        length += len(part)
+    block = ''.join(parts)
+    return (block * (size // len(block) + 1))[:size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tokenization modes.")
+    parser.add_argument('--size', type=int, default=10, help="corpus size in MB of characters")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-factor', type=float, default=4.0,
+                        help="largest acceptable slowdown against the fast path")
+    args = parser.parse_args()
+
+    size = args.size * 1000000
+    corpora = {
+        'english': make_text(size),
+        'japanese': make_cjk_text(JAPANESE, size),
+        'chinese': make_cjk_text(CHINESE, size),
+    }
+    # Build and cache the patterns outside the timings
+    for mode in TOKENIZATION_MODES:
+        tokenizer_patterns(mode)
+
+    results = []
+    for name, text in corpora.items():
+        for mode in TOKENIZATION_MODES:
+            elapsed, words = best_of(args.repeat, count_words, text, mode)
+            results.append((name, mode, words, elapsed))
+    fast_path = next(elapsed for name, mode, _, elapsed in results
+                     if name == 'english' and mode == 'whitespace')
+
+    print(f"{'corpus':<10} {'mode':<11} {'words':>10} {'time':>9} {'MB/s':>8} {'factor':>7}")
+    worst = 0.0
+    for name, mode, words, elapsed in results:
+        factor = elapsed / fast_path
+        if mode != 'whitespace':
+            worst = max(worst, factor)
+        print(f"{name:<10} {mode:<11} {words:>10} {elapsed * 1000:>7.0f}ms "
+              f"{args.size / elapsed:>8.1f} {factor:>6.2f}x")
+
+    print(f"\nSlowest rich mode: {worst:.2f}x the whitespace fast path (limit {args.max_factor}x)")
+    if worst > args.max_factor:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Local load test for the serving modes.
+
+Starts the application under each server in turn, sends POST /count
+requests from a number of concurrent keep-alive connections for a fixed
+time, and reports throughput and latency percentiles. Modes whose server
+is not installed are skipped.
+
+With --slow-clients, extra connections upload their request body a few
+bytes at a time for the whole run, showing how well each server keeps
+serving while clients are slow. With --url, a server that is already
+running is tested instead (start it with RATE_LIMIT=0).
+
+Usage:
+    python benchmarks/load_test.py                          # all modes
+    python benchmarks/load_test.py --modes gunicorn uvicorn --concurrency 64 --duration 20
+    python benchmarks/load_test.py --slow-clients 32
+    python benchmarks/load_test.py --url http://127.0.0.1:5000
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_count_words import make_text  # noqa: E402
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+HOST = '127.0.0.1'
+
+
+def server_command(mode, port, workers):
+    """Return the command line that serves the app in the given mode, or None."""
+    if mode == 'dev':
+        return [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(port)]
+    if mode == 'gunicorn' and shutil.which('gunicorn'):
+        return ['gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'{HOST}:{port}',
+                '--workers', str(workers), 'app:app']
+    if mode == 'waitress' and _importable('waitress'):
+        return [sys.executable, 'serve.py', '--host', HOST, '--port', str(port)]
+    if mode == 'uvicorn' and _importable('uvicorn') and _importable('a2wsgi'):
+        return [sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', HOST,
+                '--port', str(port), '--workers', str(workers), '--no-access-log']
+    return None
+
+
+def _importable(module):
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(port, timeout=20, host=HOST):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def client(host, port, text, stop_at, latencies, errors, seed):
+    """Send requests on one keep-alive connection until stop_at."""
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    headers = {'Content-Type': 'application/json'}
+    i = 0
+    while time.perf_counter() < stop_at:
+        # A unique suffix keeps the result cache from answering
+        body = json.dumps({'text': f'{text} {seed}-{i}'})
+        i += 1
+        start = time.perf_counter()
+        try:
+            connection.request('POST', '/count', body, headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+def slow_client(host, port, stop_at):
+    """Trickle a request body one byte every 100ms until stop_at."""
+    body = json.dumps({'text': 'slow ' * 1000}).encode()
+    try:
+        with socket.create_connection((host, port), timeout=30) as sock:
+            sock.sendall(b'POST /count HTTP/1.1\r\nHost: localhost\r\n'
+                         b'Content-Type: application/json\r\n'
+                         b'Content-Length: %d\r\n\r\n' % len(body))
+            for byte in body:
+                if time.perf_counter() >= stop_at:
+                    break
+                sock.sendall(bytes([byte]))
+                time.sleep(0.1)
+    except OSError:
+        pass
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_load(mode, host, port, args, text):
+    """Load a running server for args.duration seconds and summarise the results."""
+    latencies = []
+    errors = []
+    stop_at = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=slow_client, args=(host, port, stop_at))
+        for _ in range(args.slow_clients)
+    ]
+    threads += [
+        threading.Thread(target=client, args=(host, port, text, stop_at, latencies, errors, n))
+        for n in range(args.concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'mode': mode,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_second': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def run_mode(mode, args, text):
+    port = free_port()
+    command = server_command(mode, port, args.workers)
+    if command is None:
+        return None
+    env = dict(os.environ, ACCESS_LOG='', RATE_LIMIT='0')
+    server = subprocess.Popen(command, cwd=PROJECT_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_for_server(port):
+            return {'mode': mode, 'error': 'server did not start'}
+        return run_load(mode, HOST, port, args, text)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def run_url(url, args, text):
+    """Load an already running server at url."""
+    parts = urlsplit(url)
+    host, port = parts.hostname or HOST, parts.port or 80
+    if not wait_for_server(port, timeout=5, host=host):
+        return {'mode': url, 'error': 'server not reachable'}
+    return run_load(url, host, port, args, text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the serving modes.")
+    parser.add_argument('--modes', nargs='+', default=['dev', 'gunicorn', 'waitress', 'uvicorn'])
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per mode")
+    parser.add_argument('--size', type=int, default=2000, help="characters per request")
+    parser.add_argument('--slow-clients', type=int, default=0,
+                        help="connections that upload their body very slowly")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--url', help="test a running server instead of starting each mode")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    text = make_text(args.size)
+    results = [run_url(args.url, args, text)] if args.url else []
+    for mode in [] if args.url else args.modes:
+        result = run_mode(mode, args, text)
+        if result is None:
+            print(f"{mode}: not installed, skipped", file=sys.stderr)
+            continue
+        results.append(result)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':<10} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for result in results:
+        if 'error' in result:
+            print(f"{result['mode']:<10} {result['error']}")
+            continue
+        print(f"{result['mode']:<10} {result['requests']:>9} {result['errors']:>7} "
+              f"{result['requests_per_second']:>9.1f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Result Cache
+-----------
+Memory-bounded LRU cache for counting results, keyed by a BLAKE2b hash
+of the request content. The same digest doubles as the response ETag, so
+a client that already holds a result can revalidate it with
+If-None-Match and get an empty 304 instead of the payload.
+
+Entries are charged for the bytes of their cached value plus a fixed
+per-entry overhead, and the least recently used entries are evicted
+once the total exceeds the budget.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Approximate bookkeeping cost of one entry: key string, dict slot, tuple
+ENTRY_OVERHEAD = 160
+
+def content_key(kind, text, *params):
+    """
+    Hash request content into a cache key.
+
+    Args:
+        kind (str): Result type, so different endpoints never share keys
+        text (str): Text the result was computed from
+        *params: Extra parameters that change the result
+
+    Returns:
+        str: 32 hex digits
+    """
+    digest = hashlib.blake2b(digest_size=16, person=kind.encode()[:16])
+    digest.update(repr(params).encode())
+    digest.update(b'\0')
+    # Lone surrogates can arrive through JSON escapes; hash them as-is
+    digest.update(text.encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with a memory budget.
+
+    Attributes:
+        max_bytes (int): Budget for the charged size of all entries
+        hits (int): Lookups that found an entry
+        misses (int): Lookups that did not
+        evictions (int): Entries dropped to stay within the budget
+    """
+
+    def __init__(self, max_bytes=8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, size):
+        """
+        Store a value, evicting least recently used entries as needed.
+
+        Args:
+            key (str): Key from content_key()
+            value: Value to cache
+            size (int): Bytes held by the value
+        """
+        size += ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries; counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return entry count, memory use and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,200 @@
+"""
+Compression
+----------
+Request body decoding and response body encoding.
+
+DecompressRequest is WSGI middleware that decodes gzip, deflate or
+Brotli request bodies (by Content-Encoding) as they are read, so every
+route, the streaming ones included, sees plain bytes and a large upload
+is never held compressed and decompressed at once. The decoded size is
+capped, so a small body cannot expand without bound; the application
+can raise the cap for a request before reading its body, through the
+DecodingReader left in the WSGI environ under READER_KEY.
+
+best_encoding() picks the best encoding a client accepts for a response
+and encode() applies it. Brotli needs the optional brotli package; without it only gzip
+and deflate are offered.
+"""
+
+import gzip
+import io
+import json
+import zlib
+from werkzeug.wsgi import get_input_stream
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Largest decoded request body accepted by default, in bytes
+MAX_DECODED_BYTES = 64 << 20
+
+# WSGI environ key holding the DecodingReader of a compressed request
+READER_KEY = 'compression.reader'
+
+# Compressed bytes read from the client at a time, and the most output
+# produced from one read before it is handed on
+READ_SIZE = 64 << 10
+OUTPUT_CHUNK = 256 << 10
+
+# Bodies smaller than this gain too little from compression to bother
+MIN_COMPRESS_BYTES = 1024
+
+# Content-Encoding values accepted on requests and offered on responses,
+# in order of preference
+ENCODINGS = (('br',) if brotli else ()) + ('gzip', 'deflate')
+
+class DecodedSizeError(ValueError):
+    """Raised when a request body decodes to more than the allowed size."""
+
+def _zlib_decoder(wbits):
+    """Return a function turning compressed input into output chunks."""
+    decompressor = zlib.decompressobj(wbits)
+
+    def decode(data):
+        while data:
+            yield decompressor.decompress(data, OUTPUT_CHUNK)
+            data = decompressor.unconsumed_tail
+
+    decode.finished = lambda: decompressor.eof
+    return decode
+
+def _brotli_decoder():
+    decompressor = brotli.Decompressor()
+
+    def decode(data):
+        try:
+            output = decompressor.process(data, output_buffer_limit=OUTPUT_CHUNK)
+        except TypeError:
+            # brotli before 1.1 has no output limit; MAX_DECODED_BYTES
+            # still bounds the total
+            yield decompressor.process(data)
+            return
+        # Output held back by the limit is drained with empty input
+        while output:
+            yield output
+            output = decompressor.process(b'', output_buffer_limit=OUTPUT_CHUNK)
+
+    decode.finished = decompressor.is_finished
+    return decode
+
+DECODERS = {
+    'gzip': lambda: _zlib_decoder(16 + zlib.MAX_WBITS),
+    'deflate': lambda: _zlib_decoder(zlib.MAX_WBITS),
+}
+if brotli:
+    DECODERS['br'] = _brotli_decoder
+
+class DecodingReader(io.RawIOBase):
+    """
+    Readable stream of the decoded content of a compressed stream.
+
+    Attributes:
+        max_bytes (int): Most bytes that may be decoded; may be changed
+            until reading starts
+
+    Raises:
+        DecodedSizeError: From read() once more than max_bytes are decoded
+        ValueError: From read() if the compressed data is invalid or truncated
+    """
+
+    def __init__(self, stream, encoding, max_bytes=MAX_DECODED_BYTES):
+        self._stream = stream
+        self._decode = DECODERS[encoding]()
+        self.max_bytes = max_bytes
+        self._decoded = 0
+        self._chunks = self._read_chunks()
+        self._pending = memoryview(b'')
+
+    def _read_chunks(self):
+        while True:
+            data = self._stream.read(READ_SIZE)
+            if not data:
+                break
+            yield from self._decode(data)
+        if not self._decode.finished():
+            raise ValueError("Compressed request body is truncated")
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                return 0
+            except (zlib.error, getattr(brotli, 'error', zlib.error)) as e:
+                raise ValueError(f"Invalid compressed request body: {e}")
+            self._decoded += len(chunk)
+            if self._decoded > self.max_bytes:
+                raise DecodedSizeError(
+                    f"Request body decodes to more than {self.max_bytes} bytes")
+            self._pending = memoryview(chunk)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+class DecompressRequest:
+    """
+    WSGI middleware that decodes compressed request bodies.
+
+    The decoded body has no known length, so the request is passed on
+    with ``wsgi.input_terminated`` set and no Content-Length; Werkzeug
+    then reads it to the end. Unsupported encodings get a 415 response.
+    """
+
+    def __init__(self, app, max_bytes=MAX_DECODED_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    def __call__(self, environ, start_response):
+        encoding = environ.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if encoding in ('', 'identity'):
+            return self.app(environ, start_response)
+        if encoding not in DECODERS:
+            body = json.dumps({
+                'error': f"Unsupported Content-Encoding: {encoding}",
+                'status': 'error'
+            }).encode()
+            start_response('415 Unsupported Media Type', [
+                ('Content-Type', 'application/json'),
+                ('Content-Length', str(len(body))),
+                ('Accept-Encoding', ', '.join(ENCODINGS))
+            ])
+            return [body]
+
+        reader = DecodingReader(get_input_stream(environ), encoding, self.max_bytes)
+        environ = dict(environ)
+        environ['wsgi.input'] = io.BufferedReader(reader, READ_SIZE)
+        environ[READER_KEY] = reader
+        environ['wsgi.input_terminated'] = True
+        environ.pop('CONTENT_LENGTH', None)
+        del environ['HTTP_CONTENT_ENCODING']
+        return self.app(environ, start_response)
+
+def encode(data, encoding):
+    """Compress bytes with a Content-Encoding from ENCODINGS."""
+    if encoding == 'br':
+        return brotli.compress(data)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == 'deflate':
+        return zlib.compress(data, 9)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+def best_encoding(accept_encodings, available=ENCODINGS):
+    """
+    Pick the encoding to respond with.
+
+    Args:
+        accept_encodings (werkzeug.datastructures.Accept): The request's
+            Accept-Encoding header, as request.accept_encodings
+        available (iterable): Encodings on offer, most preferred first
+
+    Returns:
+        str or None: An encoding, or None to send the body as is
+    """
+    return accept_encodings.best_match([e for e in ENCODINGS if e in available])
@@ -0,0 +1,95 @@
+"""
+Conformance check for the Python and JavaScript counting rules.
+
+Counts every case of corpus.json in every tokenization mode with
+wordcount.py and with static/wordcount.js (through node), and reports
+any count that differs from the expected one. With --fuzz, random texts
+drawn from the characters the rules treat specially are compared between
+the two implementations as well.
+
+Usage:
+    python conformance/check.py
+    python conformance/check.py --fuzz 20000
+"""
+import argparse
+import json
+import random
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from wordcounter.wordcount import TOKENIZATION_MODES, count_words  # noqa: E402
+
+CORPUS = Path(__file__).resolve().parent / 'corpus.json'
+
+# Reads [{text, mode}] from stdin and prints the counts as a JSON array
+NODE_SCRIPT = """
+const { countWords } = require(process.argv[1]);
+let input = '';
+process.stdin.setEncoding('utf8');
+process.stdin.on('data', (chunk) => { input += chunk; });
+process.stdin.on('end', () => {
+    const cases = JSON.parse(input);
+    process.stdout.write(JSON.stringify(cases.map((c) => countWords(c.text, c.mode))));
+});
+"""
+
+# Letters, digits, separators, joiners, marks and scripts the modes treat differently
+FUZZ_ALPHABET = [
+    'a', 'Z', '7', '٣', '²', ' ', '\n', '\t', '\x1c', '\x85', '\xa0', '　', '﻿',
+    '.', ',', ';', ':', "'", '’', '-', '—', '_', '·', '(', '"',
+    '́', '­', '​', '‍', 'é', 'ß', 'Ω', 'я', 'ا', 'ก',
+    '日', '本', '々', '〇', 'を', 'す', 'カ', 'ー', '・', 'ｶ', '한', '。', '、',
+    '😀', '\U00020000', '\U0001d400',
+]
+
+
+def node_counts(cases):
+    """Count [{text, mode}] cases with static/wordcount.js."""
+    node = shutil.which('node')
+    if node is None:
+        return None
+    result = subprocess.run(
+        [node, '-e', NODE_SCRIPT, str(PROJECT_DIR / 'static' / 'wordcount.js')],
+        input=json.dumps(cases), capture_output=True, text=True, encoding='utf-8', check=True)
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check Python/JavaScript counting conformance.")
+    parser.add_argument('--fuzz', type=int, default=0, help="number of random texts to compare")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = json.loads(CORPUS.read_text(encoding='utf-8'))
+    cases = [{'name': entry['name'], 'text': entry['text'], 'mode': mode, 'expected': count}
+             for entry in corpus for mode, count in entry['counts'].items()]
+    rng = random.Random(args.seed)
+    for i in range(args.fuzz):
+        text = ''.join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(0, 40)))
+        cases.append({'name': f'fuzz {i}', 'text': text,
+                      'mode': rng.choice(TOKENIZATION_MODES), 'expected': None})
+
+    python = [count_words(case['text'], case['mode']) for case in cases]
+    javascript = node_counts([{'text': case['text'], 'mode': case['mode']} for case in cases])
+    if javascript is None:
+        print("node not found; checking the Python implementation only", file=sys.stderr)
+        javascript = python
+
+    failures = 0
+    for case, py_count, js_count in zip(cases, python, javascript):
+        expected = case['expected'] if case['expected'] is not None else py_count
+        if py_count != expected or js_count != expected:
+            failures += 1
+            print(f"{case['name']} [{case['mode']}]: expected {expected}, "
+                  f"python {py_count}, javascript {js_count}: {case['text']!r}")
+    print(f"{len(cases) - failures}/{len(cases)} cases agree")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
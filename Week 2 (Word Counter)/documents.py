@@ -0,0 +1,617 @@
+"""
+Incremental Document Counting
+----------------------------
+Server-side state for the delta counting protocol. The client creates a
+document once, then sends only the edited ranges. Each document is kept
+as a list of segments that end on whitespace, so no word spans two
+segments and the total is the sum of per-segment counts. An edit
+re-counts only the segments it touches, so its cost follows the size of
+the edit rather than the size of the document.
+
+Segments are paragraphs: they end after a line break, so their borders
+depend on the text around them and not on where they sit in the
+document. Each segment's count is cached under a hash of its text, and
+re-segmented text reuses the counts of segments whose hash is unchanged.
+Replacing a named document with an edited copy therefore only counts
+the paragraphs that differ.
+
+Named documents are saved one row per segment, ordered by a position
+key. A document remembers which segments were removed and added since
+it was last saved, so saving an edit writes only those rows, and
+loading it counts nothing.
+
+Edit offsets are UTF-16 code units, which is how JavaScript strings
+index text; they are converted to Python string indexes per segment.
+"""
+
+import bisect
+import hashlib
+import itertools
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from wordcounter.wordcount import SPACE_PATTERN, count_words
+
+# Longest segment in characters; longer paragraphs are split on whitespace
+SEGMENT_SIZE = 4096
+
+# A paragraph ends after a line break and the whitespace following it
+PARAGRAPH_END_PATTERN = re.compile(r'\n\s*')
+
+# Approximate bookkeeping cost of one segment beyond its text: list
+# slots, count, length, hash and position key
+SEGMENT_OVERHEAD = 192
+
+# Gap between the position keys of consecutive segments of a saved
+# document when they are numbered; segments inserted between two others
+# take keys from the gap, so no other row changes
+KEY_SPACING = 1 << 32
+
+# Names a document can be saved under
+NAME_PATTERN = re.compile(r'[\w.-]{1,100}\Z', re.ASCII)
+
+# BLAKE2b hash and word count of a segment, as stored by databases
+# written before segments had rows of their own
+SEGMENT_RECORD = struct.Struct('<16sI')
+
+# Characters outside the Basic Multilingual Plane take two UTF-16 units
+ASTRAL_PATTERN = re.compile('[\U00010000-\U0010ffff]')
+
+def utf16_length(text):
+    """Return the length of text in UTF-16 code units."""
+    return len(text) + len(ASTRAL_PATTERN.findall(text))
+
+def _utf16_to_index(text, units):
+    """Convert a UTF-16 offset within text to a string index."""
+    if units <= 0:
+        return 0
+    index = 0
+    seen = 0
+    for char in text:
+        seen += 2 if char > '\uffff' else 1
+        index += 1
+        if seen >= units:
+            break
+    return index
+
+def _split_segments(text):
+    """Split text into paragraphs, splitting those over SEGMENT_SIZE on whitespace."""
+    segments = []
+    pos = 0
+    end = len(text)
+    while pos < end:
+        paragraph_end = PARAGRAPH_END_PATTERN.search(text, pos)
+        paragraph_end = paragraph_end.end() if paragraph_end else end
+        while paragraph_end - pos > SEGMENT_SIZE:
+            space = SPACE_PATTERN.search(text, pos + SEGMENT_SIZE - 1, paragraph_end)
+            if space is None or space.end() == paragraph_end:
+                break
+            segments.append(text[pos:space.end()])
+            pos = space.end()
+        segments.append(text[pos:paragraph_end])
+        pos = paragraph_end
+    return segments
+
+def segment_hash(text):
+    """Hash a segment's text; lone surrogates are hashed as-is."""
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+def check_name(name):
+    """
+    Validate a document name.
+
+    Raises:
+        ValueError: Unless the name is 1-100 letters, digits, '_', '.' or '-'
+    """
+    if not isinstance(name, str) or not NAME_PATTERN.match(name):
+        raise ValueError("Document names are 1-100 letters, digits, '_', '.' or '-'")
+    return name
+
+class EditError(ValueError):
+    """Raised when an edit does not fit the document."""
+
+class Document:
+    """
+    A text document with cached per-segment word counts.
+
+    Attributes:
+        id (str): Document identifier; the name for named documents
+        name (str): Name the document is saved under, or None
+        mode (str): Tokenization mode used for counting
+        version (int): Incremented on every applied batch of edits
+        saved_version (int): Version last written to the database, or
+            None if it has to be written in full
+        count (int): Current number of words
+        length (int): Current length in UTF-16 code units
+        size (int): Approximate memory held, in bytes
+    """
+
+    def __init__(self, text, doc_id=None, mode='whitespace', name=None, known_counts=None):
+        """
+        Args:
+            text (str): Document text
+            doc_id (str): Identifier; a random one by default
+            mode (str): Tokenization mode
+            name (str): Name to save the document under, which is also its id
+            known_counts (dict): Segment hash -> word count, for segments
+                already counted in this mode
+        """
+        self.name = name
+        self.id = name or doc_id or uuid.uuid4().hex
+        self.mode = mode
+        self.version = 0
+        self.saved_version = None
+        self._texts = []
+        self._counts = []
+        self._units = []
+        self._hashes = []
+        self._keys = []
+        self._removed_keys = set()
+        self._added_keys = set()
+        self._total = self._length = self._size = 0
+        self._replace_segments(0, 0, text, known_counts or {})
+
+    @classmethod
+    def from_segments(cls, texts, counts, keys, mode='whitespace', name=None, version=0):
+        """
+        Rebuild a saved document from its segments without counting them.
+
+        Args:
+            texts (list): Segment texts, in order
+            counts (list): Word count of each segment
+            keys (list): Ascending position key of each segment
+            mode (str): Tokenization mode the counts were made in
+            name (str): Name the document is saved under
+            version (int): Saved version
+        """
+        document = cls('', mode=mode, name=name)
+        document._texts = list(texts)
+        document._counts = list(counts)
+        document._units = [utf16_length(t) for t in texts]
+        document._hashes = [segment_hash(t) for t in texts]
+        document._keys = list(keys)
+        document._total = sum(document._counts)
+        document._length = sum(document._units)
+        document._size = (sum(map(sys.getsizeof, document._texts))
+                          + SEGMENT_OVERHEAD * len(document._texts))
+        document.version = document.saved_version = version
+        return document
+
+    @property
+    def count(self):
+        return self._total
+
+    @property
+    def length(self):
+        return self._length
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def text(self):
+        return ''.join(self._texts)
+
+    def segment_counts(self):
+        """Return a dict of segment hash -> word count."""
+        return dict(zip(self._hashes, self._counts))
+
+    def segments(self):
+        """Return (key, text, count) for every segment, in order."""
+        return list(zip(self._keys, self._texts, self._counts))
+
+    def unsaved_changes(self):
+        """
+        Return the segments changed since the document was last saved.
+
+        Returns:
+            tuple: (keys of removed segments, (key, text, count) of added
+            segments), or None if the whole document has to be written
+        """
+        if self.saved_version is None:
+            return None
+        added = []
+        for key in sorted(self._added_keys):
+            i = bisect.bisect_left(self._keys, key)
+            added.append((key, self._texts[i], self._counts[i]))
+        return sorted(self._removed_keys), added
+
+    def mark_saved(self):
+        """Record that the current version is in the database."""
+        self.saved_version = self.version
+        self._removed_keys.clear()
+        self._added_keys.clear()
+
+    def _assign_keys(self, first, last, number):
+        """
+        Return position keys for number segments replacing first..last-1.
+
+        New keys fall between the keys of the neighbouring segments. When
+        the gap between them is too small, every segment is numbered
+        again and the next save writes the whole document.
+        """
+        keys = self._keys
+        if self.saved_version is not None:
+            for key in keys[first:last]:
+                self._added_keys.discard(key)
+                self._removed_keys.add(key)
+        if first and last < len(keys):
+            step = (keys[last] - keys[first - 1]) // (number + 1)
+            if step:
+                new_keys = [keys[first - 1] + step * (i + 1) for i in range(number)]
+            else:
+                self.saved_version = None
+                self._removed_keys.clear()
+                self._added_keys.clear()
+                keys[:first] = range(0, first * KEY_SPACING, KEY_SPACING)
+                keys[last:] = range((first + number) * KEY_SPACING,
+                                    (first + number + len(keys) - last) * KEY_SPACING, KEY_SPACING)
+                return [(first + i) * KEY_SPACING for i in range(number)]
+        elif first:
+            new_keys = [keys[first - 1] + KEY_SPACING * (i + 1) for i in range(number)]
+        elif last < len(keys):
+            new_keys = [keys[last] - KEY_SPACING * (number - i) for i in range(number)]
+        else:
+            new_keys = [KEY_SPACING * i for i in range(number)]
+        if self.saved_version is not None:
+            self._added_keys.update(new_keys)
+        return new_keys
+
+    def _replace_segments(self, first, last, text, known_counts=None):
+        """
+        Replace segments first..last-1 with the re-segmented text.
+
+        Segments found in known_counts, or by default among the replaced
+        segments, keep their count instead of being counted again.
+        """
+        if known_counts is None:
+            known_counts = dict(zip(self._hashes[first:last], self._counts[first:last]))
+        texts = _split_segments(text)
+        hashes = [segment_hash(t) for t in texts]
+        counts = [known_counts[h] if h in known_counts else count_words(t, self.mode)
+                  for t, h in zip(texts, hashes)]
+        units = [utf16_length(t) for t in texts]
+        self._total += sum(counts) - sum(self._counts[first:last])
+        self._length += sum(units) - sum(self._units[first:last])
+        self._size += (sum(map(sys.getsizeof, texts)) - sum(map(sys.getsizeof, self._texts[first:last]))
+                       + SEGMENT_OVERHEAD * (len(texts) - (last - first)))
+        self._keys[first:last] = self._assign_keys(first, last, len(texts))
+        self._texts[first:last] = texts
+        self._counts[first:last] = counts
+        self._units[first:last] = units
+        self._hashes[first:last] = hashes
+
+    def _locate(self, offset, ends):
+        """
+        Return (segment index, segment start) for a UTF-16 offset.
+
+        ends holds the UTF-16 offset after each segment. An offset at a
+        segment boundary belongs to the following segment; the end of the
+        document belongs to the last segment.
+        """
+        i = min(bisect.bisect_right(ends, offset), max(len(ends) - 1, 0))
+        return i, (ends[i] - self._units[i]) if ends else 0
+
+    def apply_edits(self, edits):
+        """
+        Apply a batch of edits and advance the version.
+
+        Edits are applied in order, each against the result of the one
+        before it. The whole batch is validated first, so it is applied
+        either completely or not at all.
+
+        Args:
+            edits (list): Dicts with 'start', 'end' and 'text' keys
+
+        Raises:
+            EditError: If any edit is malformed or out of range
+        """
+        length = self._length
+        for edit in edits:
+            try:
+                start, end, text = edit['start'], edit['end'], edit['text']
+            except (KeyError, TypeError):
+                raise EditError("Each edit needs 'start', 'end' and 'text'")
+            if not (isinstance(start, int) and isinstance(end, int)
+                    and 0 <= start <= end <= length and isinstance(text, str)):
+                raise EditError(f"Invalid edit range [{start}, {end}) for length {length}")
+            length += utf16_length(text) - (end - start)
+
+        for edit in edits:
+            self.apply(edit['start'], edit['end'], edit['text'])
+        self.version += 1
+
+    def apply(self, start, end, text):
+        """
+        Replace the UTF-16 range [start, end) with text.
+
+        The affected region runs from the segment holding ``start`` to the
+        segment holding ``end``. Every segment but the last ends on
+        whitespace, and an edit never removes the final character of the
+        region's last segment, so the region's borders stay on whitespace
+        and only the region needs re-counting.
+
+        Args:
+            start (int): First UTF-16 offset to replace
+            end (int): UTF-16 offset after the replaced range
+            text (str): Replacement text
+
+        Raises:
+            EditError: If the range is outside the document
+        """
+        if not (isinstance(start, int) and isinstance(end, int)
+                and 0 <= start <= end <= self._length and isinstance(text, str)):
+            raise EditError(f"Invalid edit range [{start}, {end}) for length {self._length}")
+        if not self._texts:
+            self._replace_segments(0, 0, text)
+            return
+
+        ends = list(itertools.accumulate(self._units))
+        first, first_start = self._locate(start, ends)
+        last, last_start = self._locate(end, ends)
+        region = ''.join(self._texts[first:last + 1])
+        region_start = _utf16_to_index(region, start - first_start)
+        region_end = _utf16_to_index(region, end - first_start)
+        self._replace_segments(first, last + 1, region[:region_start] + text + region[region_end:])
+
+class SQLiteDocuments:
+    """
+    Named documents in a local SQLite file, shared by the processes of one host.
+
+    A document is a row of metadata plus one row per segment with its
+    text and word count, ordered by the segment's position key. Saving an
+    edited document writes only the segments that changed since it was
+    last saved or loaded, and loading one counts nothing. Text is stored
+    as UTF-8 bytes, which keeps any lone surrogates intact.
+
+    Attributes:
+        path (str): Database file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            columns = [row[1] for row in db.execute('PRAGMA table_info(documents)')]
+            if 'segments' in columns:
+                db.execute('ALTER TABLE documents RENAME TO saved_documents')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS documents (name TEXT PRIMARY KEY, '
+                'mode TEXT NOT NULL, version INTEGER NOT NULL, count INTEGER NOT NULL, '
+                'updated REAL NOT NULL)')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS segments (name TEXT NOT NULL, key INTEGER NOT NULL, '
+                'text BLOB NOT NULL, count INTEGER NOT NULL, PRIMARY KEY (name, key))')
+            if 'segments' in columns:
+                self._convert(db)
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+    def _convert(self, db):
+        """Move documents saved as a single row into segment rows."""
+        rows = db.execute(
+            'SELECT name, mode, version, text, segments, updated FROM saved_documents').fetchall()
+        for name, mode, version, text, segments, updated in rows:
+            document = Document(text.decode('utf-8', 'surrogatepass'), mode=mode, name=name,
+                                known_counts=dict(SEGMENT_RECORD.iter_unpack(segments)))
+            document.version = version
+            self._write(db, document, updated)
+        db.execute('DROP TABLE saved_documents')
+
+    def _connection(self):
+        """Return this thread's connection, opening it on first use."""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def save(self, document):
+        """
+        Write a named document, replacing any earlier version.
+
+        Only the segments changed since the document was last saved are
+        written, unless the database holds a different version than the
+        one those changes were made against, for instance because another
+        process saved the document in between; then every segment is.
+        """
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            self._write(db, document, time.time())
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        document.mark_saved()
+
+    def _write(self, db, document, updated):
+        """Write a document's changed segments, or all of them, inside a transaction."""
+        changes = document.unsaved_changes()
+        if changes is not None:
+            cursor = db.execute(
+                'UPDATE documents SET version = ?, count = ?, updated = ? '
+                'WHERE name = ? AND version = ? AND mode = ?',
+                (document.version, document.count, updated, document.name,
+                 document.saved_version, document.mode))
+            if cursor.rowcount == 0:
+                changes = None
+        if changes is None:
+            db.execute('DELETE FROM segments WHERE name = ?', (document.name,))
+            db.execute('INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)',
+                       (document.name, document.mode, document.version, document.count, updated))
+            removed, added = [], document.segments()
+        else:
+            removed, added = changes
+        db.executemany('DELETE FROM segments WHERE name = ? AND key = ?',
+                       ((document.name, key) for key in removed))
+        db.executemany('INSERT INTO segments VALUES (?, ?, ?, ?)',
+                       ((document.name, key, text.encode('utf-8', 'surrogatepass'), count)
+                        for key, text, count in added))
+
+    def load(self, name):
+        """Return the saved document with the given name, or None."""
+        db = self._connection()
+        db.execute('BEGIN')
+        try:
+            row = db.execute(
+                'SELECT mode, version FROM documents WHERE name = ?', (name,)).fetchone()
+            segments = db.execute(
+                'SELECT key, text, count FROM segments WHERE name = ? ORDER BY key',
+                (name,)).fetchall() if row else []
+        finally:
+            db.execute('COMMIT')
+        if row is None:
+            return None
+        mode, version = row
+        return Document.from_segments([text.decode('utf-8', 'surrogatepass') for _, text, _ in segments],
+                                      [count for _, _, count in segments],
+                                      [key for key, _, _ in segments],
+                                      mode=mode, name=name, version=version)
+
+    def version(self, name):
+        """Return the saved version of a document, or None if there is none."""
+        row = self._connection().execute(
+            'SELECT version FROM documents WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else None
+
+    def delete(self, name):
+        """Delete a saved document; returns True if it existed."""
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.execute('DELETE FROM segments WHERE name = ?', (name,))
+            cursor = db.execute('DELETE FROM documents WHERE name = ?', (name,))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return cursor.rowcount > 0
+
+    def list(self):
+        """Return name, mode, version, count and update time of each saved document, newest first."""
+        rows = self._connection().execute(
+            'SELECT name, mode, version, count, updated FROM documents ORDER BY updated DESC')
+        return [dict(zip(('name', 'mode', 'version', 'count', 'updated'), row)) for row in rows]
+
+class DocumentStore:
+    """
+    Documents in memory, evicting the least recently used.
+
+    Named documents are also saved to the database, if there is one, on
+    every change; evicting them only frees memory, and they are loaded
+    again when next requested. Unnamed documents are lost on eviction.
+
+    Attributes:
+        max_bytes (int): Budget for the approximate memory of all documents
+        database (SQLiteDocuments): Where named documents are saved, or None
+        lock (threading.Lock): Held by callers while reading or editing a document
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, database=None):
+        self.max_bytes = max_bytes
+        self.database = database
+        self.lock = threading.Lock()
+        self._documents = OrderedDict()  # id -> (document, bytes charged)
+        self._bytes = 0
+
+    def _insert(self, document):
+        """Add or re-charge a document and evict others to fit the budget."""
+        self._discard(document.id)
+        self._documents[document.id] = (document, document.size)
+        self._bytes += document.size
+        # The newest document is kept even if it alone exceeds the budget
+        while self._bytes > self.max_bytes and len(self._documents) > 1:
+            _, (_, size) = self._documents.popitem(last=False)
+            self._bytes -= size
+
+    def _discard(self, doc_id):
+        """Drop a document from memory; returns True if it was there."""
+        entry = self._documents.pop(doc_id, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+        return entry is not None
+
+    def create(self, text, mode='whitespace', name=None):
+        """
+        Store a new document, or replace a named one.
+
+        A replaced document's segment counts are reused for the segments
+        the new text still contains, and its version is carried on, so
+        edits made against the old text are rejected as stale.
+
+        Args:
+            text (str): Initial document text
+            mode (str): Tokenization mode. Defaults to 'whitespace'.
+            name (str): Name to save the document under. Defaults to an
+                unnamed document with a random id.
+
+        Returns:
+            Document: The new document
+
+        Raises:
+            ValueError: If the mode or name is invalid
+        """
+        previous = self.get(check_name(name)) if name is not None else None
+        known_counts = previous.segment_counts() if previous and previous.mode == mode else None
+        document = Document(text, mode=mode, name=name, known_counts=known_counts)
+        if previous is not None:
+            document.version = previous.version + 1
+        self.update(document)
+        return document
+
+    def update(self, document):
+        """Record a changed document: re-charge its memory and save it if named."""
+        if document.name is not None and self.database is not None:
+            self.database.save(document)
+        self._insert(document)
+
+    def get(self, doc_id):
+        """
+        Return the document with the given id, or None.
+
+        Named documents missing from memory are loaded from the database,
+        and ones that another process has since changed are reloaded.
+        """
+        entry = self._documents.get(doc_id)
+        document = entry[0] if entry else None
+        if self.database is not None and NAME_PATTERN.match(doc_id):
+            if document is None:
+                document = self.database.load(doc_id)
+            elif document.name is not None and self.database.version(doc_id) != document.version:
+                # Edited, replaced or deleted by another process
+                document = self.database.load(doc_id)
+        if document is None:
+            self._discard(doc_id)
+        elif entry is not None and entry[0] is document:
+            self._documents.move_to_end(doc_id)
+        else:
+            self._insert(document)
+        return document
+
+    def delete(self, doc_id):
+        """Forget a document, deleting it from the database if saved; returns True if it existed."""
+        deleted = self._discard(doc_id)
+        if self.database is not None and NAME_PATTERN.match(doc_id):
+            deleted = self.database.delete(doc_id) or deleted
+        return deleted
+
+    def list(self):
+        """Return a summary of each saved named document, newest first."""
+        return self.database.list() if self.database is not None else []
+
+    def stats(self):
+        """Report the number of documents in memory and their approximate size."""
+        return {'documents': len(self._documents), 'bytes': self._bytes}
@@ -0,0 +1,39 @@
+"""
+Gunicorn configuration for production serving.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app:app                    # WSGI, threaded workers
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:application
+
+Every setting can be overridden through the environment variables read
+below. Incremental counting sessions live in the memory of the worker
+that created them; browsers keep one connection open and so stay on
+that worker, and a client that lands on another worker gets a 404 and
+recreates its session.
+
+Threaded workers read request bodies on the worker thread, so a client
+that uploads slowly holds a thread until it is done. Put gunicorn behind
+a buffering proxy such as nginx, or use the uvicorn worker class, when
+clients may be slow.
+"""
+import os
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+
+# Counting is CPU bound, so one process per core; threads cover the time
+# spent waiting on the network
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = os.environ.get('WORKER_CLASS', 'gthread')
+
+# Streaming uploads of large files may take a while
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth
+max_requests = 10000
+max_requests_jitter = 1000
+
+accesslog = os.environ.get('ACCESS_LOG', '-') or None
+errorlog = '-'
@@ -0,0 +1,148 @@
+"""
+Service Metrics
+--------------
+Minimal in-process metrics in the Prometheus text exposition format:
+counters, histograms and gauges read from a callback at scrape time.
+
+Recording a sample takes a lock and a few list operations, cheap enough
+to do on every request. Each process keeps its own values; under a
+multi-process server such as gunicorn every scrape reports the worker
+that answered it, so run one worker or scrape workers individually for
+exact totals.
+"""
+
+import bisect
+import math
+import threading
+
+# Content type of the text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _format_value(value):
+    """Format a sample value the way Prometheus parses it."""
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=()):
+    """Render a label set like {route="/count",method="POST"}."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Counter:
+    """Monotonic counter, one value per combination of label values."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        """Add amount to the counter for the given label values."""
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labelvalues, value in values:
+            yield self.name + _labels(self.labelnames, labelvalues), value
+
+class Histogram:
+    """
+    Distribution of observed values over fixed buckets.
+
+    Attributes:
+        buckets (tuple): Sorted upper bounds; +Inf is added automatically
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        # Label values -> [per-bucket counts..., count above the last bound, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        """Record one observation for the given label values."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labelvalues)
+            if counts is None:
+                counts = self._values[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def samples(self):
+        with self._lock:
+            values = sorted((labels, list(counts)) for labels, counts in self._values.items())
+        for labelvalues, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _labels(self.labelnames, labelvalues, [('le', _format_value(bound))])
+                yield f'{self.name}_bucket{labels}', cumulative
+            labels = _labels(self.labelnames, labelvalues)
+            yield f'{self.name}_sum{labels}', counts[-1]
+            yield f'{self.name}_count{labels}', cumulative
+
+class Gauge:
+    """
+    Value read from a callback when the metrics are rendered.
+
+    With kind='counter' it exposes a monotonic total kept elsewhere, such
+    as the result cache's hit count.
+    """
+
+    def __init__(self, name, help_text, read, kind='gauge'):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self._read = read
+
+    def samples(self):
+        yield self.name, self._read()
+
+class Registry:
+    """A set of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        """Add a metric and return it."""
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, buckets, labelnames=()):
+        return self.register(Histogram(name, help_text, buckets, labelnames))
+
+    def gauge(self, name, help_text, read, kind='gauge'):
+        return self.register(Gauge(name, help_text, read, kind))
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, value in metric.samples():
+                lines.append(f'{name} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,267 @@
+"""
+Parallel Counting
+----------------
+Process pool helpers for counting on all cores.
+
+Batches: documents are counted in groups. Small groups are counted
+inline, since shipping them to another process costs more than counting
+them, and large groups are spread over a shared process pool. Results
+come back in input order as soon as each group finishes, so callers can
+stream them out.
+
+Large documents: the text is cut into chunks that end on whitespace (or
+another boundary character of the tokenization mode), so no word spans
+two chunks and the total is the sum of the chunk counts.
+The chunks are written once, UTF-8 encoded, into a shared memory block;
+workers receive only its name and their byte range and decode their
+slice in place, so the text is never pickled.
+
+Cancellation: the counting functions take an optional ``cancelled``
+callable, checked between groups and chunks, so the work of a request
+whose client has gone away is dropped instead of finished.
+"""
+
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from functools import partial
+from itertools import islice
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from wordcounter.wordcount import SPACE_PATTERN, _count_range, count_words, tokenizer_patterns
+
+# Number of documents read and dispatched together
+BATCH_GROUP_SIZE = 256
+
+# Total characters in a group above which it is counted in the pool
+BATCH_PARALLEL_CHARS = 1 << 20
+
+# Text length above which count_text() uses all cores
+PARALLEL_THRESHOLD = 8 << 20
+
+# Smallest chunk handed to a worker, in characters
+PARALLEL_MIN_CHUNK = 1 << 20
+
+# Seconds between cancellation checks while waiting for workers
+CANCEL_POLL_INTERVAL = 0.05
+
+_pool = None
+_pool_lock = threading.Lock()
+
+class CountCancelled(Exception):
+    """Raised when a count is abandoned because ``cancelled()`` returned True."""
+
+def pool_workers():
+    """Return the number of worker processes used by the shared pool."""
+    return os.cpu_count() or 1
+
+def make_pool(workers=None):
+    """
+    Create a process pool that can count shared memory blocks.
+
+    The resource tracker is started first so the workers share it with
+    this process. A worker started without it would run its own tracker,
+    which treats the blocks the worker attached to as leaked when it exits.
+    """
+    resource_tracker.ensure_running()
+    return ProcessPoolExecutor(max_workers=workers or pool_workers())
+
+def get_pool():
+    """Return the shared process pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = make_pool()
+            atexit.register(_pool.shutdown, cancel_futures=True)
+        return _pool
+
+def _count_group(texts, mode):
+    """Count a list of texts, in the pool when the group is large enough."""
+    count = partial(count_words, mode=mode)
+    if (pool_workers() > 1 and len(texts) > 1
+            and sum(map(len, texts)) >= BATCH_PARALLEL_CHARS):
+        chunksize = max(1, len(texts) // (pool_workers() * 4))
+        return get_pool().map(count, texts, chunksize=chunksize)
+    return map(count, texts)
+
+def split_chunks(text, parts, boundary_pattern=SPACE_PATTERN):
+    """
+    Split text into about ``parts`` pieces that each end on a boundary.
+
+    A piece runs past its target size up to the next boundary character
+    (whitespace by default), and the last piece takes whatever is left.
+    """
+    size = max(len(text) // max(parts, 1), PARALLEL_MIN_CHUNK)
+    chunks = []
+    pos = 0
+    end = len(text)
+    while pos < end:
+        stop = pos + size
+        if stop >= end:
+            stop = end
+        else:
+            boundary = boundary_pattern.search(text, stop - 1)
+            stop = boundary.end() if boundary else end
+        chunks.append(text[pos:stop])
+        pos = stop
+    return chunks
+
+def _count_shared(name, start, end, mode):
+    """Worker: count the UTF-8 text in bytes [start, end) of a shared block."""
+    shm = SharedMemory(name=name)
+    try:
+        return count_words(str(shm.buf[start:end], 'utf-8', 'surrogatepass'), mode)
+    finally:
+        shm.close()
+
+def _wait_all(futures, cancelled=None):
+    """
+    Wait for futures, cancelling the rest if ``cancelled()`` becomes True.
+
+    Raises:
+        CountCancelled: If the wait was abandoned
+    """
+    pending = futures
+    while pending:
+        if cancelled is not None and cancelled():
+            for future in futures:
+                future.cancel()
+            raise CountCancelled()
+        _, pending = wait(pending, timeout=CANCEL_POLL_INTERVAL if cancelled else None)
+    return [future.result() for future in futures]
+
+def _count_interruptible(text, mode, cancelled):
+    """Count in windows of PARALLEL_MIN_CHUNK, checking cancelled() between them."""
+    word_pattern, boundary_pattern = tokenizer_patterns(mode)
+    count = 0
+    pos = 0
+    end = len(text)
+    while pos < end:
+        if cancelled():
+            raise CountCancelled()
+        stop = pos + PARALLEL_MIN_CHUNK
+        if stop >= end:
+            stop = end
+        else:
+            boundary = boundary_pattern.search(text, stop)
+            stop = boundary.start() if boundary else end
+        count += _count_range(text, pos, stop, word_pattern, boundary_pattern)
+        pos = stop
+    return count
+
+def count_words_parallel(text, workers=None, executor=None, mode='whitespace',
+                         cancelled=None):
+    """
+    Count words in a large text on several processes.
+
+    Args:
+        text (str): Text to count
+        workers (int, optional): Number of processes the work is split
+            for. Defaults to the number of CPUs.
+        executor (Executor, optional): Pool from make_pool() to run on.
+            Defaults to the shared pool.
+        mode (str): Tokenization mode. Defaults to 'whitespace'.
+        cancelled (callable, optional): Polled while the workers run; when
+            it returns True, chunks not yet started are dropped.
+
+    Returns:
+        int: Number of words, identical to count_words(text, mode)
+
+    Raises:
+        CountCancelled: If ``cancelled()`` returned True
+    """
+    workers = workers or pool_workers()
+    boundary_pattern = tokenizer_patterns(mode)[1]
+    chunks = [chunk.encode('utf-8', 'surrogatepass')
+              for chunk in split_chunks(text, workers * 4, boundary_pattern)]
+    if len(chunks) < 2:
+        return count_words(text, mode)
+
+    shm = SharedMemory(create=True, size=sum(map(len, chunks)))
+    try:
+        starts = []
+        ends = []
+        pos = 0
+        for chunk in chunks:
+            shm.buf[pos:pos + len(chunk)] = chunk
+            starts.append(pos)
+            pos += len(chunk)
+            ends.append(pos)
+        del chunks
+        executor = executor or get_pool()
+        futures = [executor.submit(_count_shared, shm.name, start, stop, mode)
+                   for start, stop in zip(starts, ends)]
+        return sum(_wait_all(futures, cancelled))
+    finally:
+        shm.close()
+        shm.unlink()
+
+def count_text(text, mode='whitespace', cancelled=None):
+    """
+    Count words, on all cores when the text is large enough to pay off.
+
+    Texts of PARALLEL_THRESHOLD characters or more go through
+    count_words_parallel() when more than one CPU is available, and are
+    otherwise counted in windows so ``cancelled()`` can still be checked.
+
+    Raises:
+        CountCancelled: If ``cancelled()`` returned True
+    """
+    if len(text) >= PARALLEL_THRESHOLD:
+        if pool_workers() > 1:
+            return count_words_parallel(text, mode=mode, cancelled=cancelled)
+        if cancelled is not None:
+            return _count_interruptible(text, mode, cancelled)
+    return count_words(text, mode)
+
+def count_batch(documents, mode='whitespace', cancelled=None):
+    """
+    Count words in a sequence of documents.
+
+    Args:
+        documents (iterable): Strings, or dicts with a 'text' key and an
+            optional 'id' that is echoed back. It is consumed lazily, one
+            group at a time.
+        mode (str): Tokenization mode. Defaults to 'whitespace'.
+        cancelled (callable, optional): Checked before each group; when it
+            returns True the rest of the batch is dropped.
+
+    Yields:
+        dict: One result per document, in input order, with 'index',
+        'count' and 'id' (when given), or 'index' and 'error' for
+        documents that are not valid
+
+    Raises:
+        CountCancelled: If ``cancelled()`` returned True
+    """
+    # Reject an unknown mode before anything is streamed
+    tokenizer_patterns(mode)
+    documents = iter(documents)
+    index = 0
+    while True:
+        if cancelled is not None and cancelled():
+            raise CountCancelled()
+        group = list(islice(documents, BATCH_GROUP_SIZE))
+        if not group:
+            return
+        results = []
+        texts = []
+        for document in group:
+            result = {'index': index}
+            index += 1
+            if isinstance(document, dict):
+                if 'id' in document:
+                    result['id'] = document['id']
+                document = document.get('text')
+            if isinstance(document, str):
+                texts.append(document)
+            else:
+                result['error'] = "Each document must be a string or have a 'text' string"
+            results.append(result)
+
+        counts = _count_group(texts, mode)
+        for result in results:
+            if 'error' not in result:
+                result['count'] = next(counts)
+            yield result
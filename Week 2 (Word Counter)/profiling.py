@@ -0,0 +1,72 @@
+"""
+Request Profiling
+----------------
+Opt-in cProfile sampling: a fraction of requests run under the
+deterministic profiler and their stats are written as .prof files
+(pstats format, readable by ``python -m pstats``, snakeviz or
+gprof2dot). When profiling is off nothing is installed, so requests pay
+nothing for it; an external sampler such as ``py-spy record --pid``
+needs no hook at all.
+"""
+
+import cProfile
+import os
+import random
+import re
+import time
+
+# Characters allowed in the route part of a dump's file name
+UNSAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]+')
+
+class SampledProfiler:
+    """
+    Profiles a random sample of requests and dumps their stats.
+
+    Attributes:
+        directory (str): Where .prof files are written
+        sample_rate (float): Fraction of requests profiled, 0 to 1
+        dumps (int): Number of profiles written so far
+    """
+
+    def __init__(self, directory, sample_rate=0.01):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.dumps = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        """
+        Start profiling the current thread if this request is sampled.
+
+        Returns:
+            cProfile.Profile or None: Pass it to stop() when the request ends
+        """
+        if random.random() >= self.sample_rate:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active on this thread
+            return None
+        return profile
+
+    def stop(self, profile, name):
+        """
+        Stop a profile from start() and write its stats.
+
+        Args:
+            profile (cProfile.Profile): Running profile
+            name (str): Label for the file name, such as the route
+
+        Returns:
+            str: Path of the written .prof file
+        """
+        profile.disable()
+        label = UNSAFE_NAME.sub('_', name).strip('_') or 'request'
+        path = os.path.join(self.directory,
+                            f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-'
+                            f'{time.monotonic_ns()}-{label}.prof')
+        profile.dump_stats(path)
+        self.dumps += 1
+        return path
@@ -0,0 +1,133 @@
+"""
+Rate Limiting
+------------
+Token buckets per client. A bucket holds up to ``burst`` tokens and
+refills at ``rate`` tokens per second; a request is admitted if it can
+take its cost in tokens, and otherwise told how long to wait.
+
+MemoryBuckets keeps the buckets in the process, so each server worker
+limits on its own. SQLiteBuckets keeps them in a local database file
+shared by all workers on the host, at the cost of a small transaction
+per request.
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+def _refill(tokens, elapsed, rate, burst):
+    return min(burst, tokens + max(elapsed, 0) * rate)
+
+def _take(tokens, cost, rate, burst):
+    """
+    Try to take cost tokens from a refilled bucket.
+
+    Returns:
+        tuple: (tokens left, seconds to wait; 0 if the request is admitted)
+    """
+    cost = min(cost, burst)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / rate
+
+class MemoryBuckets:
+    """
+    In-process token buckets, forgetting the least recently seen clients.
+
+    Attributes:
+        rate (float): Tokens added per second
+        burst (float): Bucket capacity
+        max_clients (int): Buckets kept; a forgotten client starts full
+    """
+
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # key -> (tokens, last update)
+        self._lock = threading.Lock()
+
+    def take(self, key, cost=1):
+        """
+        Take tokens for a request.
+
+        Args:
+            key (str): Client identifier
+            cost (float): Tokens the request costs; capped at burst
+
+        Returns:
+            float: 0 if the request is admitted, else seconds to wait
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = _refill(tokens, now - updated, self.rate, self.burst)
+            tokens, wait = _take(tokens, cost, self.rate, self.burst)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+class SQLiteBuckets:
+    """
+    Token buckets in an SQLite file shared by the processes of one host.
+
+    Each take() is one IMMEDIATE transaction, which serialises updates
+    across processes. Buckets that have been full for a while are pruned
+    every PRUNE_INTERVAL calls.
+
+    Attributes:
+        path (str): Database file
+        rate (float): Tokens added per second
+        burst (float): Bucket capacity
+    """
+
+    PRUNE_INTERVAL = 1000
+
+    def __init__(self, path, rate, burst):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self._local = threading.local()
+        self._calls = 0
+        self._connection().execute('CREATE TABLE IF NOT EXISTS buckets '
+                                   '(key TEXT PRIMARY KEY, tokens REAL, updated REAL)')
+
+    def _connection(self):
+        """Return this thread's connection, opening it on first use."""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=OFF')
+            self._local.db = db
+        return db
+
+    def take(self, key, cost=1):
+        """Take tokens for a request; see MemoryBuckets.take()."""
+        now = time.time()
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute('SELECT tokens, updated FROM buckets WHERE key = ?',
+                             (key,)).fetchone()
+            tokens, updated = row if row else (self.burst, now)
+            tokens = _refill(tokens, now - updated, self.rate, self.burst)
+            tokens, wait = _take(tokens, cost, self.rate, self.burst)
+            db.execute('INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)', (key, tokens, now))
+            self._calls += 1
+            if self._calls % self.PRUNE_INTERVAL == 0:
+                # A bucket untouched for this long has refilled completely
+                db.execute('DELETE FROM buckets WHERE updated < ?',
+                           (now - self.burst / self.rate,))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return wait
+
+def retry_after(wait):
+    """Format a wait in seconds for the Retry-After header."""
+    return str(max(1, math.ceil(wait)))
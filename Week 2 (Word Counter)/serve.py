@@ -0,0 +1,28 @@
+"""
+Production Server
+----------------
+Runs the application under waitress, a pure-Python WSGI server that also
+works on Windows, where gunicorn is not available. Waitress buffers
+request and response bodies in its I/O thread, so slow clients do not
+hold one of the worker threads.
+
+Usage:
+    python serve.py [--host 0.0.0.0] [--port 8000] [--threads 8]
+"""
+
+import argparse
+import os
+from waitress import serve
+from app import app
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Word Counter with waitress.")
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 8000)))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('WEB_THREADS', 8)))
+    args = parser.parse_args()
+    serve(app, host=args.host, port=args.port, threads=args.threads,
+          connection_limit=1000, channel_timeout=120)
+
+if __name__ == '__main__':
+    main()
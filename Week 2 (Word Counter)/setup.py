@@ -0,0 +1,25 @@
+from setuptools import setup
+
+setup(
+    name="word-counter",
+    version="1.0.0",
+    packages=["wordcounter"],
+    python_requires=">=3.8",
+    author="sanjeeviraju",
+    author_email="your.email@example.com",
+    description="Word counting library and command line tool behind the Word Counter web app",
+    long_description=open("README.md", encoding="utf-8").read(),
+    long_description_content_type="text/markdown",
+    url="https://github.com/Sanjeeviraju/word-counter",
+    classifiers=[
+        "Programming Language :: Python :: 3",
+        "License :: OSI Approved :: MIT License",
+        "Operating System :: OS Independent",
+    ],
+    entry_points={
+        'console_scripts': [
+            'wordcount=wordcounter.cli:main',
+            'wordcount-index=wordcounter.frequencies:main',
+        ],
+    },
+)
@@ -0,0 +1,19 @@
+/**
+ * Counting Worker
+ * -------------
+ * Counts words off the main thread so typing stays responsive however
+ * long the text is. Each message carries an id that is echoed back, so
+ * the page can ignore results for text that has changed since.
+ */
+
+// The page passes the content-hashed URL of the rules in the query string
+importScripts(new URLSearchParams(self.location.search).get('rules') || 'wordcount.js');
+
+self.onmessage = (event) => {
+    const { id, text, mode } = event.data;
+    try {
+        self.postMessage({ id: id, count: countWords(text, mode) });
+    } catch (error) {
+        self.postMessage({ id: id, error: error.message });
+    }
+};
@@ -4,13 +4,19 @@
  * Handles real-time word counting, theme switching, and API communication
  */
 
-// Initialize real-time counting with debouncing
-document.getElementById('text-input').addEventListener('input', debounce(countWords, 300));
+// Count locally on every change and confirm with the server once typing
+// pauses; statistics for the previous text are no longer worth waiting for
+document.getElementById('text-input').addEventListener('input', () => {
+    countLocally();
+    cancelRequest('stats');
+    syncDebounced();
+});
 
 /**
  * Debounce function to limit API calls
  * @param {Function} func - Function to debounce
- * @param {number} wait - Milliseconds to wait
+ * @param {number|Function} wait - Milliseconds to wait, or a function
+ *     returning them, called on each invocation
  * @returns {Function} Debounced function
  */
 function debounce(func, wait) {
@@ -21,10 +27,54 @@ function debounce(func, wait) {
             func(...args);
         };
         clearTimeout(timeout);
-        timeout = setTimeout(later, wait);
+        timeout = setTimeout(later, typeof wait === 'function' ? wait() : wait);
     };
 }
 
+/**
+ * Request Tracking
+ * --------------
+ * Each kind of request ('sync', 'stats', 'file') has at most one live
+ * request. Starting a new one aborts the previous one, and every request
+ * gets a number from a single increasing sequence so a response can
+ * check that nothing newer has started before it is displayed.
+ */
+
+const requests = {
+    sequence: 0,        // Last number handed out
+    latest: {},         // Kind -> number of its newest request
+    controllers: {}     // Kind -> AbortController of its newest request
+};
+
+/**
+ * Start a request, aborting the previous one of the same kind
+ * @param {string} kind - Request kind
+ * @returns {{signal: AbortSignal, sequence: number}} Fetch signal and request number
+ */
+function beginRequest(kind) {
+    cancelRequest(kind);
+    const controller = new AbortController();
+    requests.controllers[kind] = controller;
+    requests.latest[kind] = ++requests.sequence;
+    return { signal: controller.signal, sequence: requests.sequence };
+}
+
+function cancelRequest(kind) {
+    const controller = requests.controllers[kind];
+    if (controller) {
+        controller.abort();
+        delete requests.controllers[kind];
+    }
+}
+
+function isLatest(kind, sequence) {
+    return requests.latest[kind] === sequence;
+}
+
+function isAbort(error) {
+    return error.name === 'AbortError';
+}
+
 /**
  * Theme Management
  * --------------
@@ -56,32 +106,501 @@ function updateThemeIcon(theme) {
 /**
  * Word Counting Logic
  * -----------------
- * Handles API communication and result display
+ * Words are counted in a worker as the user types, with the same rules as
+ * the server (static/wordcount.js). The server keeps a copy of the
+ * document for the statistics and stays authoritative: its count replaces
+ * the local one once typing pauses. After the first request only the
+ * changed range is sent, so the cost of each update follows the size of
+ * the edit. Without worker support every count comes from the server.
  */
 
+const localCounter = {
+    worker: createWorker(workerUrl(document.currentScript)),
+    sequence: 0,    // Id of the latest text sent to the worker
+    text: null,     // Latest text sent to the worker
+    count: null     // Worker's count for that text, once it arrives
+};
+
+// Server confirmation delay. It starts shorter when the server is the
+// only source of counts and grows with the measured round trip time and
+// the document size, so a slow server or a large document is not sent a
+// request for every short pause in typing.
+const SYNC_DELAY = localCounter.worker ? 1000 : 300;
+const MAX_SYNC_DELAY = 3000;
+const SYNC_DELAY_CHARS_PER_MS = 10000;
+const LATENCY_SMOOTHING = 0.3;
+
+const latency = {
+    estimate: 0     // Moving average of sync round trips in milliseconds
+};
+
+function syncDelay() {
+    const length = document.getElementById('text-input').value.length;
+    const adaptive = 2 * latency.estimate + length / SYNC_DELAY_CHARS_PER_MS;
+    return Math.min(MAX_SYNC_DELAY, Math.max(SYNC_DELAY, adaptive));
+}
+
+function recordLatency(milliseconds) {
+    latency.estimate = latency.estimate
+        ? latency.estimate + LATENCY_SMOOTHING * (milliseconds - latency.estimate)
+        : milliseconds;
+}
+
+const syncDebounced = debounce(countWords, syncDelay);
+
+// The page gives the content-hashed URLs of the worker and the rules it
+// loads; otherwise they are looked up next to this script
+function workerUrl(script) {
+    const url = new URL(script.dataset.workerUrl || 'count-worker.js', script.src);
+    if (script.dataset.rulesUrl) {
+        url.searchParams.set('rules', new URL(script.dataset.rulesUrl, script.src).href);
+    }
+    return url;
+}
+
+function createWorker(url) {
+    if (!window.Worker) {
+        return null;
+    }
+    try {
+        const worker = new Worker(url);
+        worker.onmessage = showLocalCount;
+        worker.onerror = disableWorker;
+        return worker;
+    } catch (error) {
+        return null;
+    }
+}
+
+function disableWorker(event) {
+    console.error('Counting worker failed; using the server only:', event.message);
+    localCounter.worker = null;
+}
+
+function countLocally() {
+    if (!localCounter.worker) {
+        return;
+    }
+    localCounter.text = document.getElementById('text-input').value;
+    localCounter.count = null;
+    localCounter.worker.postMessage({
+        id: ++localCounter.sequence,
+        text: localCounter.text,
+        mode: session.mode
+    });
+}
+
+function showLocalCount(event) {
+    const { id, count, error } = event.data;
+    if (id !== localCounter.sequence) {
+        return;  // Superseded by a newer text
+    }
+    if (error !== undefined) {
+        disableWorker({ message: error });
+        return;
+    }
+    localCounter.count = count;
+    const resultElement = document.getElementById('word-count');
+    resultElement.textContent = count;
+    resultElement.style.color = 'var(--text-color)';
+}
+
+const session = {
+    id: null,       // Server-side document id
+    name: null,     // Name the document is saved under, if any
+    mode: 'whitespace', // Tokenization mode the document is counted with
+    version: 0,     // Document version the next edit applies to
+    text: '',       // Text the server currently holds
+    count: 0,
+    busy: false,    // A request is in flight
+    uploading: false, // That request sends the whole text
+    dirty: false    // The text changed while a request was in flight
+};
+
+/**
+ * Find the single range that turns oldText into newText
+ * @param {string} oldText - Text the server holds
+ * @param {string} newText - Current textarea content
+ * @returns {{start: number, end: number, text: string}} Edit in UTF-16 offsets
+ */
+function diffRange(oldText, newText) {
+    const minLength = Math.min(oldText.length, newText.length);
+    let start = 0;
+    while (start < minLength && oldText.charCodeAt(start) === newText.charCodeAt(start)) {
+        start++;
+    }
+    let oldEnd = oldText.length;
+    let newEnd = newText.length;
+    while (oldEnd > start && newEnd > start &&
+           oldText.charCodeAt(oldEnd - 1) === newText.charCodeAt(newEnd - 1)) {
+        oldEnd--;
+        newEnd--;
+    }
+    // Never split a surrogate pair
+    if (start > 0 && isHighSurrogate(oldText.charCodeAt(start - 1))) {
+        start--;
+    }
+    if (oldEnd < oldText.length && isLowSurrogate(oldText.charCodeAt(oldEnd))) {
+        oldEnd++;
+        newEnd++;
+    }
+    return { start: start, end: oldEnd, text: newText.slice(start, newEnd) };
+}
+
+function isHighSurrogate(code) {
+    return code >= 0xD800 && code <= 0xDBFF;
+}
+
+function isLowSurrogate(code) {
+    return code >= 0xDC00 && code <= 0xDFFF;
+}
+
+async function postJSON(url, method, payload, signal) {
+    return fetch(url, {
+        method: method,
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(payload),
+        signal: signal
+    });
+}
+
+// Full uploads of at least this many characters are sent gzip-compressed
+const COMPRESS_MIN_CHARS = 64 * 1024;
+
+/**
+ * Upload text as a text/plain body, which needs no JSON escaping
+ * @param {string} url - Endpoint accepting text/plain
+ * @param {string} text - Text to send
+ * @param {AbortSignal} signal - Aborts the request
+ * @param {string} [method='POST'] - HTTP method
+ * @returns {Promise<Response>} Server response
+ */
+async function postText(url, text, signal, method = 'POST') {
+    const headers = { 'Content-Type': 'text/plain; charset=utf-8' };
+    let body = text;
+    if (text.length >= COMPRESS_MIN_CHARS && window.CompressionStream) {
+        const compressed = new Blob([text]).stream().pipeThrough(new CompressionStream('gzip'));
+        body = await new Response(compressed).blob();
+        headers['Content-Encoding'] = 'gzip';
+    }
+    return fetch(url, { method: method, headers: headers, body: body, signal: signal });
+}
+
+/**
+ * Bring the server's copy of the document up to date
+ * @param {string} text - Current textarea content
+ * @param {AbortSignal} signal - Aborts the request
+ * @returns {Promise<Object>} Server response with the word count
+ */
+async function syncDocument(text, signal) {
+    if (session.id !== null) {
+        if (text === session.text) {
+            return { status: 'success', count: session.count };
+        }
+        const response = await postJSON(`/documents/${encodeURIComponent(session.id)}`, 'PATCH', {
+            version: session.version,
+            edits: [diffRange(session.text, text)]
+        }, signal);
+        // Unknown document, stale version or an edit too large to send as
+        // JSON: start a new session below
+        if (response.status !== 404 && response.status !== 409 && response.status !== 413) {
+            const data = await response.json();
+            if (data.status === 'success') {
+                Object.assign(session, { version: data.version, text: text, count: data.count });
+            }
+            return data;
+        }
+    }
+
+    // Named documents are saved under their name, replacing the saved copy
+    session.uploading = true;
+    const query = `?mode=${encodeURIComponent(session.mode)}`;
+    const response = session.name
+        ? await postText(`/documents/${encodeURIComponent(session.name)}${query}`, text, signal, 'PUT')
+        : await postText(`/documents${query}`, text, signal);
+    const data = await response.json();
+    if (data.status === 'success') {
+        Object.assign(session, { id: data.id, version: data.version, text: text, count: data.count });
+        if (response.status === 201 && session.name) {
+            listDocuments();
+        }
+    }
+    return data;
+}
+
+/**
+ * Sync the document and show the server's count
+ *
+ * Edits are sent one at a time, since the server's document version must
+ * stay known; text changed meanwhile is sent when the edit completes. A
+ * full upload is aborted instead, as the newer text replaces it anyway.
+ */
 async function countWords() {
+    if (session.busy) {
+        session.dirty = true;
+        if (session.uploading) {
+            cancelRequest('sync');
+        }
+        return;
+    }
+    session.busy = true;
+
     const textInput = document.getElementById('text-input').value;
     const resultElement = document.getElementById('word-count');
+    const { signal, sequence } = beginRequest('sync');
+    const sending = session.id === null || textInput !== session.text;
+    const started = performance.now();
     
     try {
-        const response = await fetch('/count', {
+        const data = await syncDocument(textInput, signal);
+        if (sending) {
+            recordLatency(performance.now() - started);
+        }
+        
+        if (data.status === 'success') {
+            // A count for text that has changed since would be stale
+            if (isLatest('sync', sequence) && textInput === document.getElementById('text-input').value) {
+                if (localCounter.text === textInput && localCounter.count !== null &&
+                        localCounter.count !== data.count) {
+                    console.warn(`Local count ${localCounter.count} differs from server count ${data.count}`);
+                }
+                resultElement.textContent = data.count;
+                resultElement.style.color = 'var(--text-color)';
+            }
+            refreshStatsDebounced();
+        } else {
+            resultElement.textContent = 'Error';
+            resultElement.style.color = '#ff4444';
+        }
+    } catch (error) {
+        if (!isAbort(error)) {
+            resultElement.textContent = 'Error';
+            resultElement.style.color = '#ff4444';
+            console.error('Error:', error);
+        }
+    } finally {
+        session.busy = false;
+        session.uploading = false;
+        if (session.dirty) {
+            session.dirty = false;
+            countWords();
+        }
+    }
+}
+
+// A document keeps the mode it was created with, so changing the mode
+// starts a new one and abandons requests for the old one
+const modeSelect = document.getElementById('mode-select');
+modeSelect.value = localStorage.getItem('mode') || 'whitespace';
+session.mode = modeSelect.value;
+
+modeSelect.addEventListener('change', () => {
+    session.mode = modeSelect.value;
+    session.id = null;
+    localStorage.setItem('mode', session.mode);
+    cancelRequest('sync');
+    cancelRequest('stats');
+    countLocally();
+    countWords();
+});
+
+/**
+ * Named Documents
+ * -------------
+ * A document given a name is saved on the server and the page reopens
+ * it on the next visit. Entering the name of a saved document opens it;
+ * a new name saves the current text under it, and an empty one goes back
+ * to an unsaved document.
+ */
+
+const documentName = document.getElementById('document-name');
+
+function setDocumentName(name) {
+    session.name = name;
+    documentName.value = name || '';
+    if (name) {
+        localStorage.setItem('document', name);
+    } else {
+        localStorage.removeItem('document');
+    }
+}
+
+/**
+ * Fill the name suggestions with the saved documents
+ * @returns {Promise<string[]>} Names of the saved documents
+ */
+async function listDocuments() {
+    try {
+        const response = await fetch('/documents');
+        const data = await response.json();
+        const names = data.status === 'success' ? data.documents.map(({ name }) => name) : [];
+        document.getElementById('document-names').replaceChildren(...names.map(name => {
+            const option = document.createElement('option');
+            option.value = name;
+            return option;
+        }));
+        return names;
+    } catch (error) {
+        console.error('Error:', error);
+        return [];
+    }
+}
+
+async function openDocument(name) {
+    const { signal, sequence } = beginRequest('open');
+    try {
+        const response = await fetch(`/documents/${encodeURIComponent(name)}`, { signal });
+        const data = await response.json();
+        if (!isLatest('open', sequence)) {
+            return;
+        }
+        if (response.status === 404) {
+            // Not saved yet: the next sync saves it
+            setDocumentName(name);
+            session.id = null;
+            return;
+        }
+        if (data.status !== 'success') {
+            console.error('Error:', data.error);
+            return;
+        }
+        // The opened text replaces whatever was being synced
+        cancelRequest('sync');
+        cancelRequest('stats');
+        setDocumentName(name);
+        document.getElementById('text-input').value = data.text;
+        modeSelect.value = data.mode;
+        localStorage.setItem('mode', data.mode);
+        Object.assign(session, {
+            id: data.id, mode: data.mode, version: data.version, text: data.text, count: data.count
+        });
+        const resultElement = document.getElementById('word-count');
+        resultElement.textContent = data.count;
+        resultElement.style.color = 'var(--text-color)';
+        countLocally();
+        refreshStats();
+    } catch (error) {
+        if (!isAbort(error)) {
+            console.error('Error:', error);
+        }
+    }
+}
+
+documentName.addEventListener('change', async () => {
+    const name = documentName.value.trim();
+    if (!documentName.checkValidity() || name === (session.name || '')) {
+        return;
+    }
+    if (name && (await listDocuments()).includes(name)) {
+        openDocument(name);
+        return;
+    }
+    setDocumentName(name || null);
+    session.id = null;
+    cancelRequest('sync');
+    countWords();
+});
+
+setDocumentName(localStorage.getItem('document'));
+listDocuments();
+if (session.name) {
+    openDocument(session.name);
+}
+
+/**
+ * Text Statistics
+ * -------------
+ * The statistics panel is refreshed from the server's copy of the
+ * document, less often than the word count since it needs a full pass
+ */
+
+const refreshStatsDebounced = debounce(refreshStats, 1000);
+
+async function refreshStats() {
+    if (session.id === null) {
+        return;
+    }
+    const { signal, sequence } = beginRequest('stats');
+    try {
+        const response = await fetch(`/documents/${encodeURIComponent(session.id)}/stats?top=10`, { signal });
+        const data = await response.json();
+        if (data.status === 'success' && isLatest('stats', sequence) &&
+                data.version === session.version) {
+            renderStats(data.stats);
+        }
+    } catch (error) {
+        if (!isAbort(error)) {
+            console.error('Error:', error);
+        }
+    }
+}
+
+function renderStats(stats) {
+    document.getElementById('stat-characters').textContent = stats.characters;
+    document.getElementById('stat-characters-no-spaces').textContent = stats.characters_no_spaces;
+    document.getElementById('stat-sentences').textContent = stats.sentences;
+    document.getElementById('stat-paragraphs').textContent = stats.paragraphs;
+    document.getElementById('stat-unique-words').textContent = stats.unique_words;
+    document.getElementById('stat-reading-time').textContent =
+        `${Math.ceil(stats.reading_time_seconds / 60)} min`;
+
+    const list = document.getElementById('top-words');
+    list.replaceChildren(...stats.top_words.map(({ word, count }) => {
+        const item = document.createElement('li');
+        item.textContent = `${word} (${count})`;
+        return item;
+    }));
+}
+
+/**
+ * File Counting
+ * -----------
+ * Uploads a file to the streaming endpoint, which counts it in chunks
+ * without loading it into memory
+ */
+
+document.getElementById('file-input').addEventListener('change', countFile);
+
+async function countFile(event) {
+    const file = event.target.files[0];
+    const resultElement = document.getElementById('file-count');
+    // A new selection replaces any upload still in progress
+    const { signal, sequence } = beginRequest('file');
+    if (!file) {
+        cancelRequest('file');
+        resultElement.textContent = '';
+        return;
+    }
+
+    const formData = new FormData();
+    formData.append('file', file);
+    resultElement.textContent = 'Counting...';
+    resultElement.style.color = 'var(--text-color)';
+
+    try {
+        const response = await fetch(`/count/stream?mode=${session.mode}`, {
             method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ text: textInput })
+            body: formData,
+            signal: signal
         });
-        
+
         const data = await response.json();
-        
+
+        if (!isLatest('file', sequence)) {
+            return;
+        }
         if (data.status === 'success') {
-            resultElement.textContent = data.count;
-            resultElement.style.color = 'var(--text-color)';
+            resultElement.textContent = `${data.count} words`;
         } else {
             resultElement.textContent = 'Error';
             resultElement.style.color = '#ff4444';
         }
     } catch (error) {
+        if (isAbort(error)) {
+            return;
+        }
         resultElement.textContent = 'Error';
         resultElement.style.color = '#ff4444';
         console.error('Error:', error);
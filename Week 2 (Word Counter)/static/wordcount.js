@@ -0,0 +1,103 @@
+/**
+ * Word Counting Rules
+ * -----------------
+ * JavaScript mirror of wordcount.py, used by the counting worker for
+ * instant local counts. The patterns follow the Python ones character
+ * class for character class; conformance/corpus.json holds the cases
+ * both implementations must agree on (see conformance/check.py).
+ *
+ * Differences can only come from Unicode versions: a character assigned
+ * after the server's Python Unicode database may be a letter here and
+ * punctuation there. The server's count stays authoritative.
+ */
+
+// Python's str.isspace() set, which \s matches in Python; JavaScript's
+// \s differs (it has U+FEFF and lacks U+001C-U+001F and U+0085)
+const SPACE = '\\t-\\r\\x1c-\\x20\\x85\\xa0\\u1680\\u2000-\\u200a\\u2028\\u2029\\u202f\\u205f\\u3000';
+
+// Scripts written without spaces between words (HAN_RANGES etc. in wordcount.py)
+const HAN = '\\u3005\\u3007\\u3021-\\u3029\\u3038-\\u303b\\u3400-\\u4dbf\\u4e00-\\u9fff\\uf900-\\ufaff\\u{20000}-\\u{3ffff}';
+const HIRAGANA = '\\u3041-\\u3096\\u309d-\\u309f';
+const KATAKANA = '\\u30a1-\\u30fa\\u30fc-\\u30ff\\u31f0-\\u31ff\\uff66-\\uff9f';
+const CJK = HAN + HIRAGANA + KATAKANA;
+
+// UAX #29 separators (MID_LETTER, MID_NUM_LET and MID_NUM in wordcount.py)
+const MID_LETTER = ':\\u00b7\\u0387\\u055f\\u05f4\\u2027\\ufe13\\ufe55\\uff1a';
+const MID_NUM_LET = "'.\\u2018\\u2019\\u2024\\ufe52\\uff07\\uff0e";
+const MID_NUM = ',;\\u037e\\u0589\\u060c\\u060d\\u066c\\u07f8\\u2044\\ufe10\\ufe14\\ufe50\\ufe54\\uff0c\\uff1b';
+
+// str.isalnum() is exactly the letter and number categories
+const ALNUM = '\\p{L}\\p{N}';
+
+function buildPattern(mode) {
+    if (mode === 'whitespace') {
+        return `[${ALNUM}][^${SPACE}]*`;
+    }
+    // Alphanumeric characters outside the Han and Kana scripts
+    const alnum = `(?:(?![${CJK}])[${ALNUM}])`;
+    if (mode === 'cjk') {
+        return `${alnum}[^${SPACE}${CJK}]*|[${HAN}]([${HAN}]*)|[${HIRAGANA}]+|[${KATAKANA}]+`;
+    }
+    if (mode === 'uax29') {
+        const extend = '(?:(?!\\u200b)[\\p{M}\\p{Cf}])';
+        const run = `${alnum}+(?:${extend}+${alnum}*)*`;
+        const letter = '[\\p{L}\\p{Nl}\\p{No}]';
+        const join = `(?:_+|(?<=${letter})[${MID_LETTER}${MID_NUM_LET}](?=${letter})` +
+                     `|(?<=\\p{Nd})[${MID_NUM}${MID_NUM_LET}](?=\\p{Nd}))`;
+        const ideographs = HAN + HIRAGANA;
+        return `${run}(?:${join}${run})*|[${ideographs}]([${ideographs}]*)|[${KATAKANA}]+`;
+    }
+    throw new Error(`Unknown tokenization mode: ${mode}`);
+}
+
+const patterns = new Map();
+
+function tokenizerPattern(mode) {
+    if (!patterns.has(mode)) {
+        patterns.set(mode, new RegExp(buildPattern(mode), 'gu'));
+    }
+    return patterns.get(mode);
+}
+
+/**
+ * Count code points, as Python's len() does
+ * @param {string} text - Text to measure
+ * @returns {number} Number of code points
+ */
+function codePointLength(text) {
+    let length = text.length;
+    for (let i = 0; i < text.length; i++) {
+        const code = text.charCodeAt(i);
+        if (code >= 0xDC00 && code <= 0xDFFF && i > 0) {
+            const previous = text.charCodeAt(i - 1);
+            if (previous >= 0xD800 && previous <= 0xDBFF) {
+                length--;
+            }
+        }
+    }
+    return length;
+}
+
+/**
+ * Count words with the same rules as count_words() in wordcount.py
+ * @param {string} text - Text to count
+ * @param {string} mode - 'whitespace', 'uax29' or 'cjk'
+ * @returns {number} Number of words
+ */
+function countWords(text, mode = 'whitespace') {
+    const pattern = tokenizerPattern(mode);
+    if (!text) {
+        return 0;
+    }
+    // Each match is one word, plus one per character in a run of
+    // ideographs captured by the group
+    let count = 0;
+    for (const match of text.matchAll(pattern)) {
+        count += 1 + (match[1] ? codePointLength(match[1]) : 0);
+    }
+    return count;
+}
+
+if (typeof module !== 'undefined') {
+    module.exports = { countWords };
+}
@@ -0,0 +1,42 @@
+"""
+Shared setup for the test suite.
+
+The application reads its configuration from the environment when app is
+first imported, so rate limiting is turned off and the document database
+and frequency index are pointed at a temporary folder before any test
+imports it.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+# Corpus generators shared with the standalone benchmarks
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+_instance = tempfile.TemporaryDirectory(prefix='wordcounter-tests-')
+os.environ['RATE_LIMIT'] = '0'
+os.environ['DOCUMENTS_DB'] = os.path.join(_instance.name, 'documents.sqlite3')
+os.environ['FREQUENCY_INDEX'] = os.path.join(_instance.name, 'frequencies')
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('wordcounter')
+    group.addoption('--bench-large', action='store_true',
+                    help="also benchmark count_words on 10MB and 100MB corpora")
+    group.addoption('--bench-url',
+                    help="also benchmark POST /count against a server running at this URL")
+
+
+def pytest_unconfigure(config):
+    _instance.cleanup()
+
+
+@pytest.fixture
+def client():
+    from app import app
+    return app.test_client()
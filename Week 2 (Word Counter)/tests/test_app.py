@@ -0,0 +1,208 @@
+"""
+Endpoint tests for /count, /count/batch and the document routes.
+
+Each endpoint must report the same counts as count_words(), and reject
+oversized and unsupported bodies with the same JSON errors.
+"""
+import gzip
+import json
+import random
+
+import pytest
+
+import app as app_module
+from compression import MAX_DECODED_BYTES
+from bench_count_words import make_text
+from bench_tokenizers import JAPANESE, make_cjk_text
+from parallel import BATCH_GROUP_SIZE
+from wordcounter.wordcount import TOKENIZATION_MODES, count_words
+
+TEXTS = [make_text(5000, seed) + make_cjk_text(JAPANESE, 500, seed) for seed in range(3)]
+
+
+@pytest.fixture
+def small_buffer(monkeypatch):
+    monkeypatch.setattr(app_module, 'MAX_BUFFERED_BYTES', 1000)
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.data.splitlines()]
+
+
+@pytest.mark.parametrize('mode', TOKENIZATION_MODES)
+@pytest.mark.parametrize('text', TEXTS)
+def test_count(client, text, mode):
+    expected = count_words(text, mode)
+    response = client.post('/count', json={'text': text, 'mode': mode})
+    assert response.status_code == 200
+    assert response.get_json() == {'count': expected, 'status': 'success'}
+
+    response = client.post(f'/count?mode={mode}', data=text.encode(), content_type='text/plain')
+    assert response.get_json()['count'] == expected
+
+    compressed = gzip.compress(json.dumps({'text': text, 'mode': mode}).encode())
+    response = client.post('/count', data=compressed, content_type='application/json',
+                           headers={'Content-Encoding': 'gzip'})
+    assert response.get_json()['count'] == expected
+
+
+def test_count_revalidation(client):
+    response = client.post('/count', json={'text': 'cached text'})
+    etag = response.headers['ETag']
+    response = client.post('/count', json={'text': 'cached text'}, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize('body, status', [
+    ({'text': 42}, 400),
+    ({'text': 'x', 'mode': 'words'}, 400),
+    ([], 400),
+])
+def test_count_invalid(client, body, status):
+    response = client.post('/count', json=body)
+    assert response.status_code == status
+    assert response.get_json()['status'] == 'error'
+
+
+def test_count_unsupported_type(client):
+    response = client.post('/count', data='<text/>', content_type='application/xml')
+    assert response.status_code == 415
+    assert response.get_json()['status'] == 'error'
+
+
+def test_count_streams_large_plain_text(client, small_buffer):
+    text = make_text(50_000)
+    response = client.post('/count', data=text.encode(), content_type='text/plain')
+    assert response.get_json() == {'count': count_words(text), 'status': 'success'}
+
+
+@pytest.mark.parametrize('path, method', [
+    ('/count', 'post'), ('/stats', 'post'), ('/count/batch', 'post'), ('/documents/x', 'patch'),
+])
+def test_buffered_bodies_are_capped(client, small_buffer, path, method):
+    body = gzip.compress(json.dumps({'text': 'a ' * 1000}).encode())
+    response = getattr(client, method)(path, data=body, content_type='application/json',
+                                       headers={'Content-Encoding': 'gzip'})
+    assert response.status_code == 413
+    assert response.get_json()['status'] == 'error'
+
+
+@pytest.mark.parametrize('mode', TOKENIZATION_MODES)
+def test_count_batch(client, mode):
+    rng = random.Random(0)
+    batch = [rng.choice(TEXTS)[:rng.randrange(2000)] for _ in range(BATCH_GROUP_SIZE * 2 + 5)]
+    batch[3] = {'id': 'doc-3', 'text': batch[3]}
+    batch[7] = {'text': 7}
+    expected = [count_words(text if isinstance(text, str) else text['text'], mode)
+                for text in batch[:7]]
+
+    for body in (
+        {'json': batch},
+        {'content_type': 'application/x-ndjson',
+         'data': ''.join(json.dumps(document) + '\n' for document in batch)},
+    ):
+        response = client.post(f'/count/batch?mode={mode}', **body)
+        assert response.status_code == 200
+        results = ndjson(response)
+        assert [result['index'] for result in results] == list(range(len(batch)))
+        assert [result['count'] for result in results[:7]] == expected
+        assert results[3]['id'] == 'doc-3'
+        assert 'error' in results[7]
+        assert all(result['count'] == count_words(document, mode)
+                   for result, document in zip(results[8:], batch[8:]))
+
+
+@pytest.mark.parametrize('body, content_type, status', [
+    (json.dumps({'text': 'x'}), 'application/json', 400),
+    ('a,b', 'text/csv', 415),
+])
+def test_count_batch_invalid(client, body, content_type, status):
+    response = client.post('/count/batch', data=body, content_type=content_type)
+    assert response.status_code == status
+    assert response.get_json()['status'] == 'error'
+
+
+def create(client, text, mode='whitespace'):
+    response = client.post('/documents', json={'text': text, 'mode': mode})
+    assert response.status_code == 201
+    return response.get_json()
+
+
+@pytest.mark.parametrize('mode', TOKENIZATION_MODES)
+def test_patch_matches_count_words(client, mode):
+    rng = random.Random(2)
+    text = TEXTS[0]
+    document = create(client, text, mode)
+    version = document['version']
+    for _ in range(40):
+        start = rng.randrange(len(text) + 1)
+        end = min(len(text), start + rng.choice([0, 1, 20, 500]))
+        replacement = rng.choice(['', ' ', 'word ', '\n\n', '日本語', make_text(300, rng.randrange(100))])
+        text = text[:start] + replacement + text[end:]
+        response = client.patch(f"/documents/{document['id']}", json={
+            'version': version, 'edits': [{'start': start, 'end': end, 'text': replacement}]})
+        assert response.status_code == 200
+        result = response.get_json()
+        assert result['count'] == count_words(text, mode)
+        version = result['version']
+    assert client.get(f"/documents/{document['id']}").get_json()['text'] == text
+
+
+def test_patch_errors(client):
+    document = create(client, 'one two three')
+    path = f"/documents/{document['id']}"
+    assert client.patch('/documents/missing', json={'version': 0, 'edits': []}).status_code == 404
+
+    response = client.patch(path, json={'version': 5, 'edits': []})
+    assert response.status_code == 409
+    assert response.get_json()['version'] == 0
+
+    response = client.patch(path, json={'version': 0, 'edits': [{'start': 0, 'end': 99, 'text': ''}]})
+    assert response.status_code == 400
+    response = client.patch(path, data='{"version": ', content_type='application/json')
+    assert response.status_code == 400
+    response = client.patch(path, data='one two', content_type='text/plain')
+    assert response.status_code == 415
+    assert response.get_json()['status'] == 'error'
+
+
+def test_named_document_round_trip(client):
+    response = client.put('/documents/test-draft', json={'text': 'first draft'})
+    assert response.status_code == 201
+    response = client.patch('/documents/test-draft', json={
+        'version': 0, 'edits': [{'start': 5, 'end': 5, 'text': ' good'}]})
+    assert response.get_json()['count'] == 3
+
+    # A fresh store loads the document from the database
+    app_module.documents._discard('test-draft')
+    saved = client.get('/documents/test-draft').get_json()
+    assert (saved['text'], saved['version'], saved['count']) == ('first good draft', 1, 3)
+    assert client.delete('/documents/test-draft').status_code == 200
+
+
+def test_asgi_streams_the_streaming_endpoints():
+    asgi = pytest.importorskip('asgi')
+    assert asgi.STREAMING_PATHS == {'/count/stream', '/count/batch', '/frequencies'}
+
+
+def test_compressed_stream_decodes_past_the_default_cap(client):
+    text = make_text(1 << 20) * (MAX_DECODED_BYTES // (1 << 20) + 6)
+    body = gzip.compress(text.encode(), compresslevel=1)
+    response = client.post('/count/stream', data=body, content_type='text/plain',
+                           headers={'Content-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.get_json()['count'] == count_words(text)
+
+
+def test_oversized_patch_can_be_uploaded_again(client, small_buffer):
+    document = create(client, 'short text')
+    # Quotes and line breaks double in size when escaped as JSON
+    text = 'a "b"\n' * 150
+    response = client.patch(f"/documents/{document['id']}", json={
+        'version': document['version'], 'edits': [{'start': 0, 'end': 10, 'text': text}]})
+    assert response.status_code == 413
+    assert response.get_json()['status'] == 'error'
+
+    response = client.post('/documents', data=text.encode(), content_type='text/plain')
+    assert response.status_code == 201
+    assert response.get_json()['count'] == count_words(text)
@@ -0,0 +1,129 @@
+"""
+Benchmarks with saved baselines, run by pytest-benchmark.
+
+- engine: count_words on ASCII prose, punctuation-heavy text and
+  Japanese text from 1KB to 1MB (to 100MB with --bench-large)
+- endpoint: POST /count through the Flask test client with new texts
+  (result cache misses) and a repeated text (hits), and a one-character
+  PATCH to a large named document
+- http (with --bench-url): POST /count against a running server
+
+Usage:
+    pytest tests/test_bench.py --benchmark-autosave            # record a baseline
+    pytest tests/test_bench.py --benchmark-compare --benchmark-compare-fail=mean:20%
+    pytest tests/test_bench.py --bench-large --bench-url http://127.0.0.1:5000
+
+Baselines are saved as JSON under .benchmarks/, one folder per machine
+and Python version; --benchmark-compare compares with the latest one.
+"""
+import functools
+import itertools
+import json
+import random
+from urllib.request import Request, urlopen
+
+import pytest
+
+from bench_count_words import make_text
+from bench_tokenizers import JAPANESE, make_cjk_text
+from wordcounter.wordcount import count_words
+
+pytest.importorskip('pytest_benchmark')
+
+SIZES = [1_000, 100_000, 1_000_000]
+LARGE_SIZES = [10_000_000, 100_000_000]
+
+# Tokens of text dominated by punctuation, numbers and markup
+PUNCTUATION = [
+    '--', '...', '"quoted"', '(a)', 'e.g.,', '!!', '1,000.50', '—', '§3',
+    'https://example.com/a?b=c', '#tag', '@user', '***', 'x=y;', '[1]',
+    "it's", 'well-known', '¿qué?', '«ok»', '…',
+]
+
+
+def make_punctuation_text(size, seed=0):
+    """Build roughly ``size`` characters of punctuation-heavy text."""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < min(size, 1 << 16):
+        part = rng.choice(PUNCTUATION) + rng.choice(' \n')
+        parts.append(part)
+        length += len(part)
+    block = ''.join(parts)
+    return (block * (size // len(block) + 1))[:size]
+
+
+CORPORA = {
+    'prose': make_text,
+    'punctuation': make_punctuation_text,
+    'cjk': lambda size: make_cjk_text(JAPANESE, size),
+}
+
+
+@functools.lru_cache(maxsize=1)
+def corpus(name, size):
+    return CORPORA[name](size)
+
+
+@pytest.mark.parametrize('size', SIZES + LARGE_SIZES)
+@pytest.mark.parametrize('name', CORPORA)
+def test_engine(benchmark, request, name, size):
+    if size in LARGE_SIZES and not request.config.getoption('bench_large'):
+        pytest.skip("needs --bench-large")
+    text = corpus(name, size)
+    benchmark.group = f'engine/{name}'
+    benchmark.extra_info['characters'] = size
+    if size in LARGE_SIZES:
+        count = benchmark.pedantic(count_words, (text,), rounds=3)
+    else:
+        count = benchmark(count_words, text)
+    assert count == count_words(text)
+
+
+@pytest.mark.parametrize('unique', [True, False], ids=['miss', 'hit'])
+def test_count_endpoint(benchmark, client, unique):
+    text = make_text(2000)
+    numbers = itertools.count()
+
+    def post():
+        body = {'text': f'{text} {next(numbers)}' if unique else text}
+        return client.post('/count', json=body)
+
+    benchmark.group = 'endpoint/count'
+    response = benchmark(post)
+    assert response.status_code == 200
+
+
+def test_patch_endpoint(benchmark, client):
+    text = make_text(1_000_000)
+    response = client.put('/documents/bench-large', json={'text': text})
+    version = response.get_json()['version']
+    offsets = itertools.cycle(range(0, len(text), 9973))
+
+    def type_character():
+        nonlocal version
+        offset = next(offsets)
+        response = client.patch('/documents/bench-large', json={
+            'version': version, 'edits': [{'start': offset, 'end': offset, 'text': 'x'}]})
+        version = response.get_json().get('version', version)
+        return response
+
+    benchmark.group = 'endpoint/documents'
+    assert benchmark(type_character).status_code == 200
+    client.delete('/documents/bench-large')
+
+
+def test_http_count(benchmark, request):
+    url = request.config.getoption('bench_url')
+    if not url:
+        pytest.skip("needs --bench-url")
+    body = json.dumps({'text': make_text(2000)}).encode()
+
+    def post():
+        req = Request(url.rstrip('/') + '/count', body, {'Content-Type': 'application/json'})
+        with urlopen(req, timeout=10) as response:
+            return response.status
+
+    benchmark.group = 'http/count'
+    assert benchmark(post) == 200
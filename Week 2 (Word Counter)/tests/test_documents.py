@@ -0,0 +1,179 @@
+"""
+Incremental counting tests.
+
+Random edits applied to a Document must leave it with the same text and
+count as count_words() on the edited text, and a named document must
+come back from the database exactly as it was saved.
+"""
+import random
+import sqlite3
+import sys
+
+import pytest
+
+from bench_count_words import make_text
+from bench_tokenizers import JAPANESE, make_cjk_text
+from documents import (SEGMENT_OVERHEAD, SEGMENT_RECORD, SEGMENT_SIZE, Document, DocumentStore, EditError,
+                       SQLiteDocuments, utf16_length)
+from wordcounter.wordcount import TOKENIZATION_MODES, count_words
+
+INSERTS = ['', ' ', '\n', '\n\n', 'word', ' two words ', '-', 'a' * 50, '日本語',
+           'カタカナ', '𝒳𝒴 ', 'x' * (SEGMENT_SIZE + 10), ' '.join(['w'] * 3000)]
+
+
+def char_offsets(text):
+    """Return the UTF-16 offset of every character boundary in text."""
+    offsets = [0]
+    for char in text:
+        offsets.append(offsets[-1] + (2 if char > '\uffff' else 1))
+    return offsets
+
+
+def random_edit(rng, text):
+    """Return (start, end, replacement, edited text) for a random edit on character boundaries."""
+    offsets = char_offsets(text)
+    first = rng.randrange(len(offsets))
+    last = min(len(offsets) - 1, first + rng.choice([0, 0, 1, 5, 100, 10_000]))
+    replacement = rng.choice(INSERTS)
+    return offsets[first], offsets[last], replacement, text[:first] + replacement + text[last:]
+
+
+def initial_text(seed):
+    text = make_text(20_000, seed) + '\n\n' + make_cjk_text(JAPANESE, 5000, seed)
+    return text.replace('. ', '.\n', 200) + ' 𝒳𝒴 end'
+
+
+@pytest.mark.parametrize('mode', TOKENIZATION_MODES)
+@pytest.mark.parametrize('seed', range(3))
+def test_random_edits_match_count_words(mode, seed):
+    rng = random.Random(seed)
+    text = initial_text(seed)
+    document = Document(text, mode=mode)
+    for _ in range(150):
+        start, end, replacement, text = random_edit(rng, text)
+        document.apply(start, end, replacement)
+        assert document.count == count_words(text, mode)
+    assert document.text == text
+    assert document.length == utf16_length(text)
+    assert document.size == sum(sys.getsizeof(t) + SEGMENT_OVERHEAD for _, t, _ in document.segments())
+
+
+def test_edit_from_empty():
+    document = Document('')
+    document.apply(0, 0, 'hello world')
+    document.apply(5, 5, ' big')
+    assert document.text == 'hello big world'
+    assert document.count == 3
+
+
+def test_apply_edits_is_all_or_nothing():
+    document = Document('one two three')
+    with pytest.raises(EditError):
+        document.apply_edits([{'start': 0, 'end': 3, 'text': 'zero'},
+                              {'start': 50, 'end': 60, 'text': ''}])
+    assert document.text == 'one two three'
+    assert document.version == 0
+    document.apply_edits([{'start': 0, 'end': 3, 'text': 'zero'},
+                          {'start': 5, 'end': 5, 'text': 'and '}])
+    assert document.text == 'zero and two three'
+    assert document.version == 1
+
+
+def test_segments_are_reused():
+    text = initial_text(0)
+    document = Document(text)
+    known = document.segment_counts()
+    copy = Document(text, known_counts=known)
+    assert copy.segment_counts() == known
+    assert copy.count == document.count
+
+
+@pytest.mark.parametrize('mode', TOKENIZATION_MODES)
+def test_saved_documents_reload(tmp_path, mode):
+    database = SQLiteDocuments(str(tmp_path / 'documents.sqlite3'))
+    store = DocumentStore(database=database)
+    rng = random.Random(1)
+    text = initial_text(1)
+    document = store.create(text, mode, name='draft')
+    for _ in range(50):
+        start, end, replacement, text = random_edit(rng, text)
+        document.apply_edits([{'start': start, 'end': end, 'text': replacement}])
+        store.update(document)
+
+    reloaded = SQLiteDocuments(database.path).load('draft')
+    assert reloaded.text == text
+    assert reloaded.count == count_words(text, mode)
+    assert reloaded.version == document.version == 50
+
+
+def test_reload_after_eviction(tmp_path):
+    store = DocumentStore(max_bytes=1, database=SQLiteDocuments(str(tmp_path / 'd.sqlite3')))
+    first = store.create('first document', name='first')
+    store.create('second', name='second')
+    assert store.stats()['documents'] == 1
+    assert store.get('first').text == first.text
+    assert store.delete('first')
+    assert store.get('first') is None
+
+
+def test_saving_an_edit_writes_only_changed_segments(tmp_path):
+    database = SQLiteDocuments(str(tmp_path / 'documents.sqlite3'))
+    store = DocumentStore(database=database)
+    document = store.create(initial_text(0), name='draft')
+    assert len(document.segments()) > 100
+    db = database._connection()
+    changes = db.total_changes
+    document.apply_edits([{'start': 1000, 'end': 1000, 'text': 'x'}])
+    store.update(document)
+    # The document row, the old segment and its replacement
+    assert db.total_changes - changes == 3
+
+
+def test_position_keys_are_renumbered(tmp_path):
+    database = SQLiteDocuments(str(tmp_path / 'documents.sqlite3'))
+    store = DocumentStore(database=database)
+    document = store.create('first\nlast\n', name='draft')
+    for i in range(100):
+        # Each insertion before 'last' halves the gap between the keys around it
+        offset = document.text.index('last')
+        document.apply_edits([{'start': offset, 'end': offset, 'text': f'{i}\n'}])
+        document.apply_edits([{'start': 0, 'end': 0, 'text': f'p{i}\n'}])
+        store.update(document)
+    keys = [key for key, _, _ in document.segments()]
+    assert keys == sorted(set(keys))
+    reloaded = SQLiteDocuments(database.path).load('draft')
+    assert reloaded.text == document.text
+    assert reloaded.count == count_words(document.text) == 202
+
+
+def test_concurrent_saves_keep_the_last(tmp_path):
+    path = str(tmp_path / 'documents.sqlite3')
+    first, second = DocumentStore(database=SQLiteDocuments(path)), DocumentStore(database=SQLiteDocuments(path))
+    first.create(initial_text(0), name='draft')
+    a, b = first.get('draft'), second.get('draft')
+    a.apply_edits([{'start': 0, 'end': 0, 'text': 'first '}])
+    first.update(a)
+    b.apply_edits([{'start': 100, 'end': 100, 'text': ' second'}])
+    second.update(b)
+    assert SQLiteDocuments(path).load('draft').text == b.text
+
+
+def test_single_row_documents_are_converted(tmp_path):
+    path = str(tmp_path / 'documents.sqlite3')
+    text = initial_text(2)
+    document = Document(text, mode='cjk', name='draft')
+    db = sqlite3.connect(path)
+    db.execute('CREATE TABLE documents (name TEXT PRIMARY KEY, mode TEXT NOT NULL, '
+               'version INTEGER NOT NULL, count INTEGER NOT NULL, text BLOB NOT NULL, '
+               'segments BLOB NOT NULL, updated REAL NOT NULL)')
+    db.execute('INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?, ?)', (
+        'draft', 'cjk', 7, document.count, text.encode(),
+        b''.join(SEGMENT_RECORD.pack(h, c) for h, c in document.segment_counts().items()), 1.0))
+    db.commit()
+    db.close()
+
+    database = SQLiteDocuments(path)
+    assert database.list() == [{'name': 'draft', 'mode': 'cjk', 'version': 7,
+                                'count': count_words(text, 'cjk'), 'updated': 1.0}]
+    reloaded = database.load('draft')
+    assert (reloaded.text, reloaded.count, reloaded.version) == (text, document.count, 7)
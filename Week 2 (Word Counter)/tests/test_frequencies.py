@@ -0,0 +1,63 @@
+"""
+Frequency index tests.
+
+Queries running while documents are added must keep working, and a
+replaced index version must stay readable until the next update.
+"""
+import os
+import threading
+
+from wordcounter.frequencies import FrequencyStore
+
+
+def index_directories(root):
+    return sorted(name for name in os.listdir(root) if name.startswith('index-'))
+
+
+def test_replaced_index_is_deleted_on_the_next_update(tmp_path):
+    store = FrequencyStore(str(tmp_path))
+    with store.update() as builder:
+        builder.add_text('one two two')
+    first = store.current()
+    with store.update() as builder:
+        builder.add_text('two three')
+    # A query that picked up the first version can still read it
+    assert first.top(1, 1) == [('two', 2)]
+    assert store.current().top(1, 1) == [('two', 3)]
+    assert len(index_directories(tmp_path)) == 2
+
+    with store.update() as builder:
+        builder.add_text('three')
+    assert not os.path.exists(first.directory)
+    assert index_directories(tmp_path) == sorted(
+        [os.path.basename(store.current().directory), open(tmp_path / 'RETIRED').read()])
+
+
+def test_queries_during_updates(client):
+    from app import frequencies
+    response = client.post('/frequencies', json=['alpha beta beta'])
+    assert response.status_code == 200
+    errors = []
+    done = threading.Event()
+
+    def query():
+        while not done.is_set():
+            # Drop the cached top lists so every query reads the files
+            frequencies.current()._top.clear()
+            response = client.get('/frequencies?n=2&k=5')
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    readers = [threading.Thread(target=query) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    try:
+        for i in range(30):
+            assert client.post('/frequencies', json=[f'alpha beta gamma {i}']).status_code == 200
+    finally:
+        done.set()
+        for reader in readers:
+            reader.join()
+    assert errors == []
+    top = client.get('/frequencies?k=1').get_json()['top']
+    assert top == [{'term': 'beta', 'count': 32}]
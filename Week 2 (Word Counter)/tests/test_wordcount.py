@@ -0,0 +1,109 @@
+"""
+Counting equivalence tests.
+
+Every way of counting a text (count_words, WordCounter fed in chunks,
+count_stream, count_file, count_words_parallel and text_stats) must give
+the same result in each tokenization mode, and the whitespace mode must
+match the original split-and-filter implementation.
+"""
+import io
+
+import pytest
+
+from bench_count_words import legacy_count_words, make_text
+from bench_tokenizers import CHINESE, JAPANESE, make_cjk_text
+from parallel import count_words_parallel, make_pool
+from wordcounter.wordcount import (MMAP_THRESHOLD, TOKENIZATION_MODES, WordCounter, count_file,
+                                   count_stream, count_words, text_stats)
+
+CORPORA = {
+    'prose': make_text(200_000),
+    'japanese': make_cjk_text(JAPANESE, 50_000),
+    'chinese': make_cjk_text(CHINESE, 50_000),
+    'mixed': make_text(30_000, seed=1) + make_cjk_text(JAPANESE, 30_000) + '\n' + make_text(30_000, seed=2),
+    'edges': ' \t\n\u3000x\u200b  -- ... _a_ e\u0301 \U0001d4b3\U0001d4b4 \ud800 ',
+}
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('', (0, 0, 0)),
+    ('   \n\t', (0, 0, 0)),
+    ('Hello world', (2, 2, 2)),
+    ('well-known -- ... co-op', (2, 4, 2)),
+    ("don't stop e.g. 1,000.5", (4, 4, 4)),
+    ('日本語を話す', (1, 6, 6)),
+    ('カタカナです', (1, 3, 2)),
+    ('snake_case _ __', (1, 1, 1)),
+])
+def test_known_counts(text, expected):
+    assert tuple(count_words(text, mode) for mode in TOKENIZATION_MODES) == expected
+
+
+@pytest.mark.parametrize('corpus', CORPORA)
+def test_whitespace_matches_legacy(corpus):
+    text = CORPORA[corpus]
+    assert count_words(text) == legacy_count_words(text)
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        count_words('text', 'words')
+
+
+@pytest.mark.parametrize('mode', TOKENIZATION_MODES)
+@pytest.mark.parametrize('corpus', CORPORA)
+@pytest.mark.parametrize('chunk_size', [1, 7, 4096])
+def test_word_counter_chunks(corpus, mode, chunk_size):
+    text = CORPORA[corpus]
+    if chunk_size == 1:
+        text = text[:5000]
+    counter = WordCounter(mode)
+    for pos in range(0, len(text), chunk_size):
+        counter.update(text[pos:pos + chunk_size])
+    assert counter.finish() == count_words(text, mode)
+
+
+@pytest.mark.parametrize('mode', TOKENIZATION_MODES)
+@pytest.mark.parametrize('corpus', CORPORA)
+def test_count_stream(corpus, mode):
+    text = CORPORA[corpus]
+    data = io.BytesIO(text.encode('utf-8', 'surrogatepass'))
+    # Lone surrogates are undecodable and replaced, as they are in uploads
+    expected = text.encode('utf-8', 'surrogatepass').decode('utf-8', 'replace')
+    assert count_stream(data, mode=mode) == count_words(expected, mode)
+
+
+@pytest.mark.parametrize('mode', TOKENIZATION_MODES)
+@pytest.mark.parametrize('size', [10_000, MMAP_THRESHOLD * 3 + 1])
+def test_count_file(tmp_path, mode, size):
+    text = CORPORA['mixed'] * (size // len(CORPORA['mixed']) + 1)
+    path = tmp_path / 'text.txt'
+    path.write_text(text, encoding='utf-8')
+    assert count_file(path, mode=mode) == count_words(text, mode)
+
+
+@pytest.fixture(scope='module')
+def pool():
+    executor = make_pool(2)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.mark.parametrize('mode', TOKENIZATION_MODES)
+def test_count_words_parallel(pool, mode):
+    text = CORPORA['mixed'] * 20
+    assert count_words_parallel(text, workers=2, executor=pool, mode=mode) == count_words(text, mode)
+
+
+@pytest.mark.parametrize('corpus', CORPORA)
+def test_text_stats_words(corpus):
+    text = CORPORA[corpus]
+    stats = text_stats(text, top_n=5)
+    assert stats['words'] == count_words(text)
+    assert sum(word['count'] for word in stats['top_words']) <= stats['words']
+
+
+def test_text_stats_top_words():
+    stats = text_stats('The cat. The dog! the "cat"', top_n=2)
+    assert stats['top_words'] == [{'word': 'the', 'count': 3}, {'word': 'cat', 'count': 2}]
+    assert stats['sentences'] == 3
@@ -0,0 +1,11 @@
+"""
+Word counting library behind the Word Counter web app.
+
+wordcounter.wordcount is the counting engine, wordcounter.cli the
+wordcount command line tool and wordcounter.frequencies the word and
+n-gram frequency index (wordcount-index).
+"""
+
+from .wordcount import TOKENIZATION_MODES, count_file, count_stream, count_words, text_stats
+
+__all__ = ['TOKENIZATION_MODES', 'count_file', 'count_stream', 'count_words', 'text_stats']
@@ -0,0 +1,148 @@
+"""
+Word Counter Command Line
+------------------------
+Counts words in files, directories, glob patterns and standard input
+with the same rules as the web application, without starting a server.
+
+Many files are counted on a pool of worker processes (or threads, for
+I/O bound storage such as network shares) and reported in the order
+they were given. Large files are memory-mapped by count_file().
+
+Usage:
+    wordcount notes.txt 'corpus/**/*.txt'
+    wordcount --format json --jobs 8 corpus/
+    cat notes.txt | wordcount
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from .wordcount import TOKENIZATION_MODES, count_file, count_stream
+
+# Paths handed to a worker at a time when counting in a pool
+POOL_CHUNK_SIZE = 64
+
+def expand_paths(arguments):
+    """
+    Expand command line arguments into file paths.
+
+    Glob patterns (with ** matching any depth) are expanded in sorted
+    order and directories are walked recursively. Other arguments are
+    kept as given, so missing files are reported rather than skipped.
+
+    Args:
+        arguments (list): Paths, directories and glob patterns
+
+    Yields:
+        str: File paths in a stable order
+    """
+    for argument in arguments:
+        if glob.has_magic(argument):
+            for path in sorted(glob.iglob(argument, recursive=True)):
+                if not os.path.isdir(path):
+                    yield path
+        elif os.path.isdir(argument):
+            for root, dirs, files in os.walk(argument):
+                dirs.sort()
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        else:
+            yield argument
+
+def count_path(path, encoding='utf-8', mode='whitespace'):
+    """
+    Count one file for a report.
+
+    Returns:
+        dict: {'path', 'count'} or, if the file cannot be read, {'path', 'error'}
+    """
+    try:
+        return {'path': path, 'count': count_file(path, encoding, mode)}
+    except OSError as e:
+        return {'path': path, 'error': e.strerror or str(e)}
+
+def count_paths(paths, encoding='utf-8', jobs=None, threads=False, mode='whitespace'):
+    """
+    Count words in many files.
+
+    Args:
+        paths (iterable): File paths
+        encoding (str): Text encoding of the files. Defaults to 'utf-8'.
+        jobs (int, optional): Number of workers; 1 counts in this process.
+            Defaults to the number of CPUs.
+        threads (bool): Use threads instead of processes. Defaults to False.
+        mode (str): Tokenization mode. Defaults to 'whitespace'.
+
+    Yields:
+        dict: One result per path, in input order (see count_path())
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        for path in paths:
+            yield count_path(path, encoding, mode)
+        return
+
+    executor_class = ThreadPoolExecutor if threads else ProcessPoolExecutor
+    paths = list(paths)
+    with executor_class(max_workers=jobs) as executor:
+        yield from executor.map(count_path, paths, [encoding] * len(paths),
+                                [mode] * len(paths), chunksize=POOL_CHUNK_SIZE)
+
+def main(argv=None):
+    """
+    Run the command line interface.
+
+    Returns:
+        int: Exit status, 1 if any file could not be read
+    """
+    parser = argparse.ArgumentParser(
+        prog='wordcount',
+        description="Count words in files, directories, glob patterns or standard input.")
+    parser.add_argument('paths', nargs='*',
+                        help="files, directories or glob patterns; '-' or none reads stdin")
+    parser.add_argument('-f', '--format', choices=['text', 'json'], default='text')
+    parser.add_argument('-e', '--encoding', default='utf-8')
+    parser.add_argument('-m', '--mode', choices=TOKENIZATION_MODES, default='whitespace',
+                        help="tokenization mode (default: whitespace)")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="number of workers (default: number of CPUs)")
+    parser.add_argument('--threads', action='store_true',
+                        help="use threads instead of processes, for slow storage")
+    parser.add_argument('-t', '--total-only', action='store_true',
+                        help="print only the total")
+    args = parser.parse_args(argv)
+
+    if not args.paths or args.paths == ['-']:
+        results = [{'path': '-', 'count': count_stream(sys.stdin.buffer, args.encoding, args.mode)}]
+    else:
+        results = count_paths(expand_paths(args.paths), args.encoding, args.jobs,
+                              args.threads, args.mode)
+
+    total = 0
+    failed = False
+    files = []
+    for result in results:
+        if 'error' in result:
+            failed = True
+            print(f"wordcount: {result['path']}: {result['error']}", file=sys.stderr)
+        else:
+            total += result['count']
+        if args.format == 'json':
+            if not args.total_only:
+                files.append(result)
+        elif not args.total_only and 'count' in result:
+            print(f"{result['count']:>10} {result['path']}")
+
+    if args.format == 'json':
+        report = {'total': total} if args.total_only else {'files': files, 'total': total}
+        json.dump(report, sys.stdout)
+        print()
+    else:
+        print(f"{total:>10} total")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
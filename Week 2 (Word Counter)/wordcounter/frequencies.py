@@ -0,0 +1,531 @@
+"""
+Word Frequency Index
+-------------------
+Word and n-gram frequencies over a corpus, so that questions such as
+"the most frequent bigrams across these 10,000 documents" are answered
+without rescanning the documents.
+
+Words are the matches of the count_words() tokenizer for the index's
+mode, lower-cased and trimmed to their first and last alphanumeric
+characters as text_stats() keys them (uax29 words are kept as matched);
+an n-gram is n consecutive words of one document joined by spaces.
+
+Documents are streamed into in-memory tables, which are written to disk
+as runs sorted by term whenever they hold RUN_ENTRIES terms, and the runs
+are combined with a k-way merge, so memory stays bounded however large
+the corpus. The result is one table per n-gram size, sorted by term,
+plus its TOP_TERMS most frequent terms for queries. Indexes built with
+the same mode merge the same way; FrequencyStore adds each new batch of
+documents to the served index like that.
+
+Usage:
+    python -m wordcounter.frequencies add instance/frequencies corpus/ 'more/**/*.txt'
+    python -m wordcounter.frequencies top instance/frequencies -n 2 -k 20
+"""
+
+import argparse
+import codecs
+import contextlib
+import heapq
+import json
+import os
+import shutil
+import sys
+import threading
+import uuid
+from collections import Counter
+from itertools import islice
+from operator import itemgetter
+from .wordcount import CORE_PATTERN, TOKENIZATION_MODES, tokenizer_patterns
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Longest n-gram indexed by default
+MAX_NGRAM = 2
+
+# Terms held in memory, over all n-gram sizes, before they are written
+# out as a sorted run
+RUN_ENTRIES = 500_000
+
+# Most runs merged in one pass; more are merged in several passes
+MERGE_FAN_IN = 64
+
+# Most frequent terms precomputed per table
+TOP_TERMS = 1000
+
+# Characters of a document tokenized at a time
+READ_CHUNK = 1 << 20
+
+METADATA = 'index.json'
+
+def _table_name(n):
+    return f'{n}.tsv'
+
+def _top_name(n):
+    return f'top-{n}.tsv'
+
+def word_keys(text, mode='whitespace'):
+    """
+    Yield the frequency key of every word count_words() finds in text.
+
+    Args:
+        text (str): Text to tokenize
+        mode (str): Tokenization mode
+
+    Yields:
+        str: Lower-cased words, as many as count_words(text, mode)
+    """
+    word_pattern, _ = tokenizer_patterns(mode)
+    trim = mode != 'uax29'
+    for match in word_pattern.finditer(text):
+        word = match.group()
+        if match.group(1):
+            # A run of ideographs counts one word per character
+            yield from word
+            continue
+        if trim:
+            core = CORE_PATTERN.match(word)
+            if core:
+                word = core.group()
+        yield word.lower()
+
+def _read_table(path):
+    """Yield (term, count) pairs from a table file."""
+    with open(path, encoding='utf-8', errors='surrogatepass', newline='\n') as f:
+        for line in f:
+            term, _, count = line.rstrip('\n').rpartition('\t')
+            yield term, int(count)
+
+def _write_table(path, items):
+    """Write (term, count) pairs, one 'term<TAB>count' line each."""
+    with open(path, 'w', encoding='utf-8', errors='surrogatepass', newline='\n') as f:
+        f.writelines(f'{term}\t{count}\n' for term, count in items)
+
+def _sum_sorted(items):
+    """Add up the counts of adjacent equal terms in sorted (term, count) pairs."""
+    term = None
+    total = 0
+    for next_term, count in items:
+        if next_term != term:
+            if term is not None:
+                yield term, total
+            term, total = next_term, 0
+        total += count
+    if term is not None:
+        yield term, total
+
+def merge_tables(paths, destination, top=TOP_TERMS):
+    """
+    Merge sorted tables into one, adding up the counts of equal terms.
+
+    Runs a k-way merge over at most MERGE_FAN_IN files at a time; longer
+    lists are first merged in groups into intermediate tables next to
+    the destination. The most frequent terms are collected on the way.
+
+    Args:
+        paths (list): Table files sorted by term
+        destination (str): Table file to write
+        top (int): Number of most frequent terms to return
+
+    Returns:
+        dict: 'terms' (distinct terms), 'total' (sum of counts) and
+            'top' (list of (term, count), most frequent first, ties in
+            term order)
+    """
+    paths = list(paths)
+    intermediate = []
+    while len(paths) > MERGE_FAN_IN:
+        groups = [paths[i:i + MERGE_FAN_IN] for i in range(0, len(paths), MERGE_FAN_IN)]
+        paths = []
+        for group in groups:
+            path = f'{destination}.merge-{uuid.uuid4().hex}'
+            _write_table(path, _sum_sorted(heapq.merge(*map(_read_table, group))))
+            intermediate.append(path)
+            paths.append(path)
+
+    stats = {'terms': 0, 'total': 0}
+
+    def counted(items):
+        for item in items:
+            stats['terms'] += 1
+            stats['total'] += item[1]
+            yield item
+
+    try:
+        with open(destination, 'w', encoding='utf-8', errors='surrogatepass', newline='\n') as f:
+            def written(items):
+                for term, count in items:
+                    f.write(f'{term}\t{count}\n')
+                    yield term, count
+            merged = _sum_sorted(heapq.merge(*map(_read_table, paths)))
+            stats['top'] = heapq.nlargest(top, written(counted(merged)), key=itemgetter(1))
+    finally:
+        for path in intermediate:
+            os.remove(path)
+    return stats
+
+class FrequencyIndex:
+    """
+    A built, read-only frequency index directory.
+
+    Attributes:
+        directory (str): Index directory
+        mode (str): Tokenization mode the index was built with
+        max_n (int): Longest n-gram indexed
+        documents (int): Documents indexed
+        tables (dict): n -> {'terms', 'total'} for each n-gram size
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, METADATA), encoding='utf-8') as f:
+            metadata = json.load(f)
+        self.mode = metadata['mode']
+        self.max_n = metadata['max_n']
+        self.documents = metadata['documents']
+        self.tables = {int(n): table for n, table in metadata['tables'].items()}
+        self._top = {}
+
+    def _top_terms(self, n):
+        if n not in self._top:
+            self._top[n] = list(_read_table(os.path.join(self.directory, _top_name(n))))
+        return self._top[n]
+
+    def top(self, n=1, k=20):
+        """
+        Return the k most frequent n-grams.
+
+        Served from the precomputed list when it is long enough, and
+        otherwise by one pass over the table.
+
+        Args:
+            n (int): N-gram size, from 1 to max_n
+            k (int): Number of terms
+
+        Returns:
+            list: (term, count) pairs, most frequent first
+
+        Raises:
+            ValueError: If n is not indexed
+        """
+        if n not in self.tables:
+            raise ValueError(f"Index has n-grams of 1 to {self.max_n} words, not {n}")
+        top = self._top_terms(n)
+        if k <= len(top) or len(top) == self.tables[n]['terms']:
+            return top[:k]
+        return heapq.nlargest(k, _read_table(os.path.join(self.directory, _table_name(n))),
+                              key=itemgetter(1))
+
+def _write_index(directory, mode, max_n, documents, tables):
+    """Write the top lists and metadata for merged tables, given n -> merge_tables() stats."""
+    for n, stats in tables.items():
+        _write_table(os.path.join(directory, _top_name(n)), stats.pop('top'))
+    with open(os.path.join(directory, METADATA), 'w', encoding='utf-8') as f:
+        json.dump({'mode': mode, 'max_n': max_n, 'documents': documents,
+                   'tables': {str(n): stats for n, stats in tables.items()}}, f)
+    return FrequencyIndex(directory)
+
+class IndexBuilder:
+    """
+    Streams documents into a new frequency index.
+
+    Attributes:
+        directory (str): Directory the index is built in; created if missing
+        mode (str): Tokenization mode
+        max_n (int): Longest n-gram indexed
+        documents (int): Documents added so far
+        words (int): Words added so far
+    """
+
+    def __init__(self, directory, mode='whitespace', max_n=MAX_NGRAM, run_entries=RUN_ENTRIES):
+        """
+        Raises:
+            ValueError: If the mode is unknown or max_n is below 1
+        """
+        tokenizer_patterns(mode)
+        if max_n < 1:
+            raise ValueError("max_n must be at least 1")
+        self.directory = directory
+        self.mode = mode
+        self.max_n = max_n
+        self.run_entries = run_entries
+        self.documents = 0
+        self.words = 0
+        self._tables = [Counter() for _ in range(max_n)]
+        self._runs = [[] for _ in range(max_n)]
+        self._previous = []
+        os.makedirs(directory, exist_ok=True)
+
+    def _add_words(self, words):
+        """Count a document's next words and the n-grams they end."""
+        self.words += len(words)
+        self._tables[0].update(words)
+        for n in range(2, self.max_n + 1):
+            sequence = self._previous[-(n - 1):] + words
+            if len(sequence) >= n:
+                self._tables[n - 1].update(
+                    map(' '.join, zip(*(islice(sequence, i, None) for i in range(n)))))
+        if self.max_n > 1:
+            self._previous = (self._previous + words)[-(self.max_n - 1):]
+        if sum(map(len, self._tables)) >= self.run_entries:
+            self._spill()
+
+    def add_chunks(self, chunks):
+        """
+        Add one document that arrives in pieces of text.
+
+        Each piece is tokenized up to its last boundary character and the
+        rest carried over, as count_words() would cut it.
+        """
+        _, boundary_pattern = tokenizer_patterns(self.mode)
+        self._previous = []
+        tail = ''
+        for chunk in chunks:
+            text = tail + chunk
+            last_boundary = boundary_pattern.search(text[::-1])
+            cut = len(text) - last_boundary.start() if last_boundary else 0
+            self._add_words(list(word_keys(text[:cut], self.mode)))
+            tail = text[cut:]
+        self._add_words(list(word_keys(tail, self.mode)))
+        self.documents += 1
+
+    def add_text(self, text):
+        """Add one document."""
+        self.add_chunks(text[i:i + READ_CHUNK] for i in range(0, len(text), READ_CHUNK))
+
+    def add_file(self, path, encoding='utf-8'):
+        """
+        Add a text file as one document, decoding undecodable bytes as U+FFFD.
+
+        Raises:
+            OSError: If the file cannot be read
+        """
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+
+        def chunks(f):
+            for data in iter(lambda: f.read(READ_CHUNK), b''):
+                yield decoder.decode(data)
+            yield decoder.decode(b'', final=True)
+
+        with open(path, 'rb') as f:
+            self.add_chunks(chunks(f))
+
+    def _spill(self):
+        """Write the in-memory tables out as sorted runs."""
+        for table, runs in zip(self._tables, self._runs):
+            if table:
+                path = os.path.join(self.directory, f'run-{len(runs)}-{uuid.uuid4().hex}.tsv')
+                _write_table(path, sorted(table.items()))
+                runs.append(path)
+                table.clear()
+
+    def finish(self):
+        """
+        Merge the runs into the final tables.
+
+        Returns:
+            FrequencyIndex: The built index
+        """
+        self._spill()
+        tables = {}
+        for n, runs in enumerate(self._runs, 1):
+            tables[n] = merge_tables(runs, os.path.join(self.directory, _table_name(n)))
+            for path in runs:
+                os.remove(path)
+            runs.clear()
+        return _write_index(self.directory, self.mode, self.max_n, self.documents, tables)
+
+    def discard(self):
+        """Delete the partly built index."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+def merge_indexes(indexes, directory):
+    """
+    Merge frequency indexes into a new one.
+
+    Args:
+        indexes (list): FrequencyIndex objects built with the same mode
+        directory (str): Directory to write the merged index to
+
+    Returns:
+        FrequencyIndex: The merged index, with n-grams up to the shortest
+            max_n of the inputs
+
+    Raises:
+        ValueError: If the indexes use different modes
+    """
+    modes = {index.mode for index in indexes}
+    if len(modes) != 1:
+        raise ValueError(f"Cannot merge indexes with different modes: {sorted(modes)}")
+    max_n = min(index.max_n for index in indexes)
+    os.makedirs(directory, exist_ok=True)
+    tables = {n: merge_tables([os.path.join(index.directory, _table_name(n)) for index in indexes],
+                              os.path.join(directory, _table_name(n)))
+              for n in range(1, max_n + 1)}
+    return _write_index(directory, modes.pop(), max_n,
+                        sum(index.documents for index in indexes), tables)
+
+class FrequencyStore:
+    """
+    The served frequency index, grown by merging in new documents.
+
+    Each version of the index is an immutable directory under ``root``,
+    and the CURRENT file names the one being served. Adding documents
+    builds them into an index of their own, merges it with the current
+    one into a new directory and then switches CURRENT, so queries never
+    see a partial index. A replaced directory is deleted by the update
+    after the one that replaced it, so queries that picked it up just
+    before the switch can finish. Updates are serialised by a lock file,
+    across processes where the platform has fcntl.
+
+    Attributes:
+        root (str): Directory holding the index versions
+        max_n (int): Longest n-gram indexed
+    """
+
+    def __init__(self, root, max_n=MAX_NGRAM):
+        self.root = root
+        self.max_n = max_n
+        self._current = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Return the served FrequencyIndex, or None if nothing has been indexed."""
+        while True:
+            try:
+                with open(os.path.join(self.root, 'CURRENT'), encoding='utf-8') as f:
+                    name = f.read().strip()
+            except FileNotFoundError:
+                return None
+            index = self._current
+            if index is not None and os.path.basename(index.directory) == name:
+                return index
+            try:
+                index = self._current = FrequencyIndex(os.path.join(self.root, name))
+                return index
+            except FileNotFoundError:
+                # Replaced twice since CURRENT was read; read it again
+                continue
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with self._lock, open(os.path.join(self.root, 'lock'), 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    @contextlib.contextmanager
+    def update(self, mode='whitespace'):
+        """
+        Add documents to the index.
+
+        Yields an IndexBuilder to add documents to; when the block ends
+        they are merged into the served index. If the block raises,
+        nothing is added.
+
+        Args:
+            mode (str): Tokenization mode; must match the existing index
+
+        Raises:
+            ValueError: If the mode is unknown or differs from the index's
+        """
+        os.makedirs(self.root, exist_ok=True)
+        current = self.current()
+        if current is not None and current.mode != mode:
+            raise ValueError(f"The index uses the {current.mode!r} mode, not {mode!r}")
+        builder = IndexBuilder(os.path.join(self.root, f'index-{uuid.uuid4().hex}'),
+                               mode, self.max_n)
+        try:
+            yield builder
+            added = builder.finish()
+            with self._locked():
+                current = self.current()
+                if current is None:
+                    index = added
+                else:
+                    index = merge_indexes([current, added],
+                                          os.path.join(self.root, f'index-{uuid.uuid4().hex}'))
+                pointer = os.path.join(self.root, f'CURRENT.{uuid.uuid4().hex}')
+                with open(pointer, 'w', encoding='utf-8') as f:
+                    f.write(os.path.basename(index.directory))
+                os.replace(pointer, os.path.join(self.root, 'CURRENT'))
+                if current is not None:
+                    self._retire(current.directory)
+        except BaseException:
+            builder.discard()
+            raise
+        if index is not added:
+            builder.discard()
+
+    def _retire(self, directory):
+        """Record a replaced index directory and delete the one retired before it."""
+        retired = os.path.join(self.root, 'RETIRED')
+        try:
+            with open(retired, encoding='utf-8') as f:
+                previous = f.read().strip()
+        except FileNotFoundError:
+            previous = ''
+        with open(retired, 'w', encoding='utf-8') as f:
+            f.write(os.path.basename(directory))
+        if previous:
+            # Elsewhere than on POSIX a directory still in use is left behind
+            shutil.rmtree(os.path.join(self.root, previous), ignore_errors=True)
+
+def main(argv=None):
+    """
+    Run the command line interface.
+
+    Returns:
+        int: Exit status, 1 if any file could not be read
+    """
+    from .cli import expand_paths
+
+    parser = argparse.ArgumentParser(
+        prog='wordcount-index',
+        description="Build and query word and n-gram frequency indexes.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help="add files to an index, creating it if needed")
+    add.add_argument('index', help="index directory")
+    add.add_argument('paths', nargs='+', help="files, directories or glob patterns")
+    add.add_argument('-e', '--encoding', default='utf-8')
+    add.add_argument('-m', '--mode', choices=TOKENIZATION_MODES, default='whitespace',
+                     help="tokenization mode (default: whitespace)")
+    add.add_argument('-n', '--ngrams', type=int, default=MAX_NGRAM,
+                     help=f"longest n-gram to index (default: {MAX_NGRAM})")
+    top = commands.add_parser('top', help="print the most frequent words or n-grams")
+    top.add_argument('index', help="index directory")
+    top.add_argument('-n', type=int, default=1, help="n-gram size (default: 1)")
+    top.add_argument('-k', type=int, default=20, help="number of terms (default: 20)")
+    top.add_argument('-f', '--format', choices=['text', 'json'], default='text')
+    args = parser.parse_args(argv)
+
+    if args.command == 'top':
+        index = FrequencyStore(args.index).current()
+        if index is None:
+            print(f"wordcount-index: {args.index}: no index", file=sys.stderr)
+            return 1
+        terms = index.top(args.n, args.k)
+        if args.format == 'json':
+            json.dump([{'term': term, 'count': count} for term, count in terms], sys.stdout)
+            print()
+        else:
+            for term, count in terms:
+                print(f"{count:>10} {term}")
+        return 0
+
+    failed = False
+    with FrequencyStore(args.index, args.ngrams).update(args.mode) as builder:
+        for path in expand_paths(args.paths):
+            try:
+                builder.add_file(path, args.encoding)
+            except OSError as e:
+                failed = True
+                print(f"wordcount-index: {path}: {e.strerror or e}", file=sys.stderr)
+    print(f"Indexed {builder.documents} documents, {builder.words} words")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,397 @@
+"""
+Word Counting Engine
+-------------------
+Counting rules shared by the web application and its helpers. By default
+a word is a whitespace-delimited token containing at least one
+alphanumeric character, so pure punctuation is ignored and hyphenated
+words count once.
+
+Tokenization modes:
+    whitespace  The default rule above
+    uax29       Unicode word boundaries (UAX #29): words break at
+                punctuation except apostrophes and periods inside words
+                ("don't", "e.g") and separators inside numbers ("1,000.5");
+                hyphens and dashes split words; every Han ideograph and
+                Hiragana character is a word, Katakana runs are one word
+    cjk         The whitespace rule, except that every Han ideograph is a
+                word and each run of Hiragana or of Katakana is one word,
+                for Chinese and Japanese text written without spaces
+
+Each mode is one precompiled regular expression, matched once per word,
+plus a pattern for the characters the text may be cut at without
+changing the count. The patterns for the richer modes are built on first
+use and cached.
+"""
+
+import codecs
+import functools
+import math
+import mmap
+import os
+import re
+import sys
+import unicodedata
+from collections import Counter
+
+# A word is a whitespace-delimited token containing at least one
+# alphanumeric character. The match starts at the token's first
+# alphanumeric character and runs to the end of the token, so every such
+# token matches exactly once and pure punctuation never matches. \s and
+# [^\W_] use the same Unicode tables as str.split() and str.isalnum().
+# The empty group makes findall() return the shared '' object for every
+# match instead of copying each word.
+WORD_PATTERN = re.compile(r'[^\W_]\S*()')
+SPACE_PATTERN = re.compile(r'\s')
+ALNUM_PATTERN = re.compile(r'[^\W_]')
+
+# Patterns used by text_stats(): whole tokens, the part of a token from
+# its first to its last alphanumeric character (the frequency key), and
+# sentence-ending punctuation optionally followed by closing quotes or
+# brackets
+TOKEN_PATTERN = re.compile(r'\S+')
+CORE_PATTERN = re.compile(r'[^\W_](?:\S*[^\W_])?')
+SENTENCE_END_PATTERN = re.compile('[.!?\u2026\u3002\uff01\uff1f][\'")\\]\u2019\u201d]*\\Z')
+
+# Average adult silent reading speed used for the reading time estimate
+READING_WORDS_PER_MINUTE = 200
+
+TOKENIZATION_MODES = ('whitespace', 'uax29', 'cjk')
+
+# Letters of the scripts written without spaces between words; the Kana
+# ranges leave out punctuation and combining sound marks
+HAN_RANGES = '\u3005\u3007\u3021-\u3029\u3038-\u303b\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\U00020000-\U0003ffff'
+HIRAGANA_RANGES = '\u3041-\u3096\u309d-\u309f'
+KATAKANA_RANGES = '\u30a1-\u30fa\u30fc-\u30ff\u31f0-\u31ff\uff66-\uff9f'
+
+# UAX #29 separators that join letters (MidLetter), letters or digits
+# (MidNumLet) and digits (MidNum) when they sit between two of them
+MID_LETTER = ':\u00b7\u0387\u055f\u05f4\u2027\ufe13\ufe55\uff1a'
+MID_NUM_LET = "'.\u2018\u2019\u2024\ufe52\uff07\uff0e"
+MID_NUM = ',;\u037e\u0589\u060c\u060d\u066c\u07f8\u2044\ufe10\ufe14\ufe50\ufe54\uff0c\uff1b'
+
+# Characters scanned per findall() call; bounds the temporary match list
+COUNT_WINDOW = 1 << 16
+
+# Bytes read from the request body per step by the streaming endpoint
+STREAM_CHUNK_SIZE = 1 << 16
+
+# Files at least this large are memory-mapped instead of read into memory
+MMAP_THRESHOLD = 1 << 20
+
+# Bytes of a memory-mapped file decoded per step
+MMAP_CHUNK_SIZE = 1 << 20
+
+def _char_class(code_points):
+    """Build a regular expression character class from ascending code points."""
+    ranges = []
+    for code_point in code_points:
+        if ranges and ranges[-1][1] == code_point - 1:
+            ranges[-1][1] = code_point
+        else:
+            ranges.append([code_point, code_point])
+    return '[' + ''.join(
+        f'\\U{first:08x}' if first == last else f'\\U{first:08x}-\\U{last:08x}'
+        for first, last in ranges) + ']'
+
+def _extend_chars():
+    """Combining marks and format characters, which UAX #29 keeps with the preceding character."""
+    return (code_point for code_point in range(sys.maxunicode + 1)
+            if unicodedata.category(chr(code_point)) in ('Mn', 'Mc', 'Me', 'Cf')
+            and code_point != 0x200b)
+
+@functools.lru_cache(maxsize=None)
+def tokenizer_patterns(mode='whitespace'):
+    """
+    Return the compiled patterns for a tokenization mode.
+    
+    Args:
+        mode (str): One of TOKENIZATION_MODES
+        
+    Returns:
+        tuple: (word pattern, boundary pattern). The word pattern has one
+            group: each match counts as one word plus the length of the
+            group, which lets a run of ideographs count one word per
+            character with a single match. The text can be cut before or
+            after any character the boundary pattern matches without
+            changing the count.
+        
+    Raises:
+        ValueError: If the mode is unknown
+    """
+    if mode == 'whitespace':
+        return WORD_PATTERN, SPACE_PATTERN
+    if mode not in TOKENIZATION_MODES:
+        raise ValueError(f"Unknown tokenization mode: {mode!r}")
+    
+    cjk = HAN_RANGES + HIRAGANA_RANGES + KATAKANA_RANGES
+    # Alphanumeric characters outside the Han and Kana scripts. A negated
+    # class keeps this a category test instead of a long list of ranges.
+    alnum = f'[^\\W_{cjk}]'
+    if mode == 'cjk':
+        word = f'{alnum}[^\\s{cjk}]*|[{HAN_RANGES}]([{HAN_RANGES}]*)|[{HIRAGANA_RANGES}]+|[{KATAKANA_RANGES}]+'
+        boundary = f'[\\s{HAN_RANGES}]'
+    else:
+        # Combining marks and format characters continue a word; none are
+        # ASCII, so the lookahead skips the long class at most word ends
+        run = f'{alnum}+(?:(?=[^\\x00-\\x7f]){_char_class(_extend_chars())}+{alnum}*)*'
+        letter = '[^\\W\\d_]'
+        join = (f'(?=[_{MID_LETTER}{MID_NUM_LET}{MID_NUM}])'
+                f'(?:_+|(?<={letter})[{MID_LETTER}{MID_NUM_LET}](?={letter})'
+                f'|(?<=\\d)[{MID_NUM}{MID_NUM_LET}](?=\\d))')
+        ideographs = HAN_RANGES + HIRAGANA_RANGES
+        word = f'{run}(?:{join}{run})*|[{ideographs}]([{ideographs}]*)|[{KATAKANA_RANGES}]+'
+        boundary = f'[\\s{ideographs}]'
+    return re.compile(f'(?:{word})'), re.compile(boundary)
+
+def count_words(text, mode='whitespace'):
+    """
+    Count words in the given text with enhanced error handling and processing.
+    
+    The text is scanned once by a compiled regular expression, in windows
+    that end on whitespace (or, in the CJK-aware modes, ideographs) so no
+    word is split between two windows. No copy of the input or list of
+    its words is made.
+    
+    Args:
+        text (str): Input text to process
+        mode (str): Tokenization mode, one of TOKENIZATION_MODES.
+            Defaults to 'whitespace'.
+        
+    Returns:
+        int: Number of words in the text
+        
+    Raises:
+        ValueError: If the mode is unknown
+        
+    Note:
+        - Handles empty input and whitespace
+        - Filters out pure punctuation
+        - Considers hyphenated words as single words (whitespace and cjk modes)
+    """
+    patterns = tokenizer_patterns(mode)
+    if not text:
+        return 0
+    return _count_range(text, 0, len(text), *patterns)
+
+def _count_range(text, pos, end, word_pattern=WORD_PATTERN, boundary_pattern=SPACE_PATTERN):
+    """
+    Count the words in text[pos:end] without slicing it.
+    
+    Both ends must fall on boundary characters or on the ends of the text.
+    """
+    count = 0
+    while pos < end:
+        stop = pos + COUNT_WINDOW
+        if stop >= end:
+            stop = end
+        else:
+            # Extend the window to the next boundary character
+            boundary = boundary_pattern.search(text, stop)
+            stop = boundary.start() if boundary else end
+        matches = word_pattern.findall(text, pos, stop)
+        count += len(matches) + sum(map(len, matches))
+        pos = stop
+    return count
+
+class WordCounter:
+    """
+    Incremental word counter for text that arrives in chunks.
+    
+    Gives the same result as count_words() on the concatenated chunks.
+    In whitespace mode a word cut by a chunk boundary is carried over as
+    two flags (inside a token, token has an alphanumeric character)
+    rather than as text, so memory stays constant however long the input
+    or its tokens are. Other modes carry the text after the chunk's last
+    boundary character over to the next chunk.
+    
+    Attributes:
+        count (int): Words completed so far
+        mode (str): Tokenization mode
+    """
+    
+    def __init__(self, mode='whitespace'):
+        self.count = 0
+        self.mode = mode
+        self._patterns = tokenizer_patterns(mode)
+        self._in_token = False
+        self._token_has_alnum = False
+        self._tail = ''
+    
+    def update(self, chunk):
+        """
+        Count the words in the next chunk of text.
+        
+        Args:
+            chunk (str): Next piece of the text
+        """
+        if not chunk:
+            return
+        if self.mode != 'whitespace':
+            self._update_carrying(chunk)
+            return
+        first_space = SPACE_PATTERN.search(chunk)
+        if first_space is None:
+            # The whole chunk continues (or starts) a single token
+            self._in_token = True
+            self._token_has_alnum = self._token_has_alnum or bool(ALNUM_PATTERN.search(chunk))
+            return
+        
+        # Close the token running into the chunk's first whitespace
+        head_end = first_space.start()
+        if (self._in_token or head_end) and (
+                self._token_has_alnum or ALNUM_PATTERN.search(chunk, 0, head_end)):
+            self.count += 1
+        
+        # Count complete tokens up to the last whitespace, carry the rest
+        tail_start = len(chunk) - SPACE_PATTERN.search(chunk[::-1]).start()
+        self.count += _count_range(chunk, head_end, tail_start)
+        self._in_token = tail_start < len(chunk)
+        self._token_has_alnum = self._in_token and bool(ALNUM_PATTERN.search(chunk, tail_start))
+    
+    def _update_carrying(self, chunk):
+        """Count up to the last boundary character and carry the rest."""
+        text = self._tail + chunk
+        word_pattern, boundary_pattern = self._patterns
+        last_boundary = boundary_pattern.search(text[::-1])
+        cut = len(text) - last_boundary.start() if last_boundary else 0
+        self.count += _count_range(text, 0, cut, word_pattern, boundary_pattern)
+        self._tail = text[cut:]
+    
+    def finish(self):
+        """
+        Close the final token.
+        
+        Returns:
+            int: Total number of words
+        """
+        if self._in_token and self._token_has_alnum:
+            self.count += 1
+        if self._tail:
+            self.count += _count_range(self._tail, 0, len(self._tail), *self._patterns)
+        self._in_token = self._token_has_alnum = False
+        self._tail = ''
+        return self.count
+
+def count_stream(stream, encoding='utf-8', mode='whitespace'):
+    """
+    Count words in a binary stream without reading it into memory.
+    
+    Args:
+        stream: Binary file-like object
+        encoding (str): Text encoding of the stream. Defaults to 'utf-8'.
+        mode (str): Tokenization mode. Defaults to 'whitespace'.
+        
+    Returns:
+        int: Number of words in the stream
+    """
+    return _count_chunks(iter(lambda: stream.read(STREAM_CHUNK_SIZE), b''), encoding, mode)
+
+def count_file(path, encoding='utf-8', mode='whitespace'):
+    """
+    Count words in a text file.
+    
+    Small files are read and decoded in one go. Files of MMAP_THRESHOLD
+    bytes or more are memory-mapped and decoded a window at a time, so
+    memory use stays flat and the file is never copied into the process
+    as a whole. Undecodable bytes are replaced rather than raising.
+    
+    Args:
+        path (str or Path): File to count
+        encoding (str): Text encoding of the file. Defaults to 'utf-8'.
+        mode (str): Tokenization mode. Defaults to 'whitespace'.
+        
+    Returns:
+        int: Number of words in the file
+        
+    Raises:
+        OSError: If the file cannot be opened or mapped
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+            return count_words(f.read().decode(encoding, errors='replace'), mode)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                windows = (view[pos:pos + MMAP_CHUNK_SIZE]
+                           for pos in range(0, len(view), MMAP_CHUNK_SIZE))
+                return _count_chunks(windows, encoding, mode)
+            finally:
+                view.release()
+
+def _count_chunks(chunks, encoding, mode='whitespace'):
+    """Decode and count an iterable of byte chunks with a WordCounter."""
+    counter = WordCounter(mode)
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    for data in chunks:
+        counter.update(decoder.decode(data))
+    counter.update(decoder.decode(b'', final=True))
+    return counter.finish()
+
+def text_stats(text, top_n=10):
+    """
+    Compute rich statistics for a text in a single pass.
+    
+    Every whitespace-delimited token is visited once. Word detection uses
+    the same rule as count_words(), so 'words' always equals its result.
+    Word frequencies are counted in a Counter keyed by the lower-cased
+    token trimmed to its first and last alphanumeric characters, and
+    most_common() picks the top words with a bounded heap rather than a
+    full sort.
+    
+    Args:
+        text (str): Input text to analyze
+        top_n (int): Number of most frequent words to return. Defaults to 10.
+        
+    Returns:
+        dict: Statistics with keys words, characters, characters_no_spaces,
+            sentences, paragraphs, unique_words, top_words (list of
+            {word, count}, most frequent first) and reading_time_seconds
+            
+    Note:
+        - A sentence ends at '.', '!', '?' or '…' (optionally followed by
+          closing quotes or brackets), at a paragraph break, or at the end
+          of the text, and must contain at least one word
+        - Paragraphs are separated by one or more blank lines
+    """
+    text = text or ''
+    frequencies = Counter()
+    words = sentences = paragraphs = token_chars = 0
+    in_sentence = False
+    previous_end = 0
+    
+    for match in TOKEN_PATTERN.finditer(text):
+        start, end = match.span()
+        token = match.group()
+        token_chars += end - start
+        
+        if not paragraphs or text.count('\n', previous_end, start) >= 2:
+            paragraphs += 1
+            if in_sentence:
+                sentences += 1
+                in_sentence = False
+        previous_end = end
+        
+        core = CORE_PATTERN.search(token)
+        if core:
+            words += 1
+            key = core.group().lower()
+            frequencies[key] += 1
+            in_sentence = True
+        if in_sentence and SENTENCE_END_PATTERN.search(token):
+            sentences += 1
+            in_sentence = False
+    
+    if in_sentence:
+        sentences += 1
+    
+    top_words = frequencies.most_common(top_n)
+    return {
+        'words': words,
+        'characters': len(text),
+        'characters_no_spaces': token_chars,
+        'sentences': sentences,
+        'paragraphs': paragraphs,
+        'unique_words': len(frequencies),
+        'top_words': [{'word': word, 'count': count} for word, count in top_words],
+        'reading_time_seconds': math.ceil(words * 60 / READING_WORDS_PER_MINUTE)
+    }
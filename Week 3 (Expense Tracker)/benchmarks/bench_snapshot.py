@@ -0,0 +1,108 @@
+"""
+Load-time benchmark: JSON ledger vs. binary snapshot.
+
+Generates a synthetic ledger, writes it both as the indented JSON file used
+by Storage and as a binary snapshot, then times:
+
+    json        json.load + sort by parsed ISO date (the original load path)
+    snap-open   mapping the snapshot and exposing its columns
+    snap-rows   mapping the snapshot and materializing expense dictionaries
+
+Usage:
+    python benchmarks/bench_snapshot.py                 # 100k and 1M rows
+    python benchmarks/bench_snapshot.py --rows 50000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from expense import ExpenseManager  # noqa: E402
+from snapshot import SnapshotLedger, write_snapshot  # noqa: E402
+
+
+def make_expenses(count, seed=0):
+    """Build ``count`` expense dictionaries sorted by date."""
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    expenses = []
+    for _ in range(count):
+        date = start + timedelta(seconds=rng.randrange(5 * 365 * 86400),
+                                 microseconds=rng.randrange(1000000))
+        expenses.append({
+            'amount': f"{rng.randrange(1, 100000) / 100:.2f}",
+            'description': f"Item {rng.randrange(10000)}",
+            'category': rng.choice(ExpenseManager.CATEGORIES),
+            'date': date.isoformat()
+        })
+    expenses.sort(key=lambda x: x['date'])
+    return expenses
+
+
+def best_of(repeat, func):
+    """Return the fastest of ``repeat`` timings of ``func()`` in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def load_json(path):
+    with open(path, 'r') as f:
+        expenses = json.load(f)
+    return sorted(expenses, key=lambda x: datetime.fromisoformat(x['date']))
+
+
+def open_snapshot(path):
+    with SnapshotLedger(path) as ledger:
+        return len(ledger)
+
+
+def load_snapshot_rows(path):
+    with SnapshotLedger(path) as ledger:
+        return ledger.rows()
+
+
+def run(count, repeat):
+    expenses = make_expenses(count)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = Path(tmp) / 'expenses.json'
+        snap_path = Path(tmp) / 'expenses.snap'
+        with open(json_path, 'w') as f:
+            json.dump(expenses, f, indent=2)
+        write_snapshot(snap_path, expenses, os.stat(json_path))
+        assert load_snapshot_rows(snap_path) == expenses
+
+        results = {
+            'json': best_of(repeat, lambda: load_json(json_path)),
+            'snap-open': best_of(repeat, lambda: open_snapshot(snap_path)),
+            'snap-rows': best_of(repeat, lambda: load_snapshot_rows(snap_path)),
+        }
+        sizes = (json_path.stat().st_size, snap_path.stat().st_size)
+
+    print(f"\n{count:,} rows  (json {sizes[0] / 1e6:.1f} MB, snapshot {sizes[1] / 1e6:.1f} MB)")
+    for name, seconds in results.items():
+        speedup = results['json'] / seconds if seconds else float('inf')
+        print(f"  {name:<10} {seconds * 1000:>10.1f} ms  {speedup:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    for count in args.rows:
+        run(count, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,78 @@
 generating summaries, and producing insight reports.
 
 Classes:
+    LedgerAggregates: Totals computed in one pass over the expense list
     Analytics: Provides expense data analysis capabilities
+
+Functions:
+    month_label: Format a 'YYYY-MM' month key for display
 """
 from datetime import datetime
 from decimal import Decimal
 from collections import defaultdict
 
+def month_label(month_key, fmt='%B %Y'):
+    """
+    Format a 'YYYY-MM' month key for display.
+
+    Args:
+        month_key (str): Month key as used by LedgerAggregates
+        fmt (str): strftime format. Defaults to '%B %Y'.
+
+    Returns:
+        str: Label such as 'March 2024'
+    """
+    return datetime.strptime(month_key, '%Y-%m').strftime(fmt)
+
+class LedgerAggregates:
+    """
+    Totals computed in a single pass over the expense list.
+
+    Instances are treated as immutable and are shared between the
+    dashboard charts, the summary dialogs and the CLI reports.
+
+    Attributes:
+        version (tuple): Storage data version the totals were computed from
+        count (int): Number of expenses
+        total (Decimal): Sum of all expenses
+        category_totals (dict): Category totals, largest first
+        monthly_totals (dict): Monthly totals keyed 'YYYY-MM', oldest first
+        monthly_category_totals (dict): Per-month category totals keyed 'YYYY-MM',
+            oldest first
+    """
+
+    def __init__(self, version, expenses):
+        """
+        Compute the aggregates for a list of expenses.
+
+        Args:
+            version (tuple): Storage data version of ``expenses``
+            expenses (list): Expense dictionaries
+        """
+        self.version = version
+        self.count = len(expenses)
+        total = Decimal('0')
+        category_totals = defaultdict(Decimal)
+        monthly_category_totals = defaultdict(lambda: defaultdict(Decimal))
+
+        for expense in expenses:
+            amount = Decimal(expense['amount'])
+            # ISO dates start with 'YYYY-MM', no need to parse the full timestamp
+            month_key = expense['date'][:7]
+            total += amount
+            category_totals[expense['category']] += amount
+            monthly_category_totals[month_key][expense['category']] += amount
+
+        self.total = total
+        self.category_totals = dict(sorted(category_totals.items(), key=lambda x: x[1], reverse=True))
+        self.monthly_category_totals = {
+            month: dict(totals) for month, totals in sorted(monthly_category_totals.items())
+        }
+        self.monthly_totals = {
+            month: sum(totals.values(), Decimal('0'))
+            for month, totals in self.monthly_category_totals.items()
+        }
+
 class Analytics:
     """
     Provides expense data analysis capabilities.
@@ -30,6 +96,22 @@ def __init__(self, storage):
             storage (Storage): Storage instance to access expense data
         """
         self.storage = storage
+        self._aggregates = None
+
+    def aggregates(self):
+        """
+        Return the aggregates for the current stored data.
+
+        The aggregates are recomputed only when the storage data version
+        has changed since the last call.
+
+        Returns:
+            LedgerAggregates: Totals for the current expenses
+        """
+        version = self.storage.data_version()
+        if self._aggregates is None or self._aggregates.version != version:
+            self._aggregates = LedgerAggregates(version, self.storage.get_expenses())
+        return self._aggregates
 
     def monthly_summary(self):
         """
@@ -41,17 +123,12 @@ def monthly_summary(self):
         Returns:
             dict: Monthly expense totals, with month keys in format 'YYYY-MM'
         """
-        expenses = self.storage.get_expenses()
-        monthly_totals = defaultdict(Decimal)
-
-        for expense in expenses:
-            date = datetime.fromisoformat(expense['date'])
-            month_key = f"{date.year}-{date.month:02d}"
-            monthly_totals[month_key] += Decimal(expense['amount'])
+        monthly_totals = self.aggregates().monthly_totals
 
         print("\nMonthly Summary:")
-        for month, total in sorted(monthly_totals.items()):
+        for month, total in monthly_totals.items():
             print(f"{month}: ${total:.2f}")
+        return monthly_totals
 
     def category_analysis(self):
         """
@@ -63,12 +140,9 @@ def category_analysis(self):
         Returns:
             dict: Category expense totals
         """
-        expenses = self.storage.get_expenses()
-        category_totals = defaultdict(Decimal)
-        
-        for expense in expenses:
-            category_totals[expense['category']] += Decimal(expense['amount'])
+        category_totals = self.aggregates().category_totals
 
         print("\nCategory Analysis:")
         for category, total in sorted(category_totals.items()):
             print(f"{category.capitalize()}: ${total:.2f}")
+        return category_totals
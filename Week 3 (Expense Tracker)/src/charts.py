@@ -0,0 +1,194 @@
+"""
+Dashboard chart rendering for the Expense Tracker application.
+
+This module draws the dashboard charts from precomputed ledger aggregates
+into PNG images and keeps the most recent images in memory, keyed by the
+data version, theme and pixel size they were drawn for. Switching tabs,
+toggling back to a previous theme or returning to a previous window size
+then reuses the cached image instead of running matplotlib again.
+
+Classes:
+    ChartRenderer: Renders and caches rasterized dashboard charts
+
+Constants:
+    CHARTS: Mapping of chart keys to their tab titles
+"""
+from collections import OrderedDict
+from io import BytesIO
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from analytics import month_label
+
+CHARTS = {
+    'category': "By Category",
+    'trend': "Monthly Trend",
+    'stacked': "Category per Month",
+}
+
+# Number of individual category lines drawn on the trend chart
+TREND_CATEGORIES = 5
+DPI = 100
+
+
+def _style_axes(ax, theme):
+    """Apply theme colors to a cartesian axes."""
+    ax.set_facecolor(theme.chart_bg)
+    ax.tick_params(colors=theme.chart_text, labelsize=8)
+    ax.grid(True, axis='y', color=theme.chart_grid, linewidth=0.8)
+    ax.set_axisbelow(True)
+    for spine in ax.spines.values():
+        spine.set_color(theme.chart_grid)
+
+
+def _style_legend(legend, theme):
+    legend.get_frame().set_facecolor(theme.bg_frame)
+    legend.get_frame().set_edgecolor(theme.chart_grid)
+    for text in legend.get_texts():
+        text.set_color(theme.fg_main)
+
+
+def _month_ticks(ax, months):
+    """Label the x axis with short month names, thinning them when crowded."""
+    step = max(1, len(months) // 12)
+    positions = list(range(0, len(months), step))
+    ax.set_xticks(positions)
+    ax.set_xticklabels([month_label(months[i], '%b %Y') for i in positions], rotation=45, ha='right')
+
+
+def _draw_category(fig, aggregates, theme):
+    """Pie chart of totals per category."""
+    ax = fig.add_subplot(111)
+    ax.set_facecolor(theme.bg_frame)
+    labels = [category.capitalize() for category in aggregates.category_totals]
+    values = [float(total) for total in aggregates.category_totals.values()]
+    ax.pie(
+        values,
+        labels=None,
+        autopct='%1.1f%%',
+        startangle=90,
+        wedgeprops={'edgecolor': 'white', 'linewidth': 1},
+        textprops={'color': 'white', 'weight': 'bold', 'fontsize': 9},
+        colors=theme.pie_colors
+    )
+    legend = ax.legend(labels, loc='center left', bbox_to_anchor=(0.9, 0.5), fontsize=9)
+    _style_legend(legend, theme)
+    ax.set_title("Expense Distribution by Category", color=theme.fg_heading)
+
+
+def _draw_trend(fig, aggregates, theme):
+    """Line chart of monthly totals, plus the largest categories."""
+    ax = fig.add_subplot(111)
+    _style_axes(ax, theme)
+    months = list(aggregates.monthly_totals)
+    positions = range(len(months))
+    ax.plot(positions, [float(total) for total in aggregates.monthly_totals.values()],
+            color=theme.fg_accent, linewidth=2.5, marker='o', markersize=4, label="Total")
+
+    top_categories = list(aggregates.category_totals)[:TREND_CATEGORIES]
+    for i, category in enumerate(top_categories):
+        values = [float(aggregates.monthly_category_totals[month].get(category, 0)) for month in months]
+        ax.plot(positions, values, color=theme.pie_colors[i % len(theme.pie_colors)],
+                linewidth=1.2, marker='.', label=category.capitalize())
+
+    _month_ticks(ax, months)
+    ax.set_ylabel("Amount ($)", color=theme.chart_text)
+    _style_legend(ax.legend(fontsize=8), theme)
+    ax.set_title("Monthly Spending Trend", color=theme.fg_heading)
+
+
+def _draw_stacked(fig, aggregates, theme):
+    """Stacked bar chart of category totals per month."""
+    ax = fig.add_subplot(111)
+    _style_axes(ax, theme)
+    months = list(aggregates.monthly_category_totals)
+    positions = range(len(months))
+    bottoms = [0.0] * len(months)
+
+    # Stack largest categories at the bottom so the colors match the pie chart
+    for i, category in enumerate(aggregates.category_totals):
+        values = [float(aggregates.monthly_category_totals[month].get(category, 0)) for month in months]
+        ax.bar(positions, values, bottom=bottoms, width=0.8,
+               color=theme.pie_colors[i % len(theme.pie_colors)], label=category.capitalize())
+        bottoms = [bottom + value for bottom, value in zip(bottoms, values)]
+
+    _month_ticks(ax, months)
+    ax.set_ylabel("Amount ($)", color=theme.chart_text)
+    _style_legend(ax.legend(fontsize=7, ncol=2), theme)
+    ax.set_title("Category Spending per Month", color=theme.fg_heading)
+
+
+_DRAWERS = {
+    'category': _draw_category,
+    'trend': _draw_trend,
+    'stacked': _draw_stacked,
+}
+
+
+class ChartRenderer:
+    """
+    Renders dashboard charts to PNG and caches the results.
+
+    Attributes:
+        max_entries (int): Maximum number of cached images
+        hits (int): Number of renders served from the cache
+        misses (int): Number of renders that ran matplotlib
+    """
+
+    def __init__(self, max_entries=24):
+        """
+        Initialize the renderer.
+
+        Args:
+            max_entries (int): Maximum number of cached images. Defaults to 24.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    @staticmethod
+    def cache_key(chart, aggregates, theme, width, height):
+        """
+        Build the cache key for a chart image.
+
+        Returns:
+            tuple: (chart, data version, theme name, width, height)
+        """
+        return (chart, aggregates.version, theme.name, width, height)
+
+    def render(self, chart, aggregates, theme, width, height):
+        """
+        Return a chart as PNG bytes, drawing it only on a cache miss.
+
+        Args:
+            chart (str): One of the keys of CHARTS
+            aggregates (LedgerAggregates): Data to plot
+            theme (Theme): Theme providing the chart colors
+            width (int): Image width in pixels
+            height (int): Image height in pixels
+
+        Returns:
+            bytes: PNG image data
+        """
+        key = self.cache_key(chart, aggregates, theme, width, height)
+        if key in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        self.misses += 1
+        fig = Figure(figsize=(width / DPI, height / DPI), dpi=DPI, tight_layout=True)
+        fig.patch.set_facecolor(theme.bg_frame)
+        _DRAWERS[chart](fig, aggregates, theme)
+        buffer = BytesIO()
+        FigureCanvasAgg(fig).print_png(buffer)
+        image = buffer.getvalue()
+
+        self._cache[key] = image
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return image
+
+    def clear(self):
+        """Drop all cached images."""
+        self._cache.clear()
@@ -10,6 +10,7 @@
 """
 from datetime import datetime
 from decimal import Decimal
+from history import CommandLog, describe_change
 
 class Expense:
     """
@@ -61,6 +62,7 @@ class ExpenseManager:
     Attributes:
         CATEGORIES (list): List of predefined expense categories
         storage (Storage): Data storage instance for persistence
+        history (CommandLog): Undo/redo log of changes made through this manager
     """
     
     CATEGORIES = [
@@ -78,6 +80,7 @@ def __init__(self, storage):
             storage (Storage): Data storage instance for persisting expenses
         """
         self.storage = storage
+        self.history = CommandLog(storage)
 
     def add_expense(self):
         """
@@ -100,11 +103,35 @@ def add_expense(self):
             category = self.CATEGORIES[category_idx]
 
             expense = Expense(amount, description, category)
-            self.storage.save_expense(expense)
+            self.history.record(self.storage.save_expense(expense))
             print("Expense added successfully!")
         except (ValueError, IndexError) as e:
             print(f"Error: {e}")
 
+    def undo(self):
+        """
+        Undo the most recent change via CLI.
+        
+        Prints the change that was undone, or a notice if there is none.
+        """
+        change = self.history.undo()
+        if change is None:
+            print("Nothing to undo.")
+        else:
+            print(f"Undone: {describe_change(change)}")
+
+    def redo(self):
+        """
+        Redo the most recently undone change via CLI.
+        
+        Prints the change that was redone, or a notice if there is none.
+        """
+        change = self.history.redo()
+        if change is None:
+            print("Nothing to redo.")
+        else:
+            print(f"Redone: {describe_change(change)}")
+
     def view_expenses(self):
         """
         Display all expenses via CLI.
@@ -1,14 +1,18 @@
-from datetime import datetime
+import base64
 import tkinter as tk
 from tkinter import ttk, messagebox
 from expense import Expense, ExpenseManager
 from storage import Storage
-from analytics import Analytics
+from analytics import Analytics, month_label
+from charts import CHARTS, ChartRenderer
+from history import describe_change
 from decimal import Decimal
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from themes import THEMES, DEFAULT_THEME
 
+# Chart images are rendered at sizes rounded down to this many pixels so
+# small resize jitter reuses cached images
+CHART_SIZE_STEP = 20
+
 class ExpenseTrackerGUI:
     def __init__(self, root):
         self.root = root
@@ -35,9 +39,16 @@ def __init__(self, root):
         self.style = ttk.Style()
         self.style.theme_use('clam')
         
-        self.storage = Storage()
+        self.storage = Storage(use_snapshot=True)
         self.expense_manager = ExpenseManager(self.storage)
         self.analytics = Analytics(self.storage)
+        self.chart_renderer = ChartRenderer()
+        self._chart_images = {}
+        self._chart_resize_job = None
+        self.history = self.expense_manager.history
+        
+        # Fold journaled changes into the expenses file when the window closes
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
         
         self.apply_theme()
         self.setup_ui()
@@ -72,6 +83,13 @@ def apply_theme(self):
                              foreground=theme.fg_heading, 
                              font=('Segoe UI', 10, 'bold'))
         
+        # Configure chart tabs
+        self.style.configure('TNotebook', background=theme.bg_frame, bordercolor=theme.border)
+        self.style.configure('TNotebook.Tab', background=theme.bg_widget, foreground=theme.fg_main, padding=(10, 4))
+        self.style.map('TNotebook.Tab',
+                       background=[('selected', theme.highlight)],
+                       foreground=[('selected', theme.bg_frame)])
+        
         # Add style for selected theme button
         self.style.configure('Selected.TButton', 
                             background=theme.highlight,
@@ -88,8 +106,8 @@ def theme_changed(self, *args):
         self.current_theme = THEMES[self.current_theme_name]()
         self.apply_theme()
         
-        # Refresh the UI to apply the new theme
-        self.refresh_data()
+        # Only the charts depend on the theme beyond the ttk styles
+        self.update_dashboard()
         self.status_var.set(f"Theme changed to {self.current_theme_name}")
 
     def center_window(self):
@@ -232,6 +250,12 @@ def setup_ui(self):
         # Also allow delete with Delete key
         self.expense_tree.bind("<Delete>", lambda event: self.delete_selected_expense())
         
+        # Undo/redo anywhere in the window, with or without Caps Lock
+        for sequence in ("<Control-z>", "<Control-Z>"):
+            self.root.bind(sequence, lambda event: self.on_history_key(event, self.undo))
+        for sequence in ("<Control-y>", "<Control-Y>"):
+            self.root.bind(sequence, lambda event: self.on_history_key(event, self.redo))
+        
         # Configure columns
         columns = {
             "Date": (150, "Date"),
@@ -265,9 +289,30 @@ def setup_ui(self):
         dashboard_frame.columnconfigure(0, weight=1)
         dashboard_frame.rowconfigure(0, weight=1)
         
-        # Create the chart frame for the pie chart
-        self.chart_frame = ttk.Frame(dashboard_frame)
-        self.chart_frame.pack(fill=tk.BOTH, expand=True)
+        # Summary line above the charts
+        summary_frame = ttk.Frame(dashboard_frame)
+        summary_frame.pack(fill=tk.X, pady=(0, 10))
+        self.total_var = tk.StringVar()
+        self.category_count_var = tk.StringVar()
+        ttk.Label(summary_frame, textvariable=self.total_var,
+                 font=('Segoe UI', 12, 'bold')).pack(side=tk.LEFT)
+        ttk.Label(summary_frame, textvariable=self.category_count_var,
+                 font=('Segoe UI', 12)).pack(side=tk.RIGHT)
+        
+        # One tab per chart; each tab shows a cached chart image
+        self.chart_notebook = ttk.Notebook(dashboard_frame)
+        self.chart_notebook.pack(fill=tk.BOTH, expand=True)
+        self.chart_tabs = {}
+        self.chart_labels = {}
+        for chart, title in CHARTS.items():
+            tab = ttk.Frame(self.chart_notebook)
+            label = ttk.Label(tab, anchor='center', justify='center', font=('Segoe UI', 12))
+            label.pack(fill=tk.BOTH, expand=True)
+            self.chart_notebook.add(tab, text=title)
+            self.chart_tabs[chart] = tab
+            self.chart_labels[chart] = label
+        self.chart_notebook.bind("<<NotebookTabChanged>>", lambda event: self.render_current_chart())
+        self.chart_notebook.bind("<Configure>", self.schedule_chart_resize)
         
         # Status bar
         status_frame = ttk.Frame(main_container, relief=tk.SUNKEN, padding=(5, 2))
@@ -308,7 +353,7 @@ def add_expense(self):
                 return
 
             expense = Expense(amount, description, category)
-            self.storage.save_expense(expense)
+            self.history.record(self.storage.save_expense(expense))
             
             self.amount_entry.delete(0, tk.END)
             self.desc_entry.delete(0, tk.END)
@@ -345,144 +390,66 @@ def refresh_expenses(self):
         self.sort_treeview(self.sort_column)
 
     def update_dashboard(self):
-        # Clear existing charts
-        for widget in self.chart_frame.winfo_children():
-            widget.destroy()
-            
-        # Get expense data
-        expenses = self.storage.get_expenses()
-        if not expenses:
-            ttk.Label(self.chart_frame, text="No expenses recorded yet.\nAdd expenses to see analytics.",
-                     font=('Segoe UI', 12), justify='center').pack(expand=True)
+        """Refresh the summary line and the visible chart from cached aggregates."""
+        aggregates = self.analytics.aggregates()
+        self.total_var.set(f"Total Expenses: ${aggregates.total:.2f}")
+        self.category_count_var.set(f"Categories: {len(aggregates.category_totals)}")
+        self.render_current_chart()
+
+    def schedule_chart_resize(self, event=None):
+        """Re-render the visible chart once resizing has settled."""
+        if self._chart_resize_job is not None:
+            self.root.after_cancel(self._chart_resize_job)
+        self._chart_resize_job = self.root.after(150, self.render_current_chart)
+
+    def render_current_chart(self):
+        """
+        Show the chart of the selected tab.
+        
+        The image is taken from the chart renderer's cache, keyed by data
+        version, theme and size; if the tab already shows that image
+        nothing is redrawn.
+        """
+        self._chart_resize_job = None
+        chart = list(CHARTS)[self.chart_notebook.index(self.chart_notebook.select())]
+        label = self.chart_labels[chart]
+        aggregates = self.analytics.aggregates()
+        
+        if not aggregates.count:
+            self._chart_images.pop(chart, None)
+            label.configure(image='', text="No expenses recorded yet.\nAdd expenses to see analytics.")
             return
-            
-        # Calculate category totals for pie chart
-        category_totals = {}
-        total_amount = Decimal('0')
-        for expense in expenses:
-            category = expense['category']
-            amount = Decimal(expense['amount'])
-            category_totals[category] = category_totals.get(category, Decimal('0')) + amount
-            total_amount += amount
-            
-        # Create summary text
-        summary_frame = ttk.Frame(self.chart_frame)
-        summary_frame.pack(fill=tk.X, pady=(0, 10))
         
-        ttk.Label(summary_frame, text=f"Total Expenses: ${total_amount:.2f}",
-                 font=('Segoe UI', 12, 'bold')).pack(side=tk.LEFT)
-        
-        ttk.Label(summary_frame, text=f"Categories: {len(category_totals)}",
-                 font=('Segoe UI', 12)).pack(side=tk.RIGHT)
+        tab = self.chart_tabs[chart]
+        width = max(tab.winfo_width(), 300) // CHART_SIZE_STEP * CHART_SIZE_STEP
+        height = max(tab.winfo_height(), 240) // CHART_SIZE_STEP * CHART_SIZE_STEP
+        key = ChartRenderer.cache_key(chart, aggregates, self.current_theme, width, height)
+        if chart in self._chart_images and self._chart_images[chart][0] == key:
+            return
         
-        # Create simplified pie chart with error handling
         try:
-            # Sort categories for better visualization
-            sorted_items = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)
-            labels = [k.capitalize() for k, v in sorted_items]
-            values = [float(v) for k, v in sorted_items]
-            
-            # Create a figure only if we have data
-            if values:
-                # Create frame for chart with better resizing
-                chart_display = ttk.Frame(self.chart_frame)
-                chart_display.pack(fill=tk.BOTH, expand=True)
-                
-                # Create figure with safe defaults
-                plt.rcParams.update({'figure.autolayout': True})
-                fig = plt.figure(figsize=(5, 4), dpi=100)
-                
-                # Apply theme colors to figure background
-                bg_color = self.current_theme.bg_frame
-                fig.patch.set_facecolor(bg_color)
-                ax = fig.add_subplot(111)
-                ax.set_facecolor(bg_color)
-                
-                # Use theme colors for the pie chart if specified, fallback to default if error occurs
-                try:
-                    colors = self.current_theme.pie_colors
-                    wedges, texts, autotexts = ax.pie(
-                        values,
-                        labels=None,  
-                        autopct='%1.1f%%',
-                        startangle=90,
-                        wedgeprops={'edgecolor': 'white', 'linewidth': 1},
-                        textprops={'color': 'white', 'weight': 'bold', 'fontsize': 9},
-                        colors=colors
-                    )
-                except:
-                    # Fallback to default matplotlib colors if custom colors cause issues
-                    wedges, texts, autotexts = ax.pie(
-                        values,
-                        labels=None,  
-                        autopct='%1.1f%%',
-                        startangle=90,
-                        wedgeprops={'edgecolor': 'white', 'linewidth': 1},
-                        textprops={'color': 'white', 'weight': 'bold', 'fontsize': 9}
-                    )
-                
-                # Add legend with theme-appropriate colors
-                legend = ax.legend(
-                    labels,
-                    loc='center left',
-                    bbox_to_anchor=(0.9, 0.5),
-                    fontsize=9
-                )
-                
-                # Set legend text color based on theme
-                for text in legend.get_texts():
-                    text.set_color(self.current_theme.fg_main)
-                
-                # Set title with theme-appropriate color
-                ax.set_title("Expense Distribution by Category", color=self.current_theme.fg_heading)
-                
-                # Create canvas for embedding plot with better resizing
-                canvas = FigureCanvasTkAgg(fig, master=chart_display)
-                canvas.draw()
-                canvas_widget = canvas.get_tk_widget()
-                canvas_widget.pack(fill=tk.BOTH, expand=True)
-                
-                # Ensure plot is properly closed
-                plt.close(fig)
-            else:
-                ttk.Label(self.chart_frame, text="No data for visualization",
-                         font=('Segoe UI', 12), justify='center').pack(expand=True)
-                         
-        except Exception as e:
-            # Log the error and show it in the UI
+            png = self.chart_renderer.render(chart, aggregates, self.current_theme, width, height)
+            image = tk.PhotoImage(data=base64.b64encode(png))
+        except Exception:
+            # Log the error and show a text-based alternative in the UI
             import traceback
-            traceback.print_exc()  # Print the full traceback for debugging
-            
-            # Create a text-based alternative representation
-            error_frame = ttk.Frame(self.chart_frame)
-            error_frame.pack(fill=tk.BOTH, expand=True)
-            
-            ttk.Label(error_frame, text="Chart display not available",
-                     font=('Segoe UI', 11, 'bold')).pack(pady=(10, 5))
-            
-            # Show a simple text representation instead
-            text_widget = tk.Text(error_frame, height=10, width=40)
-            text_widget.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-            
-            # Format data as text
-            text_widget.insert(tk.END, "Category Breakdown:\n\n")
-            for category, amount in sorted_items:
-                percentage = (float(amount) / float(total_amount)) * 100
-                text_widget.insert(tk.END, f"{category.capitalize()}: ${float(amount):.2f} ({percentage:.1f}%)\n")
-            
-            text_widget.configure(state='disabled')
+            traceback.print_exc()
+            self._chart_images.pop(chart, None)
+            lines = ["Chart display not available", "", "Category Breakdown:"]
+            for category, amount in aggregates.category_totals.items():
+                percentage = (amount / aggregates.total) * 100 if aggregates.total else 0
+                lines.append(f"{category.capitalize()}: ${amount:.2f} ({percentage:.1f}%)")
+            label.configure(image='', text="\n".join(lines))
+            return
+        
+        # Keep a reference so Tk does not discard the image
+        self._chart_images[chart] = (key, image)
+        label.configure(image=image, text='')
 
     def show_monthly_summary(self):
-        expenses = self.storage.get_expenses()
-        monthly_totals = {}
-        grand_total = Decimal('0')
-        
-        for expense in expenses:
-            date = datetime.fromisoformat(expense['date'])
-            month_key = f"{date.strftime('%B %Y')}"
-            amount = Decimal(expense['amount'])
-            monthly_totals[month_key] = monthly_totals.get(month_key, Decimal('0')) + amount
-            grand_total += amount
+        aggregates = self.analytics.aggregates()
+        monthly_totals = aggregates.monthly_totals
+        grand_total = aggregates.total
         
         if not monthly_totals:
             messagebox.showinfo("Monthly Summary", "No expenses recorded")
@@ -492,8 +459,8 @@ def show_monthly_summary(self):
         summary_lines = ["Month                Amount"]
         summary_lines.append("=" * 30)
         
-        for month, total in sorted(monthly_totals.items()):
-            summary_lines.append(f"{month:<20} ${total:>8.2f}")
+        for month, total in monthly_totals.items():
+            summary_lines.append(f"{month_label(month):<20} ${total:>8.2f}")
         
         summary_lines.append("=" * 30)
         summary_lines.append(f"Total:{' '*14} ${grand_total:>8.2f}")
@@ -519,15 +486,9 @@ def show_monthly_summary(self):
         ttk.Button(dialog, text="Close", command=dialog.destroy).pack(pady=10)
 
     def show_category_analysis(self):
-        expenses = self.storage.get_expenses()
-        category_totals = {}
-        grand_total = Decimal('0')
-        
-        for expense in expenses:
-            category = expense['category']
-            amount = Decimal(expense['amount'])
-            category_totals[category] = category_totals.get(category, Decimal('0')) + amount
-            grand_total += amount
+        aggregates = self.analytics.aggregates()
+        category_totals = aggregates.category_totals
+        grand_total = aggregates.total
         
         if not category_totals:
             messagebox.showinfo("Category Analysis", "No expenses recorded")
@@ -568,8 +529,7 @@ def show_category_analysis(self):
         scrollbar.pack(side="right", fill="y")
         
         # Add category details with bars
-        sorted_categories = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)
-        for category, amount in sorted_categories:
+        for category, amount in category_totals.items():
             percentage = (amount / grand_total) * 100 if grand_total else 0
             
             category_row = ttk.Frame(scrollable_frame)
@@ -676,7 +636,7 @@ def save_changes():
                     'category': new_category
                 }
                 
-                if self.storage.update_expense(index, updated_data):
+                if self.history.record(self.storage.update_expense(index, updated_data)):
                     self.refresh_data()
                     self.status_var.set(f"Updated expense: ${new_amount} for {new_category}")
                     edit_dialog.destroy()
@@ -702,13 +662,43 @@ def delete_selected_expense(self):
         expense_details = self.expense_tree.item(selected_item, 'values')
         
         # Delete from storage
-        if self.storage.delete_expense(index):
+        if self.history.record(self.storage.delete_expense(index)):
             # Update UI
             self.refresh_data()
-            self.status_var.set(f"Deleted: {expense_details[1]} for {expense_details[2]}")
+            self.status_var.set(f"Deleted: {expense_details[1]} for {expense_details[2]} (Ctrl+Z to undo)")
         else:
             self.status_var.set("Error: Failed to delete expense")
 
+    def on_history_key(self, event, action):
+        """Run undo or redo for a shortcut, unless it was typed in a text field."""
+        # Entries handle their own Ctrl+Z; it should not undo a ledger change
+        if isinstance(event.widget, (tk.Entry, ttk.Entry, tk.Text)):
+            return
+        action()
+
+    def undo(self):
+        """Undo the most recent add, edit or delete."""
+        change = self.history.undo()
+        if change is None:
+            self.status_var.set("Nothing to undo")
+            return
+        self.refresh_data()
+        self.status_var.set(f"Undone: {describe_change(change)} (Ctrl+Y to redo)")
+
+    def redo(self):
+        """Redo the most recently undone change."""
+        change = self.history.redo()
+        if change is None:
+            self.status_var.set("Nothing to redo")
+            return
+        self.refresh_data()
+        self.status_var.set(f"Redone: {describe_change(change)}")
+
+    def close(self):
+        """Save pending changes to the expenses file and close the window."""
+        self.storage.close()
+        self.root.destroy()
+
     def sort_treeview(self, column):
         """Sort treeview content when a column header is clicked."""
         # If already sorting by this column, reverse the order
@@ -757,8 +747,8 @@ def set_theme(self, theme_name):
             self.apply_theme()
             self._update_theme_buttons()
             
-            # Refresh the UI to apply the new theme
-            self.refresh_data()
+            # Only the charts depend on the theme beyond the ttk styles
+            self.update_dashboard()
             self.status_var.set(f"Theme changed to {self.current_theme_name}")
 
     def _update_theme_buttons(self):
@@ -0,0 +1,125 @@
+"""
+Undo/redo support for the Expense Tracker application.
+
+This module keeps a log of the changes made through the application and
+undoes them by recording their inverse in the storage journal. Undoing or
+redoing a change is therefore a single journal append, independent of
+the size of the ledger.
+
+Classes:
+    CommandLog: Undo and redo stacks over storage changes
+
+Functions:
+    invert_change: Build the change that reverses a journal change
+    describe_change: Short human-readable description of a change
+"""
+from collections import deque
+
+def invert_change(change):
+    """
+    Build the change that reverses a journal change.
+
+    Args:
+        change (dict): Change in storage journal format
+
+    Returns:
+        dict: The inverse change
+    """
+    op = change['op']
+    if op == 'add':
+        return {'op': 'delete', 'expense': change['expense']}
+    if op == 'delete':
+        return {'op': 'add', 'expense': change['expense']}
+    if op == 'update':
+        return {'op': 'update', 'old': change['new'], 'new': change['old']}
+    raise ValueError(f"Unknown change: {op!r}")
+
+def describe_change(change):
+    """
+    Return a short human-readable description of a change.
+
+    Args:
+        change (dict): Change in storage journal format
+
+    Returns:
+        str: Description such as 'add $12.50 for food'
+    """
+    expense = change.get('expense') or change['new']
+    return f"{change['op']} ${expense['amount']} for {expense['category']}"
+
+class CommandLog:
+    """
+    Undo and redo stacks over storage changes.
+
+    Changes are recorded after they have been applied to storage. Undo
+    applies the inverse of the most recent change; redo re-applies a
+    change that was undone. Recording a new change clears the redo stack.
+
+    Attributes:
+        storage (Storage): Storage the changes are applied to
+    """
+
+    def __init__(self, storage, max_entries=100):
+        """
+        Initialize the command log.
+
+        Args:
+            storage (Storage): Storage the changes are applied to
+            max_entries (int): Maximum number of changes kept for undo.
+                Defaults to 100.
+        """
+        self.storage = storage
+        self._undo = deque(maxlen=max_entries)
+        self._redo = deque(maxlen=max_entries)
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def record(self, change):
+        """
+        Record a change that has just been applied to storage.
+
+        Args:
+            change (dict): The change returned by a Storage method; None is
+                ignored so failed operations can be passed straight through
+
+        Returns:
+            dict: The change that was passed in
+        """
+        if change is not None:
+            self._undo.append(change)
+            self._redo.clear()
+        return change
+
+    def undo(self):
+        """
+        Undo the most recent change.
+
+        Returns:
+            dict: The change that was undone, or None if there is nothing to undo
+        """
+        if not self._undo:
+            return None
+        change = self._undo.pop()
+        self.storage.apply_change(invert_change(change))
+        self._redo.append(change)
+        return change
+
+    def redo(self):
+        """
+        Re-apply the most recently undone change.
+
+        Returns:
+            dict: The change that was redone, or None if there is nothing to redo
+        """
+        if not self._redo:
+            return None
+        change = self._redo.pop()
+        self.storage.apply_change(change)
+        self._undo.append(change)
+        return change
@@ -27,7 +27,9 @@ def display_menu():
     print("2. View Expenses")
     print("3. View Monthly Summary")
     print("4. View Category Analysis")
-    print("5. Exit")
+    print("5. Undo Last Change")
+    print("6. Redo")
+    print("7. Exit")
     return input("Select an option: ")
 
 def run_cli():
@@ -41,21 +43,29 @@ def run_cli():
     expense_manager = ExpenseManager(storage)
     analytics = Analytics(storage)
 
-    while True:
-        choice = display_menu()
-        if choice == "1":
-            expense_manager.add_expense()
-        elif choice == "2":
-            expense_manager.view_expenses()
-        elif choice == "3":
-            analytics.monthly_summary()
-        elif choice == "4":
-            analytics.category_analysis()
-        elif choice == "5":
-            print("Thank you for using Expense Tracker!")
-            break
-        else:
-            print("Invalid option. Please try again.")
+    try:
+        while True:
+            choice = display_menu()
+            if choice == "1":
+                expense_manager.add_expense()
+            elif choice == "2":
+                expense_manager.view_expenses()
+            elif choice == "3":
+                analytics.monthly_summary()
+            elif choice == "4":
+                analytics.category_analysis()
+            elif choice == "5":
+                expense_manager.undo()
+            elif choice == "6":
+                expense_manager.redo()
+            elif choice == "7":
+                print("Thank you for using Expense Tracker!")
+                break
+            else:
+                print("Invalid option. Please try again.")
+    finally:
+        # Save journaled changes to the expenses file, also on Ctrl+C
+        storage.close()
 
 def run_gui():
     """
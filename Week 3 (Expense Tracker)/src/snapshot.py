@@ -0,0 +1,301 @@
+"""
+Binary snapshot format for the Expense Tracker application.
+
+This module stores the expense ledger in a compact columnar layout that
+can be memory-mapped and read back with almost no parsing. It is used as
+a load cache next to the human-readable JSON file: the JSON file stays the
+source of truth, and a snapshot is only trusted while the size and
+modification time recorded in its header still match that file. The
+header also carries the ledger generation of the JSON file it was built
+from, which the change journal is matched against.
+
+File layout (native byte order, every section 8-byte aligned):
+    header          magic, version, byte order, source stat, counts, generation
+    dates           int64[n]   microseconds since 0001-01-01T00:00:00
+    amount_units    int64[n]   amount coefficient (sign included)
+    amount_exps     int8[n]    amount exponent, amount = units * 10**exp
+    categories      uint16[n]  index into the category table
+    cat table       uint32[c+1] character offsets, then UTF-8 text
+    date table      uint32[n+1] character offsets, then UTF-8 text
+    amount table    uint32[n+1] character offsets, then UTF-8 text
+    desc table      uint32[n+1] character offsets, then UTF-8 text
+
+The numeric columns serve aggregate queries without touching any text;
+the text tables hold the original strings so rows can be rebuilt by
+slicing instead of formatting.
+
+Classes:
+    SnapshotLedger: Read-only, memory-mapped view of a snapshot file
+
+Functions:
+    write_snapshot: Pack a list of expense dictionaries into a snapshot
+    load_snapshot: Open a snapshot if it is still valid for its source file
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+MAGIC = b'EXPSNAP\x00'
+VERSION = 2
+
+# magic, version, byte order, source mtime_ns, source size, rows, categories, generation
+_HEADER = struct.Struct('<8sHcxqqIIQ')
+_TEXT_HEADER = struct.Struct('<Q')
+_EPOCH = datetime(1, 1, 1)
+_FIELDS = {'amount', 'description', 'category', 'date'}
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _pack_strings(values):
+    """Return the (character offsets, byte length + UTF-8 text) sections for strings."""
+    offsets = array('I', [0])
+    position = 0
+    for value in values:
+        position += len(value)
+        offsets.append(position)
+    if position > 0xFFFFFFFF:
+        raise ValueError("Text column too large for snapshot")
+    text = ''.join(values).encode('utf-8')
+    return [offsets.tobytes(), _TEXT_HEADER.pack(len(text)) + text]
+
+
+def _pack_amount(text):
+    """
+    Split an amount string into an (int64 units, int8 exponent) pair.
+
+    Raises:
+        ValueError: If the amount does not fit the pair
+    """
+    try:
+        value = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {text!r}")
+    sign, digits, exponent = value.as_tuple()
+    if not isinstance(exponent, int) or not -128 <= exponent <= 127:
+        raise ValueError(f"Amount out of snapshot range: {text!r}")
+    units = int(''.join(map(str, digits)))
+    if sign:
+        units = -units
+    if not -(1 << 63) <= units < (1 << 63):
+        raise ValueError(f"Amount out of snapshot range: {text!r}")
+    return units, exponent
+
+
+def _pack_date(text):
+    """
+    Convert an ISO date string to microseconds since 0001-01-01.
+
+    Raises:
+        ValueError: If the string is not a naive ISO date
+    """
+    date = datetime.fromisoformat(text)
+    if date.tzinfo is not None:
+        raise ValueError(f"Date not representable in snapshot: {text!r}")
+    delta = date - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def write_snapshot(path, expenses, source_stat, generation=0):
+    """
+    Write expenses to a snapshot file.
+
+    The expenses must already be sorted by date; they are stored in the
+    given order. The file is written to a temporary path and moved into
+    place so readers never observe a partial snapshot.
+
+    Args:
+        path (Path): Destination snapshot file
+        expenses (list): Expense dictionaries as stored in the JSON file
+        source_stat (os.stat_result): Stat of the JSON file the rows came from
+        generation (int): Ledger generation of that JSON file. Defaults to 0.
+
+    Raises:
+        ValueError: If any row cannot be stored without loss
+    """
+    count = len(expenses)
+    dates = array('q', bytes(8 * count))
+    units = array('q', bytes(8 * count))
+    exps = array('b', bytes(count))
+    cats = array('H', bytes(2 * count))
+    category_ids = {}
+
+    for i, expense in enumerate(expenses):
+        if expense.keys() != _FIELDS:
+            raise ValueError(f"Unexpected expense fields: {sorted(expense)}")
+        dates[i] = _pack_date(expense['date'])
+        units[i], exps[i] = _pack_amount(expense['amount'])
+        category = expense['category']
+        if category not in category_ids:
+            if len(category_ids) > 0xFFFF:
+                raise ValueError("Too many distinct categories for snapshot")
+            category_ids[category] = len(category_ids)
+        cats[i] = category_ids[category]
+
+    header = _HEADER.pack(MAGIC, VERSION, sys.byteorder[0].encode(),
+                          source_stat.st_mtime_ns, source_stat.st_size,
+                          count, len(category_ids), generation)
+    sections = [header, dates.tobytes(), units.tobytes(), exps.tobytes(), cats.tobytes()]
+    sections += _pack_strings(list(category_ids))
+    for field in ('date', 'amount', 'description'):
+        sections += _pack_strings([expense[field] for expense in expenses])
+
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        position = 0
+        for section in sections:
+            padding = _align(position) - position
+            f.write(b'\x00' * padding)
+            f.write(section)
+            position += padding + len(section)
+    os.replace(tmp_path, path)
+
+
+class SnapshotLedger:
+    """
+    Read-only, memory-mapped view of a snapshot file.
+
+    Numeric columns are exposed as memoryviews directly over the mapped
+    file. Text columns are decoded once as whole blocks and sliced per
+    row, so no per-row parsing happens at all.
+
+    Attributes:
+        dates (memoryview): int64 microseconds since 0001-01-01
+        amount_units (memoryview): int64 amount coefficients
+        amount_exps (memoryview): int8 amount exponents
+        category_ids (memoryview): uint16 indices into ``categories``
+        categories (list): Category names
+        generation (int): Ledger generation of the source JSON file
+    """
+
+    def __init__(self, path):
+        """
+        Map a snapshot file into memory.
+
+        Args:
+            path (Path): Snapshot file to open
+
+        Raises:
+            ValueError: If the file is not a snapshot written on this platform
+        """
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open()
+        except (ValueError, struct.error):
+            self.close()
+            raise ValueError(f"Unreadable snapshot: {path}")
+
+    def _open(self):
+        (magic, version, byteorder, self.source_mtime_ns, self.source_size,
+         count, n_categories, self.generation) = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION or byteorder != sys.byteorder[0].encode():
+            raise ValueError("Snapshot header mismatch")
+
+        self._view = memoryview(self._mmap)
+        self._position = _HEADER.size
+        self.dates = self._take(8 * count).cast('q')
+        self.amount_units = self._take(8 * count).cast('q')
+        self.amount_exps = self._take(count).cast('b')
+        self.category_ids = self._take(2 * count).cast('H')
+        self.categories = self._take_strings(n_categories)
+        self._date_offsets, self._date_text = self._take_text(count)
+        self._amount_offsets, self._amount_text = self._take_text(count)
+        self._desc_offsets, self._desc_text = self._take_text(count)
+        self._count = count
+
+    def _take(self, size):
+        start = _align(self._position)
+        if start + size > len(self._view):
+            raise ValueError("Truncated snapshot")
+        self._position = start + size
+        return self._view[start:start + size]
+
+    def _take_text(self, count):
+        offsets = self._take(4 * (count + 1)).cast('I')
+        size, = _TEXT_HEADER.unpack(self._take(_TEXT_HEADER.size))
+        return offsets, str(self._take(size), 'utf-8')
+
+    def _take_strings(self, count):
+        offsets, text = self._take_text(count)
+        with offsets:
+            return [text[offsets[i]:offsets[i + 1]] for i in range(count)]
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def amount(self, index):
+        """Return the amount of the row at ``index`` as a Decimal."""
+        return Decimal(self.amount_units[index]).scaleb(self.amount_exps[index])
+
+    def date(self, index):
+        """Return the date of the row at ``index`` as a datetime."""
+        return _EPOCH + timedelta(microseconds=self.dates[index])
+
+    def rows(self):
+        """
+        Materialize the snapshot as expense dictionaries.
+
+        Returns:
+            list: Expense dictionaries in the same shape as the JSON file,
+                sorted by date
+        """
+        categories = self.categories
+        dates, date_offsets = self._date_text, self._date_offsets.tolist()
+        amounts, amount_offsets = self._amount_text, self._amount_offsets.tolist()
+        descs, desc_offsets = self._desc_text, self._desc_offsets.tolist()
+        return [
+            {
+                'amount': amounts[amount_offsets[i]:amount_offsets[i + 1]],
+                'description': descs[desc_offsets[i]:desc_offsets[i + 1]],
+                'category': categories[cat],
+                'date': dates[date_offsets[i]:date_offsets[i + 1]]
+            }
+            for i, cat in enumerate(self.category_ids)
+        ]
+
+    def close(self):
+        """Release the column views and unmap the file."""
+        for name in ('dates', 'amount_units', 'amount_exps', 'category_ids',
+                     '_date_offsets', '_amount_offsets', '_desc_offsets', '_view'):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+def load_snapshot(path, source_path):
+    """
+    Open a snapshot if it is still valid for its JSON source file.
+
+    Args:
+        path (Path): Snapshot file
+        source_path (Path): JSON file the snapshot was built from
+
+    Returns:
+        SnapshotLedger: The mapped snapshot, or None if it is missing,
+            unreadable or older than the JSON file
+    """
+    try:
+        source_stat = os.stat(source_path)
+        ledger = SnapshotLedger(path)
+    except (OSError, ValueError):
+        return None
+    if (ledger.source_mtime_ns, ledger.source_size) != (source_stat.st_mtime_ns, source_stat.st_size):
+        ledger.close()
+        return None
+    return ledger
@@ -2,37 +2,150 @@
 Data persistence module for the Expense Tracker application.
 
 This module handles loading and saving expense data to persistent storage,
-using JSON files as the primary storage mechanism.
+using JSON files as the primary storage mechanism. Individual changes are
+appended to a journal file next to the JSON file and folded back into it
+when the journal grows large and when the storage is closed, so a single
+add, edit or delete never rewrites the whole ledger. An optional binary
+snapshot (see snapshot.py) can be kept next to the JSON file to speed up
+loading large ledgers.
+
+JSON file format:
+    {"generation": 3, "expenses": [...]}      a bare list, as written by
+                                              older versions, is generation 0
+
+Journal format (one JSON object per line):
+    {"generation": 3}                         first line, generation of the
+                                              JSON file the journal applies to
+    {"op": "add", "expense": {...}}
+    {"op": "delete", "expense": {...}}
+    {"op": "update", "old": {...}, "new": {...}}
+
+Every change carries the full records it touches, so it can be replayed
+without knowing list positions and inverted without reading the ledger.
+Each compaction increments the generation. A journal for an earlier
+generation was already folded in by a compaction that stopped before
+resetting the journal; a journal for a later generation means the JSON
+file was replaced by an older copy, and is reported rather than dropped.
 
 Classes:
+    JournalError: The journal does not belong to the JSON file
     Storage: Manages expense data persistence operations
 """
 import json
 import os
+import re
 from datetime import datetime
 from pathlib import Path
+from snapshot import load_snapshot, write_snapshot
+
+# Journal size at which changes are folded back into the JSON file
+COMPACT_BYTES = 256 * 1024
+
+# The generation is written first, so it can be read without parsing the ledger
+_GENERATION_PREFIX = re.compile(rb'\s*\{\s*"generation"\s*:\s*(\d+)\s*,')
+
+class JournalError(Exception):
+    """Raised when the change journal was written against a newer JSON file."""
+
+def _parse_ledger(data):
+    """
+    Split a loaded JSON file into its generation and expense list.
+    
+    Returns:
+        tuple: (generation, list of expense dictionaries)
+    """
+    if isinstance(data, list):
+        return 0, data
+    return data['generation'], data['expenses']
+
+def _date_key(expense):
+    return datetime.fromisoformat(expense['date'])
+
+def _bisect(expenses, date, right=False):
+    """Binary search a date-sorted expense list for the position of ``date``."""
+    lo, hi = 0, len(expenses)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        mid_date = _date_key(expenses[mid])
+        if mid_date < date or (right and mid_date == date):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+def _find(expenses, record):
+    """Return the index of ``record`` in a date-sorted list, or None."""
+    date = _date_key(record)
+    for i in range(_bisect(expenses, date), len(expenses)):
+        if expenses[i] == record:
+            return i
+        if _date_key(expenses[i]) != date:
+            break
+    return None
+
+def _insert(expenses, record):
+    """Insert ``record`` after any expenses with the same date."""
+    expenses.insert(_bisect(expenses, _date_key(record), right=True), record)
+
+def _apply_change(expenses, change):
+    """
+    Apply a journal change to a date-sorted expense list in place.
+    
+    Changes whose target record no longer exists are ignored.
+    """
+    op = change['op']
+    if op == 'add':
+        _insert(expenses, change['expense'])
+    elif op == 'delete':
+        index = _find(expenses, change['expense'])
+        if index is not None:
+            del expenses[index]
+    elif op == 'update':
+        index = _find(expenses, change['old'])
+        if index is None:
+            return
+        new = change['new']
+        if new['date'] == change['old']['date']:
+            expenses[index] = new
+        else:
+            del expenses[index]
+            _insert(expenses, new)
 
 class Storage:
     """
     Handles data persistence for expenses.
     
-    This class manages reading and writing expense data to a JSON file,
-    as well as basic CRUD operations for expense records.
+    This class manages reading and writing expense data to a JSON file
+    and its change journal, as well as basic CRUD operations for expense
+    records.
     
     Attributes:
         data_dir (Path): Directory path for data storage
         data_file (Path): File path for the expenses JSON file
+        journal_file (Path): File path for the append-only change journal
+        snapshot_file (Path): File path for the binary load snapshot
+        use_snapshot (bool): Whether loads go through the binary snapshot
     """
     
-    def __init__(self):
+    def __init__(self, data_dir=None, use_snapshot=False):
         """
         Initialize the storage manager.
         
         Sets up the data directory and file paths, and ensures
         the storage structure exists.
+        
+        Args:
+            data_dir (Path, optional): Directory for data files. Defaults to
+                the project's data directory.
+            use_snapshot (bool): Maintain a binary snapshot next to the JSON
+                file and load from it while it is up to date. Defaults to False.
         """
-        self.data_dir = Path(__file__).parent.parent / 'data'
+        self.data_dir = Path(data_dir) if data_dir else Path(__file__).parent.parent / 'data'
         self.data_file = self.data_dir / 'expenses.json'
+        self.journal_file = self.data_dir / 'expenses.journal'
+        self.snapshot_file = self.data_dir / 'expenses.snap'
+        self.use_snapshot = use_snapshot
+        self._write_count = 0
         self._initialize_storage()
 
     def _initialize_storage(self):
@@ -45,7 +158,7 @@ def _initialize_storage(self):
         self.data_dir.mkdir(exist_ok=True)
         if not self.data_file.exists():
             with open(self.data_file, 'w') as f:
-                json.dump([], f)
+                json.dump({'generation': 0, 'expenses': []}, f)
 
     def save_expense(self, expense):
         """
@@ -53,22 +166,243 @@ def save_expense(self, expense):
         
         Args:
             expense (Expense): The expense object to save
+            
+        Returns:
+            dict: The recorded change
         """
-        expenses = self.get_expenses()
-        expenses.append(expense.to_dict())
-        with open(self.data_file, 'w') as f:
-            json.dump(expenses, f, indent=2)
+        return self.apply_change({'op': 'add', 'expense': expense.to_dict()})
 
     def get_expenses(self):
         """
         Retrieve all expenses from storage.
         
+        Loads the JSON file, or the memory-mapped snapshot when enabled and
+        up to date, and replays the change journal on top of it.
+        
         Returns:
             list: List of expense dictionaries, sorted by date
+        
+        Raises:
+            JournalError: If the journal belongs to a newer JSON file
+        """
+        generation, expenses = self._load_base()
+        for change in self._read_journal(generation):
+            _apply_change(expenses, change)
+        return expenses
+
+    def apply_change(self, change):
+        """
+        Record a change by appending it to the journal.
+        
+        The ledger itself is not read, so this costs the same regardless
+        of how many expenses are stored. Once the journal exceeds
+        COMPACT_BYTES it is folded into the JSON file.
+        
+        Args:
+            change (dict): Change in journal format
+            
+        Returns:
+            dict: The recorded change
+        
+        Raises:
+            JournalError: If the journal belongs to a newer JSON file
+        """
+        generation = self._base_generation()
+        journal_generation = self._journal_generation()
+        if journal_generation is None or journal_generation < generation:
+            # Start a new journal for the current JSON file; the entries of
+            # a journal for an earlier generation have already been compacted
+            self._replace_journal(generation)
+        elif journal_generation > generation:
+            raise self._mismatch(journal_generation, generation)
+        with open(self.journal_file, 'a') as f:
+            f.write(json.dumps(change) + '\n')
+        self._write_count += 1
+        if self.journal_file.stat().st_size > COMPACT_BYTES:
+            self.compact()
+        return change
+
+    def compact(self):
+        """
+        Fold the journal into the JSON file and start an empty journal.
+        
+        The JSON file is written with the next generation and replaced
+        atomically before the journal is reset. If the process stops in
+        between, the old journal is for an earlier generation than the new
+        JSON file and is ignored, so no change is applied twice.
+        
+        Raises:
+            JournalError: If the journal belongs to a newer JSON file
+        """
+        generation, expenses = self._load_base()
+        for change in self._read_journal(generation):
+            _apply_change(expenses, change)
+        generation += 1
+        tmp_file = self.data_file.with_name(self.data_file.name + '.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump({'generation': generation, 'expenses': expenses}, f, indent=2)
+        os.replace(tmp_file, self.data_file)
+        self._write_count += 1
+        if self.use_snapshot:
+            self._write_snapshot(expenses, generation)
+        self._replace_journal(generation)
+
+    def close(self):
+        """
+        Fold any journaled changes into the JSON file.
+        
+        Called when the application exits, so the JSON file holds every
+        expense between sessions.
         """
+        try:
+            with open(self.journal_file, 'r') as f:
+                f.readline()
+                pending = bool(f.readline())
+        except FileNotFoundError:
+            pending = False
+        if pending:
+            self.compact()
+
+    def data_version(self):
+        """
+        Return a token that changes whenever the stored expenses change.
+        
+        Combines a counter of writes made through this instance with the
+        size and modification time of the JSON file and the journal, so
+        edits made by another process are noticed as well.
+        
+        Returns:
+            tuple: Hashable version token
+        """
+        stat = os.stat(self.data_file)
+        try:
+            journal = os.stat(self.journal_file)
+            journal_stamp = (journal.st_mtime_ns, journal.st_size)
+        except FileNotFoundError:
+            journal_stamp = None
+        return (self._write_count, stat.st_mtime_ns, stat.st_size, journal_stamp)
+
+    def export_json(self, path):
+        """
+        Export all expenses as human-readable JSON.
+        
+        Args:
+            path (str or Path): Destination file
+        """
+        with open(path, 'w') as f:
+            json.dump(self.get_expenses(), f, indent=2)
+
+    def _load_base(self):
+        """
+        Load the compacted expense list, before journal changes.
+        
+        When snapshots are enabled and the snapshot matches the JSON file,
+        rows are read from the memory-mapped snapshot instead of parsing
+        JSON. Otherwise the JSON file is loaded and the snapshot rebuilt.
+        
+        Returns:
+            tuple: (generation, list of expense dictionaries sorted by date)
+        """
+        if self.use_snapshot:
+            ledger = load_snapshot(self.snapshot_file, self.data_file)
+            if ledger is not None:
+                with ledger:
+                    return ledger.generation, ledger.rows()
+
         with open(self.data_file, 'r') as f:
-            expenses = json.load(f)
-        return sorted(expenses, key=lambda x: datetime.fromisoformat(x['date']))
+            generation, expenses = _parse_ledger(json.load(f))
+        expenses = sorted(expenses, key=_date_key)
+        if self.use_snapshot:
+            self._write_snapshot(expenses, generation)
+        return generation, expenses
+
+    def _base_generation(self):
+        """Return the generation of the JSON file, parsing it only if it was written by hand."""
+        with open(self.data_file, 'rb') as f:
+            match = _GENERATION_PREFIX.match(f.read(64))
+        if match:
+            return int(match.group(1))
+        with open(self.data_file, 'r') as f:
+            return _parse_ledger(json.load(f))[0]
+
+    def _journal_generation(self):
+        """
+        Return the generation recorded in the journal, or None if there is no journal.
+        
+        Raises:
+            JournalError: If the journal has no readable generation
+        """
+        try:
+            with open(self.journal_file, 'r') as f:
+                header = f.readline()
+        except FileNotFoundError:
+            return None
+        if not header:
+            return None
+        try:
+            return int(json.loads(header)['generation'])
+        except (ValueError, TypeError, KeyError):
+            raise JournalError(f"{self.journal_file} has no generation header; "
+                               f"move it aside once its changes are recovered")
+
+    def _mismatch(self, journal_generation, generation):
+        return JournalError(
+            f"{self.journal_file} holds changes to generation {journal_generation} of "
+            f"{self.data_file}, but that file is at generation {generation}; restore "
+            f"the newer expenses file, or move the journal aside to discard the changes")
+
+    def _read_journal(self, generation):
+        """
+        Return the changes recorded against the given generation of the JSON file.
+        
+        Args:
+            generation (int): Generation of the loaded JSON file
+        
+        Returns:
+            list: Changes in the order they were made; empty if the journal
+                is missing or was already folded into the JSON file
+        
+        Raises:
+            JournalError: If the journal belongs to a newer JSON file
+        """
+        journal_generation = self._journal_generation()
+        if journal_generation is None or journal_generation < generation:
+            return []
+        if journal_generation > generation:
+            raise self._mismatch(journal_generation, generation)
+        with open(self.journal_file, 'r') as f:
+            lines = f.read().splitlines()
+        changes = []
+        for line in lines[1:]:
+            try:
+                changes.append(json.loads(line))
+            except ValueError:
+                # A torn final line from an interrupted append
+                break
+        return changes
+
+    def _replace_journal(self, generation):
+        tmp_file = self.journal_file.with_name(self.journal_file.name + '.tmp')
+        with open(tmp_file, 'w') as f:
+            f.write(json.dumps({'generation': generation}) + '\n')
+        os.replace(tmp_file, self.journal_file)
+
+    def _write_snapshot(self, expenses, generation):
+        """
+        Rebuild the binary snapshot for the current JSON file.
+        
+        Rows that cannot be stored losslessly leave the snapshot absent,
+        so loading falls back to JSON.
+        
+        Args:
+            expenses (list): Expense dictionaries sorted by date
+            generation (int): Generation of the JSON file
+        """
+        try:
+            write_snapshot(self.snapshot_file, expenses, os.stat(self.data_file), generation)
+        except ValueError:
+            if self.snapshot_file.exists():
+                self.snapshot_file.unlink()
 
     def delete_expense(self, expense_index):
         """
@@ -78,15 +412,12 @@ def delete_expense(self, expense_index):
             expense_index (int): Index of the expense to delete
             
         Returns:
-            bool: True if deletion was successful, False otherwise
+            dict: The recorded change, or None if the index is out of range
         """
         expenses = self.get_expenses()
         if 0 <= expense_index < len(expenses):
-            del expenses[expense_index]
-            with open(self.data_file, 'w') as f:
-                json.dump(expenses, f, indent=2)
-            return True
-        return False
+            return self.apply_change({'op': 'delete', 'expense': expenses[expense_index]})
+        return None
 
     def update_expense(self, expense_index, updated_data):
         """
@@ -97,12 +428,10 @@ def update_expense(self, expense_index, updated_data):
             updated_data (dict): New data to apply to the expense
             
         Returns:
-            bool: True if update was successful, False otherwise
+            dict: The recorded change, or None if the index is out of range
         """
         expenses = self.get_expenses()
         if 0 <= expense_index < len(expenses):
-            expenses[expense_index].update(updated_data)
-            with open(self.data_file, 'w') as f:
-                json.dump(expenses, f, indent=2)
-            return True
-        return False
+            old = expenses[expense_index]
+            return self.apply_change({'op': 'update', 'old': old, 'new': {**old, **updated_data}})
+        return None